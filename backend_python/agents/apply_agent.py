@@ -14,24 +14,23 @@ from pathlib import Path
 import fitz
 from playwright.async_api import (
     FilePayload,
-    async_playwright,
     Page,
     TimeoutError as PlaywrightTimeoutError,
 )
 
 from database.linkedin_context import get_linkedin_context, save_linkedin_context, clear_linkedin_context
 from config import LINKEDIN_CONTEXT_OPTIONS
+from lib.browser_runtime import launch_chromium, run_pipeline
+from lib.request_filter import RequestFilter
 from pdf2image import convert_from_bytes
 import pytesseract
 from playwright_stealth.stealth import Stealth
 from config import GOOGLE_API, GROQ_API
-from groq import Groq
+from lib.clients import LazyClient, get_groq_client
 import requests
 from config import LINKEDIN_ID, LINKEDIN_PASSWORD
 
-client = Groq(
-    api_key=GROQ_API,
-)
+client = LazyClient(get_groq_client)
 model="openai/gpt-oss-120b"
 
 HEADLESS = os.getenv("PLAYWRIGHT_HEADLESS", "true").lower() != "false"
@@ -84,6 +83,26 @@ KNOWN_TECHNOLOGIES = [
     "json", "xml", "http", "https", "tcp", "ip"
 ]
 
+# Per-run profile values above are overwritten from the user's parsed resume;
+# a warm worker restores these defaults between jobs (see reset_job_state).
+_PROFILE_DEFAULTS = {
+    name: globals()[name]
+    for name in (
+        "RESUME_FILENAME", "FIRST_NAME", "LAST_NAME", "EMAIL", "PHONE",
+        "MY_GENERAL_EXPERIENCE", "MY_KNOWN_TECH_EXPERIENCE", "MY_UNKNOWN_TECH_EXPERIENCE",
+        "MY_CURRENT_CTC", "MY_EXPECTED_CTC", "MY_NOTICE_PERIOD",
+        "MY_CURRENT_CITY", "MY_CURRENT_STATE", "MY_CURRENT_COUNTRY", "MY_FULL_LOCATION",
+        "KNOWN_TECHNOLOGIES",
+    )
+}
+
+
+def reset_job_state():
+    """Forget the previous job's profile so nothing leaks into the next user's applications."""
+    for name, value in _PROFILE_DEFAULTS.items():
+        globals()[name] = list(value) if isinstance(value, list) else value
+
+
 MAX_DAILY_APPLICATIONS = 40  # Soft throttle safety cap
 DAILY_LIMIT_REACHED = "EASY_APPLY_DAILY_LIMIT_REACHED"
 
@@ -1881,7 +1900,11 @@ async def login(page: Page, user_id: str|None, password: str| None) -> bool:
     log.error("❌ Login timeout")
     return False
 
-async def safe_goto(page: Page, url: str, retries: int = 3) -> bool:
+async def safe_goto(page: Page, url: str, retries: int = 3, request_filter: RequestFilter | None = None) -> bool:
+    if request_filter:
+        # Job pages only need the document, scripts and styles the Easy Apply modal uses.
+        await request_filter.attach(page)
+
     # ── Diagnostic: verify cookies are alive before navigation ──
     try:
         ctx = page.context
@@ -2098,16 +2121,7 @@ async def main(
     if not browser:
         if log_callback:
             log_callback({"progress": 6, "status": "processing", "message": "Connecting to server..."})
-        pw = await async_playwright().start()
-        launch_kwargs = {
-            "headless": True,
-            
-            "args": [
-                '--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu', '--no-zygote', '--disable-extensions', '--disable-background-networking', '--disable-renderer-backgrounding', '--no-first-run', '--mute-audio', '--metrics-recording-only'
-            ]
-        }
-        
-        browser = await pw.chromium.launch(**launch_kwargs)
+        pw, browser = await launch_chromium()
         
         db_context = None
         if not progress_user:
@@ -2151,6 +2165,7 @@ async def main(
         agent = EasyApplyAgent(page, user_id=progress_user, user_profile=user_profile)
         applied = []
         failed = []
+        request_filter = RequestFilter()
 
         # ── Helper: emit progress after each job outcome ──────────────
         def emit(success: bool, current_url: str | None, company_name: str | None, reason: str ="", is_already_applied: bool = False):
@@ -2211,7 +2226,7 @@ async def main(
             log.info(f"🔗 URL: {url}")
             log.info(f"{'='*60}")
             
-            if not await safe_goto(page, url):
+            if not await safe_goto(page, url, request_filter=request_filter):
                 failed.append(url)
                 emit(False, url, company_name, "page unavailable") 
                 return
@@ -2383,6 +2398,7 @@ async def main(
         log.info(f"✅ Successfully applied: {len(applied)}")
         log.info(f"❌ Failed applications: {len(failed)}")
         log.info(f"📊 Success rate: {(len(applied)/(len(applied)+len(failed))*100):.1f}%")
+        log.info(f"🧹 Request filter: {request_filter.stats()}")
         log.info(f"{'='*60}")
 
         # ── Delayed DB Write ─────────────────────────────────────────────
@@ -2416,14 +2432,7 @@ if __name__ == "__main__":
 async def setup_and_login(progress_user, user_id, password, log_callback=None):
     if log_callback:
         log_callback({"progress": 6, "status": "processing", "message": "Connecting to server..."})
-    pw = await async_playwright().start()
-    launch_kwargs = {
-        "headless": True,
-        "args": [
-            '--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu', '--no-zygote', '--disable-extensions', '--disable-background-networking', '--disable-renderer-backgrounding', '--no-first-run', '--mute-audio', '--metrics-recording-only'
-        ]
-    }
-    browser = await pw.chromium.launch(**launch_kwargs)
+    pw, browser = await launch_chromium()
     try:
         db_context = get_linkedin_context(progress_user)
         if db_context:
@@ -2457,12 +2466,7 @@ def run_apply_pipeline(job_id: str, job_data: dict, log_callback):
     Orchestrates the resume parsing and Playwright auto-apply.
     """
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(_async_apply_pipeline(job_id, job_data, log_callback))
-        finally:
-            loop.close()
+        run_pipeline(lambda: _async_apply_pipeline(job_id, job_data, log_callback))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -8,6 +8,7 @@ import os
 from .pdf_utils import extract_pdf_text_from_url
 from google import genai
 from google.genai import types
+from lib.clients import LazyClient, get_genai_client
 from pdf2image import convert_from_bytes
 import pytesseract
 from pydantic import BaseModel
@@ -47,7 +48,7 @@ class TitleCandidatesSchema(BaseModel):
     titles: List[str]
 
 
-client  = genai.Client(api_key= GOOGLE_API)
+client = LazyClient(get_genai_client)
 model = 'gemini-2.5-flash-lite'
 # client = Groq(
 #     api_key=GROQ_API,
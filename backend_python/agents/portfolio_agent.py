@@ -9,16 +9,14 @@ import requests
 from config import GROQ_API
 # from google import genai
 # from google.genai import types
-from groq import Groq
+from lib.clients import LazyClient, get_groq_client
 # ╭── Gemini setup ───────────────────────────────────────────────╮
 
 # if not GOOGLE_API:
 #     raise ValueError("Set GOOGLE_API env var")
 # client = genai.Client(api_key=GOOGLE_API)
 # model = "gemini-2.5-flash-native-audio-dialog" # gemini-2.5-flash-lite
-client = Groq(
-    api_key=GROQ_API,
-)
+client = LazyClient(get_groq_client)
 model="openai/gpt-oss-120b"
 SYSTEM_INSTRUCTION = r"""
 You are an expert front-end engineer and designer. Generate a COMPLETE, PRODUCTION-READY, RESPONSIVE portfolio page using ONLY pure HTML + CSS (no JavaScript, no Tailwind, no external libraries).
@@ -8,12 +8,20 @@ from datetime import datetime
 import time
 import re
 import aiohttp
+from contextlib import nullcontext
 from bs4 import BeautifulSoup
 
 from config import LINKEDIN_CONTEXT_OPTIONS
+from lib.browser_runtime import chromium_session, run_pipeline
+from lib.phase_metrics import record_phase
+from lib.worker_fleet import set_phase
+from lib.host_limiter import HostRateLimiter, THROTTLE_STATUSES, retry_after_seconds
+from lib.http_session import scraper_http_session
+from lib.request_filter import RequestFilter
+from lib import analysis_cache, scrape_checkpoint
+from lib.token_batcher import ANALYSIS_BATCH_MAX_JOBS, stream_batches
 from database.linkedin_context import save_linkedin_context, get_linkedin_context, clear_linkedin_context
 
-from playwright.async_api import async_playwright
 # from concurrent.futures import ThreadPoolExecutor
 import json
 
@@ -22,6 +30,7 @@ from google.genai import types
 
 # from urllib.parse import urlparse
 from config import GOOGLE_API, LINKEDIN_ID, LINKEDIN_PASSWORD
+from lib.clients import LazyClient, get_genai_client
 
 HEADLESS = os.getenv("PLAYWRIGHT_HEADLESS", "true").lower() != "false"
 
@@ -60,8 +69,22 @@ FILTERING_KEYWORDS = [
     "Python", "Spring Boot", "TypeScript"
 ]
 
-PROCESSED_JOB_URLS = set()
+# Titles searched at once, each on its own page of the shared logged-in context.
+SCRAPER_TITLE_CONCURRENCY = int(os.getenv("SCRAPER_TITLE_CONCURRENCY", "3"))
+# Description fetchers draining the card queue; the host limiter still caps per-host load.
+SCRAPER_FETCH_WORKERS = int(os.getenv("SCRAPER_FETCH_WORKERS", "6"))
+# Cards waiting for a fetcher. When full, searches wait instead of racing ahead.
+SCRAPER_FETCH_QUEUE_SIZE = int(os.getenv("SCRAPER_FETCH_QUEUE_SIZE", "50"))
+# output_data key holding per-title scrape progress while a fetch_jobs session is running.
+SCRAPE_CHECKPOINT_KEY = "scrape_checkpoint"
 LOGGED_IN_CONTEXT = None
+
+
+def reset_job_state():
+    """Drop the previous job's LinkedIn context; a warm worker calls this before every job."""
+    global LOGGED_IN_CONTEXT
+    LOGGED_IN_CONTEXT = None
+
 # MODEL_NAME="gemini-2.5-flash"
 model_2 = "gemini-3-flash-preview"
 model_3 = 'gemini-2.5-flash-lite' # gemini-2.5-flash-lite gemini-2.5-flash-preview-09-2025
@@ -73,6 +96,21 @@ MODELS = [model_1, model_2, model_3, model_4]
 MAX_PAGES = 3
 
 
+def record_phase_duration(phase: str, started: float):
+    """Best-effort duration sample (time.monotonic() start) for queue ETAs; see lib/phase_metrics.py."""
+    record_phase_seconds(phase, time.monotonic() - started)
+
+
+def record_phase_seconds(phase: str, seconds: float):
+    from config import redis_client
+    if not redis_client:
+        return
+    try:
+        record_phase(redis_client, phase, seconds)
+    except Exception as e:
+        print(f"Phase metric error ({phase}): {e}")
+
+
 def normalize_job_url(url: str) -> str:
     clean_url = (url or "").split('?')[0].strip()
     return clean_url.replace("://in.linkedin.com", "://www.linkedin.com")
@@ -315,7 +353,7 @@ async def ensure_logged_in(browser, user_id, linkedin_email=None, linkedin_passw
 # 2. FIXED PAGINATION - WAIT FOR JOBS AFTER EACH PAGE CLICK
 # ---------------------------------------------------------------------------
 
-async def load_all_available_jobs_fixed(page):
+async def load_all_available_jobs_fixed(page, limiter=None):
     """FIXED: Proper pagination with page-by-page job loading - returns unique job entries."""
     try:
         print("🔄 Starting FIXED pagination job loading...")
@@ -344,7 +382,8 @@ async def load_all_available_jobs_fixed(page):
             print(f"✅ Page {page_num + 1}: Added {new_jobs_count} new jobs (Total: {len(unique_job_map)})")
             
             # Try to navigate to next page
-            next_clicked = await click_next_page_and_wait(page)
+            async with (limiter.slot(page.url) if limiter else nullcontext()):
+                next_clicked = await click_next_page_and_wait(page)
             if not next_clicked:
                 print(f"🛑 No next page available, stopping at page {page_num + 1}")
                 break
@@ -487,6 +526,17 @@ async def scroll_current_page(page):
         print(f"❌ Enhanced scroll error: {e}")
 
 
+async def wait_for_layout(page, timeout: float = 2):
+    """Return once the browser has laid out and painted the current DOM (two animation frames)."""
+    try:
+        await asyncio.wait_for(
+            page.evaluate("() => new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(resolve)))"),
+            timeout,
+        )
+    except Exception as e:
+        print(f"⚠️ Layout wait skipped: {e}")
+
+
 async def force_layout_fix(page):
     """Force proper layout after zoom"""
     await page.evaluate('''
@@ -570,8 +620,8 @@ async def click_next_page_and_wait(page):
     # 1. First ensure 25% zoom to expose all lazy-loaded job cards without scroll bounding
     try:
         await page.evaluate("document.body.style.zoom='25%'")
-        # Give a moment for the new zoom scale to take effect
-        await asyncio.sleep(1)
+        # Let the new zoom scale take effect
+        await wait_for_layout(page)
     except Exception as e:
         print(f"Zoom out failed: {e}")
 
@@ -785,23 +835,28 @@ def extract_job_metadata_from_html(html_content: str, fallback_title: str = "")
     }
 
 
-async def extract_job_description_fixed(session: aiohttp.ClientSession, url, fallback_title="", max_retries=3):
+async def _retry_pause(limiter, seconds: float):
+    """Fixed pause before a retry, unless a host limiter is pacing (and backing off) for us."""
+    if limiter is None:
+        await asyncio.sleep(seconds)
+
+
+async def extract_job_description_fixed(session: aiohttp.ClientSession, url, fallback_title="", max_retries=3, limiter=None):
     """
     Fetches the HTML of a URL and then parses it to extract
     the text content of the element with id='job-details'.
     Includes retry logic for failed requests.
+
+    `session` should come from lib.http_session.scraper_http_session, which
+    carries the request headers and timeout. With a `limiter`, request pacing
+    and retry backoff come from it (throttled responses and timeouts are
+    reported to it) instead of fixed sleeps.
     """
     print(f"🚀 Fetching: {url}")
     
-    headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-    
-    await asyncio.sleep(1.5)
-    
     for attempt in range(max_retries):
         try:
-            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            async with (limiter.slot(url) if limiter else nullcontext()) as lease, session.get(url) as response:
                 if response.status == 200:
                     html_content = await response.text()
                     print(f"   ✅ HTML fetched successfully (attempt {attempt + 1})")
@@ -815,27 +870,29 @@ async def extract_job_description_fixed(session: aiohttp.ClientSession, url, fal
 
                     print(f"   ⚠️ Job description element not found (attempt {attempt + 1})")
                     if attempt < max_retries - 1:
-                        await asyncio.sleep(2)  # Wait before retry
+                        await _retry_pause(limiter, 2)
                         continue
                     return "Failed: Could not find the job description element in the HTML."
                 else:
                     print(f"   ⚠️ HTTP {response.status} (attempt {attempt + 1}/{max_retries})")
+                    if lease and response.status in THROTTLE_STATUSES:
+                        lease.throttle(retry_after_seconds(response.headers.get("Retry-After")))
                     if attempt < max_retries - 1:
-                        await asyncio.sleep(2)  # Wait before retry
+                        await _retry_pause(limiter, 2)
                         continue
                     return f"Failed: HTTP status {response.status}"
                     
         except asyncio.TimeoutError:
             print(f"   ⏱️ Timeout (attempt {attempt + 1}/{max_retries})")
             if attempt < max_retries - 1:
-                await asyncio.sleep(3)  # Longer wait after timeout
+                await _retry_pause(limiter, 3)  # Longer wait after timeout
                 continue
             return "Failed: Request timeout after retries"
             
         except Exception as e:
             print(f"   ❌ Error (attempt {attempt + 1}/{max_retries}): {str(e)[:100]}")
             if attempt < max_retries - 1:
-                await asyncio.sleep(2)
+                await _retry_pause(limiter, 2)
                 continue
             return f"Failed: {str(e)[:100]}"
     
@@ -848,24 +905,36 @@ async def extract_job_description_fixed(session: aiohttp.ClientSession, url, fal
 # ---------------------------------------------------------------------------
 
 
-async def scrape_platform_speed_optimized(context, platform_name, config, job_title, user_id, is_connected=True):
-    """SPEED OPTIMIZED: URL-deduped collection with raw metadata capture."""
-    global PROCESSED_JOB_URLS
+async def collect_job_cards(context, platform_name, config, job_title, user_id, is_connected=True, seen_urls=None, limiter=None, request_filter=None):
+    """
+    Search one title on one platform and return the new job cards as
+    [{"url", "card_title"}], deduped against and claimed in `seen_urls`.
+
+    `seen_urls` is the run's dedupe set, shared by titles searched concurrently.
+    Every check-and-add happens without an await in between, so concurrent
+    searches on the same event loop never claim the same URL twice.
+    `request_filter` (lib/request_filter.py) keeps non-essential resources
+    off the search page.
+    """
+    seen_urls = set() if seen_urls is None else seen_urls
     
     page = await context.new_page()
+    if request_filter:
+        await request_filter.attach(page)
     # page.set_viewport_size({'width': 2560, 'height': 2000})
     await page.evaluate('() => { document.body.style.zoom = "0.25"; }')
     # Optimized timeouts for speed
     page.set_default_navigation_timeout(20000)
     page.set_default_timeout(15000)
     
-    job_dict = {}
-    
     try:
         url = config["url_template"].format(role=job_title.replace(" ", "%20").lower())
         print(f"🔍 {Colors.BOLD}SPEED-OPTIMIZED search: '{job_title}'{Colors.END}")
         
-        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        async with (limiter.slot(url) if limiter else nullcontext()) as lease:
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            if lease and response and response.status in THROTTLE_STATUSES:
+                lease.throttle(retry_after_seconds(response.headers.get("retry-after")))
         print("✅ Navigation complete")
 
         current_url = page.url
@@ -873,9 +942,10 @@ async def scrape_platform_speed_optimized(context, platform_name, config, job_ti
             print("🚨 AUTHENTICATION WALL DETECTED!")
             if not is_connected:
                 from config import redis_client
+                from lib.free_scheduler import pause_queue
                 import requests
                 if redis_client:
-                    redis_client.set("free_queue_status", "paused")
+                    pause_queue(redis_client)
                 
                 # Admin webhook notification (example)
                 admin_webhook = os.getenv("ADMIN_WEBHOOK_URL")
@@ -893,15 +963,15 @@ async def scrape_platform_speed_optimized(context, platform_name, config, job_ti
 
         # Force layout fix
         await force_layout_fix(page)
-        await asyncio.sleep(1)
+        await wait_for_layout(page)
         
-        job_cards = await load_all_available_jobs_fixed(page)
+        job_cards = await load_all_available_jobs_fixed(page, limiter)
         
         await debug_capture_page(page, "06_after_job_loading", job_title)
 
         if not job_cards:
             print(f"❌ No jobs found for '{job_title}'")
-            return {}
+            return []
         
         print(f"📊 Processing {len(job_cards)} unique job URLs")
 
@@ -918,12 +988,12 @@ async def scrape_platform_speed_optimized(context, platform_name, config, job_ti
                 if not clean_url:
                     continue
 
-                if clean_url in PROCESSED_JOB_URLS:
+                if clean_url in seen_urls:
                     duplicate_count += 1
                     print(f"   🔄 Job {i}: Duplicate URL, skipping")
                     continue
 
-                PROCESSED_JOB_URLS.add(clean_url)
+                seen_urls.add(clean_url)
                 valid_job_links.append({
                     "url": clean_url,
                     "card_title": card_title,
@@ -941,121 +1011,36 @@ async def scrape_platform_speed_optimized(context, platform_name, config, job_ti
         print(f"   🔄 Duplicates skipped: {duplicate_count}")
         
         print(f"✅ {len(valid_job_links)} jobs ready for OPTIMIZED processing")
-        
-        # Continue with job processing...
-        # results=[]
-        if valid_job_links:
-            print(f"✅ {len(valid_job_links)} jobs ready for OPTIMIZED processing with aiohttp...")
-            
-            # cookies = await context.cookies()
-            
-            # # Filter out cookies with invalid characters for aiohttp
-            # valid_cookies = []
-            # for cookie in cookies:
-            #     cookie_name = cookie['name']
-            #     # Skip cookies with brackets or other special chars that aiohttp doesn't like
-            #     if '[' not in cookie_name and ']' not in cookie_name:
-            #         valid_cookies.append(cookie)
-            #     else:
-            #         print(f"   ⚠️ Skipping invalid cookie: {cookie_name}")
-            
-            # print(f"   ✅ Using {len(valid_cookies)}/{len(cookies)} valid cookies for authentication")
-            
-            # Use aiohttp to fetch descriptions in controlled batches
-            connector = aiohttp.TCPConnector(limit=3)  # Only 3 concurrent connections
-            async with aiohttp.ClientSession(connector=connector) as session:
-                # Add valid cookies to session
-                # for cookie in valid_cookies:
-                #     try:
-                #         session.cookie_jar.update_cookies(
-                #             {cookie['name']: cookie['value']},
-                #             response_url=aiohttp.client.URL(config["base_url"])
-                #         )
-                #     except Exception as e:
-                #         print(f"   ⚠️ Could not add cookie {cookie['name']}: {e}")
-    
-                # Process in small batches with delays to avoid rate limiting
-                results = []
-                batch_size = 20  # Only 5 jobs at a time
-                
-                for i in range(0, len(valid_job_links), batch_size):
-                    batch_urls = valid_job_links[i:i + batch_size]
-                    batch_num = (i // batch_size) + 1
-                    total_batches = (len(valid_job_links) + batch_size - 1) // batch_size
-                    
-                    print(f"   📦 Processing batch {batch_num}/{total_batches} ({len(batch_urls)} jobs)...")
-                    
-                    batch_tasks = [
-                        extract_job_description_fixed(
-                            session,
-                            job_entry.get("url", ""),
-                            fallback_title=job_entry.get("card_title", ""),
-                        )
-                        for job_entry in batch_urls
-                    ]
-                    
-                    batch_results = await asyncio.gather(*batch_tasks)
-                    results.extend(batch_results)
-                    
-                    # Add delay between batches (except for the last batch)
-                    if i + batch_size < len(valid_job_links):
-                        delay = 2  # 5 second delay between batches
-                        print(f"   ⏳ Waiting {delay}s before next batch to avoid rate limiting...")
-                        await asyncio.sleep(delay)
-
-            # with open(f"results_{datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}", "w", encoding="utf-8") as f:
-            #     json.dump(results, f, indent=2, ensure_ascii=False)
-            
-
-            processed_count = 0
-            failed_count = 0
-            failed_urls = []
-            
-            # Pair job metadata with fetched raw payload
-            for job_entry, raw_payload in zip(valid_job_links, results):
-                url = job_entry.get("url", "")
-                fallback_title = job_entry.get("card_title", "")
-
-                if isinstance(raw_payload, dict) and raw_payload.get("job_description"):
-                    job_dict[url] = {
-                        "job_url": url,
-                        "job_id": str(uuid.uuid4()),
-                        "job_description": raw_payload.get("job_description", ""),
-                        "title": raw_payload.get("title") or fallback_title,
-                        "company_name": raw_payload.get("company_name", ""),
-                        "location": raw_payload.get("location", ""),
-                        "posted_at": raw_payload.get("posted_at", ""),
-                        "job_type": raw_payload.get("job_type", ""),
-                        "source": "web",
-                    }
-                    processed_count += 1
-                else:
-                    failed_count += 1
-                    failed_urls.append(url)
-                    reason = raw_payload[:50] if isinstance(raw_payload, str) else "No response"
-                    print(f"   ❌ Failed to fetch: {url[:80]}... - Reason: {reason}")
-
-            print(f"\n📊 EXTRACTION SUMMARY:")
-            print(f"   ✅ Successfully processed: {processed_count}/{len(valid_job_links)}")
-            print(f"   ❌ Failed: {failed_count}/{len(valid_job_links)}")
-            # Remove all failed URLs from processed set and valid list
-            failed_set = set(failed_urls)
-            PROCESSED_JOB_URLS.difference_update(failed_set)
-            valid_job_links = [job for job in valid_job_links if job.get("url") not in failed_set]
-            if failed_urls:
-                print(f"   ⚠️ Failed URLs saved for debugging")
-            # with open("scrapped_jobs", "w", encoding="utf-8") as f:
-            #     f.write(str(job_dict))
-
-        return job_dict
+        return valid_job_links
         
     except Exception as e:
         print(f"❌ Error in speed-optimized search: {e}")
-        return {}
+        return []
     finally:
         if page:
             await page.close()
 
+
+def build_raw_job(job_entry: dict, raw_payload):
+    """Pair a job card with its fetched description payload; None if the fetch failed."""
+    if not (isinstance(raw_payload, dict) and raw_payload.get("job_description")):
+        reason = raw_payload[:50] if isinstance(raw_payload, str) else "No response"
+        print(f"   ❌ Failed to fetch: {job_entry.get('url', '')[:80]}... - Reason: {reason}")
+        return None
+
+    return {
+        "job_url": job_entry.get("url", ""),
+        "job_id": str(uuid.uuid4()),
+        "job_description": raw_payload.get("job_description", ""),
+        "title": raw_payload.get("title") or job_entry.get("card_title", ""),
+        "company_name": raw_payload.get("company_name", ""),
+        "location": raw_payload.get("location", ""),
+        "posted_at": raw_payload.get("posted_at", ""),
+        "job_type": raw_payload.get("job_type", ""),
+        "source": "web",
+    }
+
+
 # ---------------------------------------------------------------------------
 # 5. GEMINI API PROCESSING FUNCTIONS (OPTIMIZED)
 # ---------------------------------------------------------------------------
@@ -1145,7 +1130,7 @@ async def scrape_platform_speed_optimized(context, platform_name, config, job_ti
 #         return []
 
 
-client = genai.Client(api_key=GOOGLE_API)
+client = LazyClient(get_genai_client)
 
 
 def normalize_raw_job_payload(url: str, raw_payload) -> dict:
@@ -1331,7 +1316,9 @@ def parse_bulk_response(response_text: str, original_jobs: dict) -> list:
         print(f"❌ Error parsing response: {e}")
         return [create_fallback_data_from_dict(url, raw_payload) for url, raw_payload in original_jobs.items()]
 
-async def extract_single_batch(batch_dict: dict) -> list:
+async def extract_single_batch(batch_dict: dict, fallback: bool = True) -> list:
+    """Gemini-structured jobs for one batch. When every attempt fails, returns
+    unanalysed fallback rows, or raises if `fallback` is False."""
     prompt = create_bulk_prompt(batch_dict)
     system_instruction = """
         You are a professional job-data extraction specialist. Extract precisely the requested job titles and keywords, ensuring accuracy and consistency. Follow these rules strictly:
@@ -1348,11 +1335,13 @@ async def extract_single_batch(batch_dict: dict) -> list:
     for attempt, delay in zip(range(1, 6), (0, 5, 10, 5, 10)):
         try:
             print(f"AI - ({choose_model}) attempt {attempt}/5")
-            res = client.models.generate_content(
+            # Off the event loop: scraping and fetching keep running meanwhile.
+            res = (await asyncio.to_thread(
+                client.models.generate_content,
                 model=choose_model,
                 contents=prompt,
                 config=types.GenerateContentConfig(temperature=0.2)
-            ).text
+            )).text
             
             if res is None:
                 print(f"❌ Gemini returned None response on attempt {attempt}")
@@ -1377,30 +1366,70 @@ async def extract_single_batch(batch_dict: dict) -> list:
             else:
                 print(f"Gemini error: {str(e)}")
             # Wait, then retry next attempt (do not break)
-            time.sleep(delay)
+            await asyncio.sleep(delay)
             continue
     
     # Return fallback data if all attempts fail
+    if not fallback:
+        raise RuntimeError("All Gemini attempts failed for this batch")
     return [create_fallback_data_from_dict(url, jd) for url, jd in batch_dict.items()]
 
 
-async def extract_jobs_in_batches(jobs_dict: dict, batch_size: int = 25, log_callback=None, total_jobs_so_far=0) -> list:  # Increased batch size
+def _analysis_cache_client():
+    from config import redis_client
+    return redis_client
+
+
+async def extract_jobs_in_batches(jobs_dict: dict, batch_size: int = 25, log_callback=None, total_jobs_so_far=0, job_id=None) -> list:  # Increased batch size
+    """
+    Structure raw jobs with Gemini in batches. With `job_id`, each analysed
+    batch is persisted as it completes and jobs stored by an earlier run of
+    the same session are reused instead of re-analysed (lib/analysis_cache.py).
+    """
     all_extracted = []
+    cache = _analysis_cache_client() if job_id else None
+    reused = []
+    if cache:
+        try:
+            reused_jobs, jobs_dict = analysis_cache.split_cached(analysis_cache.load(cache, job_id), jobs_dict)
+            reused = [reused_jobs[i : i + batch_size] for i in range(0, len(reused_jobs), batch_size)]
+        except Exception as e:
+            print(f"⚠️ Could not load stored analysis results: {e}")
+        if reused:
+            print(f"♻️ Reusing {sum(map(len, reused))} analysed job(s); {len(jobs_dict)} job(s) left for Gemini")
+
     items = list(jobs_dict.items())
-    total_batches = (len(items) + batch_size - 1) // batch_size
+    total_batches = len(reused) + (len(items) + batch_size - 1) // batch_size
+    analysis_started = time.monotonic()
     
     if log_callback:
         log_callback({"progress": 89, "status": "analyzing", "message": "Analyzing job descriptions..."})
+
+    for batch_num, result in enumerate(reused, 1):
+        all_extracted.extend(result)
+        if log_callback:
+            log_callback({
+                "progress": 89 + int((batch_num / total_batches) * 10),
+                "status": "batch_ready",
+                "batch_num": batch_num,
+                "total_batches": total_batches,
+                "jobs": result
+            })
     
     for i in range(0, len(items), batch_size):
         batch = dict(items[i : i + batch_size])
-        batch_num = (i // batch_size) + 1
+        batch_num = len(reused) + (i // batch_size) + 1
         print(f"🔄 Processing batch {batch_num}/{total_batches}: {len(batch)} jobs")
         
         try:
-            result = await extract_single_batch(batch)
+            result = await extract_single_batch(batch, fallback=False)
             all_extracted.extend(result)
             print(f"✅ Batch {batch_num} completed")
+            if cache:
+                try:
+                    analysis_cache.save_results(cache, job_id, batch, result)
+                except Exception as e:
+                    print(f"⚠️ Could not persist batch {batch_num}: {e}")
 
             gemini_progress = 89 + int((batch_num / total_batches) * 10)
             if log_callback:
@@ -1426,18 +1455,143 @@ async def extract_jobs_in_batches(jobs_dict: dict, batch_size: int = 25, log_cal
         
         await asyncio.sleep(0.1)  # Minimal wait between batches
     
+    if items:
+        record_phase_duration("analysis", analysis_started)
     if log_callback:
         log_callback({"progress": 99, "status": "analyzing", "message": f"Analyzed {len(all_extracted)} jobs"})
     
     return all_extracted
 
+class MonotonicProgress:
+    """
+    log_callback wrapper for the streaming pipeline, where search, fetch and
+    analysis events interleave: reported progress never moves backwards.
+    """
+
+    def __init__(self, log_callback):
+        self._log_callback = log_callback
+        self.current = 0
+
+    def __call__(self, event: dict):
+        progress = event.get("progress")
+        if isinstance(progress, (int, float)) and progress >= 0:
+            self.current = max(self.current, int(progress))
+            event = {**event, "progress": self.current}
+        self._log_callback(event)
+
+
+async def put_while_consuming(queue: asyncio.Queue, item, consumer: asyncio.Task):
+    """
+    queue.put() for a bounded queue drained by `consumer`. If the consumer ends
+    before there is room, the put is abandoned and the consumer's error is
+    re-raised, so a producer never waits on a queue nobody reads any more.
+    """
+    if not consumer.done():
+        put = asyncio.ensure_future(queue.put(item))
+        try:
+            await asyncio.wait({put, consumer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not put.done():
+                put.cancel()
+        if put.done() and not put.cancelled():
+            return
+    consumer.result()
+    raise RuntimeError("Job analysis stopped before the stream ended")
+
+
+async def analyze_job_stream(queue: asyncio.Queue, report: MonotonicProgress, job_id=None, seed=None) -> list:
+    """
+    Streaming counterpart of extract_jobs_in_batches. Structures (url, raw_job)
+    items from `queue` (None ends the stream) in token-budgeted batches
+    (lib/token_batcher.py) and emits `batch_ready` for each batch as soon as
+    Gemini returns it, while the search and fetch stages keep producing.
+    `seed` jobs (e.g. from a scrape checkpoint) are analysed first. Every job,
+    seeded or streamed, is first looked up in the results an earlier run of
+    the session stored (lib/analysis_cache.py); only the rest goes to Gemini.
+    """
+    all_extracted = []
+    batch_num = 0
+    cache = _analysis_cache_client() if job_id else None
+    seed = dict(seed or {})
+    analysis_started = None
+    stored = {}
+    if cache:
+        try:
+            stored = analysis_cache.load(cache, job_id)
+        except Exception as e:
+            print(f"⚠️ Could not load stored analysis results: {e}")
+
+    def emit(result):
+        nonlocal batch_num
+        batch_num += 1
+        all_extracted.extend(result)
+        report({
+            "progress": report.current,
+            "status": "batch_ready",
+            "batch_num": batch_num,
+            "jobs": result
+        })
+
+    if stored and seed:
+        reused, seed = analysis_cache.split_cached(stored, seed)
+        if reused:
+            print(f"♻️ Reusing {len(reused)} analysed checkpoint job(s); {len(seed)} left for Gemini")
+        for i in range(0, len(reused), ANALYSIS_BATCH_MAX_JOBS):
+            emit(reused[i : i + ANALYSIS_BATCH_MAX_JOBS])
+
+    async for batch in stream_batches(queue, initial=seed.items()):
+        reused, batch = analysis_cache.split_cached(stored, batch) if stored else ([], batch)
+        if reused:
+            print(f"♻️ Reusing {len(reused)} analysed job(s) in batch {batch_num + 1}")
+        if not batch:
+            emit(reused)
+            continue
+
+        if analysis_started is None:
+            analysis_started = time.monotonic()
+        print(f"🔄 Processing batch {batch_num + 1}: {len(batch)} jobs")
+        try:
+            result = await extract_single_batch(batch, fallback=False)
+            print(f"✅ Batch {batch_num + 1} completed")
+            if cache:
+                try:
+                    analysis_cache.save_results(cache, job_id, batch, result)
+                except Exception as e:
+                    print(f"⚠️ Could not persist batch {batch_num + 1}: {e}")
+        except Exception as e:
+            print(f"❌ Batch {batch_num + 1} error: {e}")
+            result = [create_fallback_data_from_dict(url, jd) for url, jd in batch.items()]
+        emit(reused + result)
+
+    if analysis_started is not None:
+        record_phase_duration("analysis", analysis_started)
+    return all_extracted
+
 # ---------------------------------------------------------------------------
 # 6. MAIN EXECUTION FUNCTIONS (SPEED OPTIMIZED)
 # ---------------------------------------------------------------------------
 
-async def search_by_job_titles_speed_optimized(job_titles, platforms=None, log_callback=None, user_id=None, linkedin_email=None, linkedin_password=None, is_connected=True):
-    """SPEED OPTIMIZED: All fixes applied - faster execution"""
-    global PROCESSED_JOB_URLS, LOGGED_IN_CONTEXT
+async def search_by_job_titles_speed_optimized(job_titles, platforms=None, log_callback=None, user_id=None, linkedin_email=None, linkedin_password=None, is_connected=True, checkpoint=None, on_title_done=None, on_job=None, on_search_done=None):
+    """
+    SPEED OPTIMIZED: All fixes applied - faster execution
+
+    Runs as two overlapping stages. Up to SCRAPER_TITLE_CONCURRENCY titles are
+    searched at once on separate pages of the logged-in context, and every new
+    card goes onto a bounded queue that SCRAPER_FETCH_WORKERS fetchers drain
+    through one aiohttp session while the searches continue. One dedupe set and
+    one per-host rate limiter (lib/host_limiter.py) cover the whole run.
+
+    `on_job(url, raw_job)` is awaited for every fetched job, so a slow consumer
+    pushes back on the fetchers and, through the full queue, on the searches.
+    `on_search_done()` is called once the browser is closed, while descriptions
+    may still be fetching.
+
+    `checkpoint` ({"completed_titles", "raw_jobs", "processed_urls"}) resumes a
+    previous run: finished titles are skipped and its jobs and dedupe set are
+    carried forward. A title is finished once it is searched and all of its
+    cards are fetched; `on_title_done(checkpoint)` is then called in a thread.
+    """
+    global LOGGED_IN_CONTEXT
     
     if platforms is None:
         platforms = list(PLATFORMS.keys())
@@ -1460,82 +1614,178 @@ async def search_by_job_titles_speed_optimized(job_titles, platforms=None, log_c
         sanitized_titles = JOB_TITLES
         print("⚠️ No parsed titles available. Falling back to default title set.")
     
-    all_jobs = {}
-    PROCESSED_JOB_URLS.clear()
+    checkpoint = checkpoint or {}
+    all_jobs = dict(checkpoint.get("raw_jobs") or {})
+    completed_titles = list(checkpoint.get("completed_titles") or [])
+    # Per-run dedupe and politeness state, shared by the concurrently searched titles.
+    seen_urls = set(checkpoint.get("processed_urls") or [])
+    limiter = HostRateLimiter()
+    request_filter = RequestFilter()
+
+    done_keys = {title.lower() for title in completed_titles}
+    remaining_titles = [title for title in sanitized_titles if title.lower() not in done_keys]
+    if completed_titles:
+        print(f"♻️ Resuming from checkpoint: {len(completed_titles)} title(s) done, {len(all_jobs)} jobs, {len(remaining_titles)} title(s) left")
+        if log_callback:
+            log_callback({"progress": int(15 + min(1, len(completed_titles) / len(sanitized_titles)) * 70), "status": "searching", "message": f"Resuming search: {len(completed_titles)} of {len(sanitized_titles)} titles already done"})
+    if not remaining_titles:
+        if on_search_done:
+            on_search_done()
+        return all_jobs
     
     print(f"🚀 Starting SPEED-OPTIMIZED job extraction with ALL FIXES...")
-    
-    async with async_playwright() as p:
-        launch_kwargs = {
-            "headless": True,
-            "args": [
-                '--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu', '--no-zygote', '--disable-extensions', '--disable-background-networking', '--disable-renderer-backgrounding', '--no-first-run', '--mute-audio', '--metrics-recording-only'
-            ]
-        }
-        
 
-        browser = await p.chromium.launch(**launch_kwargs)
-        
+    fetch_q = asyncio.Queue(maxsize=max(1, SCRAPER_FETCH_QUEUE_SIZE))
+    # Per title: cards still queued or fetching, jobs fetched, and whether its search ended.
+    cards_pending = {title: 0 for title in remaining_titles}
+    jobs_found = {title: 0 for title in remaining_titles}
+    searched = set()
+    checkpoint_lock = asyncio.Lock()
+
+    async def finish_title(job_title):
+        completed_titles.append(job_title)
+        current_percent = int(15 + (len(completed_titles) / len(sanitized_titles)) * 70)  # range 15-85
+        if log_callback:
+            log_callback({"progress": current_percent, "status": "searching", "message": f"Found {jobs_found[job_title]} {job_title} jobs"})
+        if not jobs_found[job_title]:
+            print(f"⚠️ No jobs retained after filters for '{job_title}'")
+        print(f"📊 '{job_title}' complete. Total unique jobs: {len(all_jobs)}")
+
+        if on_title_done:
+            # Serialized and taken at write time, so a slower write never
+            # replaces a newer checkpoint with an older one. Only fetched URLs
+            # are recorded: cards of unfinished titles are searched again.
+            async with checkpoint_lock:
+                state = {
+                    "titles": sanitized_titles,
+                    "completed_titles": list(completed_titles),
+                    "raw_jobs": dict(all_jobs),
+                    "processed_urls": sorted(all_jobs),
+                }
+                try:
+                    await asyncio.to_thread(on_title_done, state)
+                except Exception as e:
+                    print(f"⚠️ Checkpoint after '{job_title}' failed: {e}")
+
+    async def fetch_worker(session):
+        while True:
+            item = await fetch_q.get()
+            if item is None:
+                return
+            job_title, job_entry = item
+            url = job_entry.get("url", "")
+            try:
+                raw_payload = await extract_job_description_fixed(session, url, fallback_title=job_entry.get("card_title", ""), limiter=limiter)
+                raw_job = build_raw_job(job_entry, raw_payload)
+                if raw_job:
+                    all_jobs[url] = raw_job
+                    jobs_found[job_title] += 1
+                    if on_job:
+                        await on_job(url, raw_job)
+                else:
+                    # Failed URLs may be picked up again by a later search.
+                    seen_urls.discard(url)
+            except Exception as e:
+                print(f"❌ Error fetching {url[:80]}: {e}")
+                seen_urls.discard(url)
+            finally:
+                cards_pending[job_title] -= 1
+                if job_title in searched and not cards_pending[job_title]:
+                    await finish_title(job_title)
+
+    descriptions_started = time.monotonic()
+    # One pooled session for the whole run: connections, TLS sessions and DNS
+    # answers are reused by every fetcher across every title.
+    http_stats = {}
+    async with scraper_http_session(http_stats) as session:
+        fetchers = [asyncio.create_task(fetch_worker(session)) for _ in range(max(1, SCRAPER_FETCH_WORKERS))]
         try:
-            if log_callback:
-                log_callback({"progress": 12, "status": "searching", "message": "Connecting to job servers..."})
-            print("Performing server login...")
-            login_context = await ensure_logged_in(browser, user_id, linkedin_email, linkedin_password, is_connected)
-            
-            if login_context is None:
-                print("Failed to login to server. Exiting...")
-                if log_callback:
-                    log_callback({"progress": -1, "status": "error", "message": "Server login failed. Please review credentials."})
-                return {}
-            
-            print("Successfully logged in to server!")
-            if log_callback:
-                log_callback({"progress": 15, "status": "searching", "message": "Server session ready"})
-            
-            for i, job_title in enumerate(sanitized_titles, 1):
-                print(f"\n{'='*70}")
-                print(f"⚡ SPEED-OPTIMIZED SEARCH {i}/{len(sanitized_titles)}: '{job_title}'")
-                print(f"🔢 Processed URLs so far: {len(PROCESSED_JOB_URLS)}")
-                print(f"{'='*70}")
+            async with chromium_session() as browser:
                 
-                title_result = {}
-                for platform_name in platforms:
-                    try:
-                        result = await scrape_platform_speed_optimized(
-                            login_context, platform_name, PLATFORMS[platform_name], job_title, user_id, is_connected
-                        )
-                        title_result.update(result)
-                        all_jobs.update(result)
-                        print(f"📈 Jobs from '{job_title}': {len(result)}")
-                    except Exception as e:
-                        print(f"❌ Error searching '{job_title}' on {platform_name}: {e}")
+                try:
+                    if log_callback:
+                        log_callback({"progress": 12, "status": "searching", "message": "Connecting to job servers..."})
+                    print("Performing server login...")
+                    set_phase("login")
+                    login_started = time.monotonic()
+                    login_context = await ensure_logged_in(browser, user_id, linkedin_email, linkedin_password, is_connected)
                     
-                    await asyncio.sleep(0.5)  # Minimal wait between searches
-                
-                current_percent = int(15 + (i / len(sanitized_titles)) * 70)  # range 15-85
-                if log_callback:
-                    log_callback({"progress": current_percent, "status": "searching", "message": f"Found {len(title_result)} {job_title} jobs"})
-                if not title_result:
-                    print(f"⚠️ No jobs retained after filters for '{job_title}'")
-                print(f"📊 '{job_title}' complete. Total unique jobs: {len(all_jobs)}")
+                    if login_context is None:
+                        print("Failed to login to server. Exiting...")
+                        if log_callback:
+                            log_callback({"progress": -1, "status": "error", "message": "Server login failed. Please review credentials."})
+                        return {}
+                    
+                    print("Successfully logged in to server!")
+                    record_phase_duration("login", login_started)
+                    set_phase("title_search")
+                    if log_callback:
+                        log_callback({"progress": 15, "status": "searching", "message": "Server session ready"})
+                    
+                    title_slots = asyncio.Semaphore(max(1, SCRAPER_TITLE_CONCURRENCY))
+
+                    async def search_title(job_title):
+                        async with title_slots:
+                            i = sanitized_titles.index(job_title) + 1
+                            print(f"\n{'='*70}")
+                            print(f"⚡ SPEED-OPTIMIZED SEARCH {i}/{len(sanitized_titles)}: '{job_title}'")
+                            print(f"🔢 Processed URLs so far: {len(seen_urls)}")
+                            print(f"{'='*70}")
+                            
+                            title_started = time.monotonic()
+                            for platform_name in platforms:
+                                try:
+                                    job_cards = await collect_job_cards(
+                                        login_context, platform_name, PLATFORMS[platform_name], job_title, user_id, is_connected,
+                                        seen_urls=seen_urls, limiter=limiter, request_filter=request_filter,
+                                    )
+                                    print(f"📈 Cards from '{job_title}': {len(job_cards)}")
+                                    for job_entry in job_cards:
+                                        cards_pending[job_title] += 1
+                                        await fetch_q.put((job_title, job_entry))
+                                except Exception as e:
+                                    print(f"❌ Error searching '{job_title}' on {platform_name}: {e}")
+                            
+                            record_phase_duration("title_search", title_started)
 
+                        searched.add(job_title)
+                        if not cards_pending[job_title]:
+                            await finish_title(job_title)
 
-            
+                    await asyncio.gather(*(search_title(job_title) for job_title in remaining_titles))
+
+                finally:
+                    if LOGGED_IN_CONTEXT:
+                        try:
+                            await LOGGED_IN_CONTEXT.close()
+                            print("="*70)
+                            print(f"context has been closed")
+                            print("="*70)
+                        except Exception as e:
+                            print(f"⚠️ Error closing context: {e}")
+
+            set_phase("descriptions")
+            if on_search_done:
+                on_search_done()
+
+            for _ in fetchers:
+                await fetch_q.put(None)
+            await asyncio.gather(*fetchers)
         finally:
-            if LOGGED_IN_CONTEXT:
-                try:
-                    await LOGGED_IN_CONTEXT.close()
-                    print("="*70)
-                    print(f"context has been closed")
-                    print("="*70)
-                except Exception as e:
-                    print(f"⚠️ Error closing context: {e}")
-            await browser.close()
+            for fetcher in fetchers:
+                fetcher.cancel()
+    record_phase_duration("descriptions", descriptions_started)
+    record_phase_seconds("rate_backoff", limiter.backoff_seconds())
+    print(f"🚦 Host limiter: {limiter.stats()}")
+    print(f"🔌 HTTP pool: {http_stats}")
+    print(f"🧹 Request filter: {request_filter.stats()}")
+    if log_callback:
+        log_callback({"status": "scrape_metrics", "backoff_s": limiter.backoff_seconds(), "hosts": limiter.stats(), "http": http_stats, "requests": request_filter.stats()})
     
     print(f"\n{'='*70}")
     print(f"🏆 SPEED-OPTIMIZED EXTRACTION COMPLETE!")
     print(f"📊 Total unique jobs: {len(all_jobs)}")
-    print(f"🔢 Total URLs processed: {len(PROCESSED_JOB_URLS)}")
+    print(f"🔢 Total URLs processed: {len(seen_urls)}")
     print(f"⚡ Speed optimization: MAXIMUM")
     print(f"🔧 All fixes applied: YES")
     print(f"🔐 Authentication: ENABLED")
@@ -1543,74 +1793,40 @@ async def search_by_job_titles_speed_optimized(job_titles, platforms=None, log_c
     
     return all_jobs
 
+def _load_applied_jobs(supabase, user_id) -> set:
+    try:
+        applied_res = supabase.table("User").select("applied_jobs").eq("id", user_id).execute()
+        return set(applied_res.data[0].get("applied_jobs") or []) if applied_res.data else set()
+    except Exception as e:
+        print(f"Could not load applied_jobs for filtering: {e}")
+        return set()
+
+
 def run_scraper_pipeline(job_id: str, job_data: dict, log_callback):
     """
     Entry point for the fetch_jobs Worker.
     Implements idempotency and recovery using `scraper_raw` status.
     """
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        state = {"lock_released": False}
         try:
-            loop.run_until_complete(_async_scraper_pipeline(job_id, job_data, log_callback, state))
+            run_pipeline(lambda: _async_scraper_pipeline(job_id, job_data, log_callback))
         finally:
-            loop.close()
-            
-            # Queue webhook trigger in the finally block only if not already released early
-            if not state.get("lock_released"):
-                user_id = job_data.get("user_id")
-                if user_id:
-                    from config import supabase, redis_client
-                    import requests, threading
-                    try:
-                        user_res = supabase.table("User").select("\"isConnected\"").eq("id", user_id).execute()
-                        if user_res.data and not user_res.data[0].get("isConnected"):
-                            if redis_client:
-                                redis_client.delete("dummy_account_lock")
-                                
-                                qstash_token = os.getenv("QSTASH_TOKEN")
-                                qstash_base_url = os.getenv("QSTASH_URL", "https://qstash.upstash.io")
-                                qstash_url = qstash_base_url if "/v2/publish" in qstash_base_url else f"{qstash_base_url.rstrip('/')}/v2/publish"
-                                backend_url = os.getenv("BACKEND_PUBLIC_URL", "http://localhost:8000")
-                                trigger_url = f"{backend_url}/api/jobs/trigger-next-queue"
-                                
-                                if qstash_token and backend_url:
-                                    import random
-                                    delay_s = random.randint(25, 45)
-                                    headers = {
-                                        "Authorization": f"Bearer {qstash_token}",
-                                        "Upstash-Delay": f"{delay_s}s",
-                                        "Content-Type": "application/json"
-                                    }
-                                    try:
-                                        res = requests.post(f"{qstash_url}/{trigger_url}", headers=headers, json={}, timeout=5)
-                                        res.raise_for_status()
-                                        print(f"✅ Scheduled next queue trigger via QStash in finally block ({delay_s}s). MessageId: {res.json().get('messageId')}")
-                                    except Exception as e:
-                                        print(f"⚠️ QStash scheduling failed in finally block: {e}. Falling back to local timer.")
-                                        def _trigger():
-                                            try: requests.post(trigger_url, timeout=5)
-                                            except: pass
-                                        threading.Timer(float(delay_s), _trigger).start()
-                                else:
-                                    import random
-                                    delay_s = random.randint(25, 45)
-                                    print(f"No QStash token; using local {delay_s}s timer for queue.")
-                                    def _trigger():
-                                        try: requests.post(trigger_url, timeout=5)
-                                        except: pass
-                                    threading.Timer(float(delay_s), _trigger).start()
-                    except Exception as e:
-                        print(f"Error in finally block queue trigger: {e}")
+            # Hand the free-tier account on if the early release after scraping
+            # didn't happen (e.g. the scrape failed). No-op for PRO jobs.
+            from config import redis_client
+            from lib.free_scheduler import release_lease
+            if redis_client:
+                try:
+                    release_lease(redis_client, job_id)
+                except Exception as e:
+                    print(f"Error releasing free-tier lease: {e}")
 
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise e
 
-async def _async_scraper_pipeline(job_id: str, job_data: dict, log_callback, state: dict):
+async def _async_scraper_pipeline(job_id: str, job_data: dict, log_callback):
     from config import supabase
     from agents.parse_agent import main as parse_main
 
@@ -1622,6 +1838,18 @@ async def _async_scraper_pipeline(job_id: str, job_data: dict, log_callback, sta
     email = input_data.get("user_id") # frontend passes email as user_id usually
 
     raw_jobs = None
+    # Per-title progress of an interrupted Playwright phase (status still 'running').
+    cache = _analysis_cache_client()
+    checkpoint = None
+    if status_db == "running":
+        if cache:
+            try:
+                checkpoint = scrape_checkpoint.load(cache, job_id)
+            except Exception as e:
+                print(f"⚠️ Could not load scrape checkpoint: {e}")
+        if checkpoint is None and isinstance(output_data, dict):
+            # Sessions checkpointed before the checkpoint moved to Redis.
+            checkpoint = output_data.get(SCRAPE_CHECKPOINT_KEY)
 
     # Phase 1: Recovery Check
     if status_db == "scraper_raw":
@@ -1663,63 +1891,75 @@ async def _async_scraper_pipeline(job_id: str, job_data: dict, log_callback, sta
                 "resume_url": resume_url
             }).eq("id", user_id).execute()
         
-        titles = user_data_parsed.get("titles", [])
+        titles = (checkpoint or {}).get("titles") or user_data_parsed.get("titles", [])
         
-        # Phase 3: Playwright Scraping
+        # Phase 3: Streaming search -> fetch -> analyze
         log_callback({"progress": 20, "status": "in_progress", "message": "Connecting to server and searching for jobs..."})
         
         # Extract credentials from payload
         l_email = input_data.get("linkedin_id")
         l_pass = input_data.get("linkedin_password")
         
-        raw_jobs = await search_by_job_titles_speed_optimized(titles, log_callback=log_callback, user_id=email, linkedin_email=l_email, linkedin_password=l_pass, is_connected=is_connected)
-        
-        # Playwright phase complete. Release the lock and trigger the next job early so they can scrape in parallel.
-        if not is_connected:
+        # Bounded restart cost: a crash now only loses the titles in progress.
+        # Each save writes only the jobs fetched since the last one (lib/scrape_checkpoint.py).
+        save_checkpoint = None
+        if cache:
+            save_checkpoint = scrape_checkpoint.CheckpointWriter(cache, job_id, already_saved=(checkpoint or {}).get("raw_jobs") or ())
+
+        def release_free_lease():
+            # Playwright phase complete. Release the lease now so the next free
+            # job can scrape while this one is still fetching and analysing.
             from config import redis_client
-            import requests, threading
+            from lib.free_scheduler import release_lease
             try:
                 if redis_client:
-                    redis_client.delete("dummy_account_lock")
-                    state["lock_released"] = True
-                    print("🔓 Released dummy lock early after Playwright phase")
-                    
-                    qstash_token = os.getenv("QSTASH_TOKEN")
-                    qstash_base_url = os.getenv("QSTASH_URL", "https://qstash.upstash.io")
-                    qstash_url = qstash_base_url if "/v2/publish" in qstash_base_url else f"{qstash_base_url.rstrip('/')}/v2/publish"
-                    backend_url = os.getenv("BACKEND_PUBLIC_URL", "http://localhost:8000")
-                    trigger_url = f"{backend_url}/api/jobs/trigger-next-queue"
-                    
-                    if qstash_token and backend_url:
-                        import random
-                        delay_s = random.randint(25, 45)
-                        headers = {
-                            "Authorization": f"Bearer {qstash_token}",
-                            "Upstash-Delay": f"{delay_s}s",
-                            "Content-Type": "application/json"
-                        }
-                        try:
-                            res = requests.post(f"{qstash_url}/{trigger_url}", headers=headers, json={}, timeout=5)
-                            res.raise_for_status()
-                            print(f"✅ Scheduled next queue trigger via QStash ({delay_s}s). MessageId: {res.json().get('messageId')}")
-                        except Exception as e:
-                            print(f"⚠️ QStash scheduling failed: {e}. Falling back to local {delay_s}s timer.")
-                            def _trigger():
-                                try: requests.post(trigger_url, timeout=5)
-                                except: pass
-                            threading.Timer(float(delay_s), _trigger).start()
-                    else:
-                        import random
-                        delay_s = random.randint(25, 45)
-                        print(f"No QStash token; using local {delay_s}s timer for queue.")
-                        def _trigger():
-                            try: requests.post(trigger_url, timeout=5)
-                            except: pass
-                        threading.Timer(float(delay_s), _trigger).start()
+                    release_lease(redis_client, job_id)
             except Exception as e:
                 print(f"Error releasing lock early: {e}")
+
+        # Applied jobs never reach Gemini or the selection screen; filtered as
+        # they stream in, the same way Phase 4 filters a recovered payload.
+        applied_set = _load_applied_jobs(supabase, user_id)
+        skipped_applied = 0
+
+        # Bounded: when Gemini falls behind, fetchers (and through them the
+        # searches) wait instead of piling up descriptions.
+        analyze_q = asyncio.Queue(maxsize=2 * ANALYSIS_BATCH_MAX_JOBS)
+
+        async def enqueue_for_analysis(url, raw_job):
+            nonlocal skipped_applied
+            if normalize_job_url(url) in applied_set:
+                skipped_applied += 1
+                return
+            await put_while_consuming(analyze_q, (url, raw_job), analyzer)
+
+        report = MonotonicProgress(log_callback)
+        seed = {
+            url: jd for url, jd in ((checkpoint or {}).get("raw_jobs") or {}).items()
+            if normalize_job_url(url) not in applied_set
+        }
+        analyzer = asyncio.create_task(analyze_job_stream(analyze_q, report, job_id=job_id, seed=seed))
+        search = asyncio.create_task(search_by_job_titles_speed_optimized(
+            titles, log_callback=report, user_id=email, linkedin_email=l_email, linkedin_password=l_pass,
+            is_connected=is_connected, checkpoint=checkpoint, on_title_done=save_checkpoint,
+            on_job=enqueue_for_analysis, on_search_done=None if is_connected else release_free_lease,
+        ))
+        try:
+            await asyncio.wait({search, analyzer}, return_when=asyncio.FIRST_COMPLETED)
+            if not search.done():
+                # The analyzer died mid-stream: stop searching and fail the job with its error.
+                search.cancel()
+                await asyncio.gather(search, return_exceptions=True)
+                analyzer.result()
+                raise RuntimeError("Job analysis stopped before the search finished")
+            raw_jobs = search.result()
+        except BaseException:
+            search.cancel()
+            analyzer.cancel()
+            raise
         
         if not raw_jobs:
+            analyzer.cancel()
             log_callback({"progress": -1, "status": "error", "message": "No jobs found or login failed. Need new session."})
             supabase.table("workflow_sessions").update({
                 "status": "failed",
@@ -1730,26 +1970,32 @@ async def _async_scraper_pipeline(job_id: str, job_data: dict, log_callback, sta
             clear_linkedin_context(email)
             raise Exception("No jobs scraped - clearing context")
             
-        # Success pulling raw jobs. Save raw state for idempotency.
-        log_callback({"progress": 50, "status": "in_progress", "message": f"Saved {len(raw_jobs)} raw descriptions. Triggering AI categorization."})
+        # Success pulling raw jobs. Save raw state for idempotency while the
+        # analyzer works through what is still queued.
+        set_phase("analysis")
+        report({"progress": 85, "status": "in_progress", "message": f"Saved {len(raw_jobs)} raw descriptions. Finishing AI categorization."})
+        if skipped_applied:
+            report({"progress": 85, "status": "in_progress", "message": f"Skipping {skipped_applied} job(s) you've already applied to."})
         
-        supabase.table("workflow_sessions").update({
-            "status": "scraper_raw",
-            "output_data": raw_jobs
-        }).eq("id", job_id).execute()
+        try:
+            await asyncio.to_thread(
+                lambda: supabase.table("workflow_sessions").update({
+                    "status": "scraper_raw",
+                    "output_data": raw_jobs
+                }).eq("id", job_id).execute()
+            )
+            await put_while_consuming(analyze_q, None, analyzer)
+            structured_jobs = await analyzer
+        finally:
+            analyzer.cancel()
+        report({"progress": 99, "status": "analyzing", "message": f"Analyzed {len(structured_jobs)} jobs"})
 
-    # Phase 4: Gemini Batching
-    if raw_jobs:
+    # Phase 4: Gemini Batching (scraper_raw recovery only; the streaming path analysed as it went)
+    elif raw_jobs:
         # Exclude jobs the user has already applied to, so they never reach the
-        # selection screen. Done here (not only in Phase 2) so the scraper_raw-resume
-        # path is covered too, and pre-Gemini so we don't spend LLM quota on them.
+        # selection screen, and pre-Gemini so we don't spend LLM quota on them.
         # raw_jobs keys and User.applied_jobs are both normalized URLs (split('?')[0]).
-        try:
-            applied_res = supabase.table("User").select("applied_jobs").eq("id", user_id).execute()
-            applied_set = set(applied_res.data[0].get("applied_jobs") or []) if applied_res.data else set()
-        except Exception as e:
-            print(f"Could not load applied_jobs for filtering: {e}")
-            applied_set = set()
+        applied_set = _load_applied_jobs(supabase, user_id)
 
         if applied_set:
             before = len(raw_jobs)
@@ -1758,16 +2004,26 @@ async def _async_scraper_pipeline(job_id: str, job_data: dict, log_callback, sta
             if removed:
                 log_callback({"progress": 54, "status": "in_progress", "message": f"Skipping {removed} job(s) you've already applied to."})
 
+        set_phase("analysis")
         log_callback({"progress": 55, "status": "in_progress", "message": "Analyzing job matches..."})
 
-        structured_jobs = await extract_jobs_in_batches(raw_jobs, batch_size=25, log_callback=log_callback)
-        
-        # Write final structured data to output_data and mark completed
-        supabase.table("workflow_sessions").update({
-            "status": "completed",
-            "output_data": structured_jobs
-        }).eq("id", job_id).execute()
-        
-        log_callback({"progress": 100, "status": "done", "message": f"Successfully processed {len(structured_jobs)} completely structured jobs!"})
+        structured_jobs = await extract_jobs_in_batches(raw_jobs, batch_size=25, log_callback=log_callback, job_id=job_id)
     else:
         raise Exception("No raw jobs found to process")
+        
+    # Write final structured data to output_data and mark completed
+    supabase.table("workflow_sessions").update({
+        "status": "completed",
+        "output_data": structured_jobs
+    }).eq("id", job_id).execute()
+
+    # output_data now holds every batch; the per-batch copies and the scrape
+    # checkpoint are no longer needed.
+    if cache:
+        try:
+            analysis_cache.clear(cache, job_id)
+            scrape_checkpoint.clear(cache, job_id)
+        except Exception as e:
+            print(f"⚠️ Could not clear stored analysis batches: {e}")
+    
+    log_callback({"progress": 100, "status": "done", "message": f"Successfully processed {len(structured_jobs)} completely structured jobs!"})
@@ -23,6 +23,7 @@ import requests                       # PyMuPDF / HTTP
 from google import genai
 from google.genai import types
 from config import GOOGLE_API
+from lib.clients import LazyClient, get_genai_client
 from pydantic import BaseModel, Field, ConfigDict
 from jinja2 import Environment, FileSystemLoader
 
@@ -240,7 +241,7 @@ class ResumeFacts(BaseModel):
 # ╭── Gemini setup ───────────────────────────────────────────────╮
 if not GOOGLE_API:
     raise ValueError("Set GOOGLE_API env var")
-client = genai.Client(api_key=GOOGLE_API)
+client = LazyClient(get_genai_client)
 model_1 = 'gemini-2.5-flash'
 model_2 = 'gemini-2.5-flash-lite'
 model_3 = "gemini-3.1-flash-lite"  # UNVERIFIED id — kept out of MODELS until confirmed valid
@@ -1,7 +1,9 @@
 import os
 import redis
+import redis.asyncio as aioredis
 from dotenv import load_dotenv
-from supabase import create_client
+
+from lib.clients import LazyClient, get_supabase_client
 
 load_dotenv()
 
@@ -19,23 +21,128 @@ GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 GCP_REGION = os.getenv("GCP_REGION", "asia-south1")
 WORKER_JOB_NAME = os.getenv("WORKER_JOB_NAME", "devhire-worker")
 DEV_MODE = os.getenv("DEV_MODE", "false").lower() == "true"
+# Shared secret for server-to-server calls from the Next.js API routes (sent as
+# X-Internal-Secret). Unset disables those endpoints rather than opening them.
+INTERNAL_API_SECRET = os.getenv("INTERNAL_API_SECRET")
+# How the API starts a worker: "cloudrun" (Cloud Run Job execution), "subprocess"
+# (local `python worker.py`) or "daemon" (enqueue for a warm `worker.py --daemon`).
+WORKER_BACKEND = os.getenv("WORKER_BACKEND", "subprocess" if DEV_MODE else "cloudrun").lower()
+
+# Built on first query; see lib/clients.py.
+supabase = LazyClient(get_supabase_client)
+
+# Sizing for the API process's async Redis pools (see init_async_redis).
+# Each stream-pool connection can be held for up to STREAM_BLOCK_MS. At most
+# these hold one at a time:
+#
+#   StreamHub                 1, one XREAD multiplexed over every watched job
+#   FreeQueueDispatcher       1, its wakeup BLPOP
+#   identity cache            1, its invalidation pub/sub subscription
+#   worker start latch        1 per launch waiting for its worker (up to 30s)
+#   SSE backfill              brief XRANGE / XREVRANGE pages
+#
+# So the pool bounds concurrent worker launches (~60 at the default), not
+# watched jobs. A request that finds it full waits REDIS_POOL_ACQUIRE_TIMEOUT
+# and then fails. /api/jobs/admin/stream-stats reports the pool size and a
+# best-effort count of connections in use.
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", "32"))
+REDIS_STREAM_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_STREAM_POOL_MAX_CONNECTIONS", "64"))
+REDIS_POOL_ACQUIRE_TIMEOUT = float(os.getenv("REDIS_POOL_ACQUIRE_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+# Upper bound for one blocking XREAD; the stream pool's socket timeout sits above it.
+STREAM_BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", "15000"))
+
+
+def _redis_kwargs() -> dict:
+    # `ssl_cert_reqs` is only valid for TLS (rediss://) connections. Passing it for a
+    # plain redis:// URL makes redis-py raise "unexpected keyword argument 'ssl_cert_reqs'"
+    # on every command — silently killing the heartbeat + SSE stream (worker.py swallows
+    # it). So only set it for the TLS scheme (e.g. Upstash rediss://).
+    redis_kwargs = {"decode_responses": True}
+    if REDIS_URL and REDIS_URL.startswith("rediss://"):
+        redis_kwargs["ssl_cert_reqs"] = "none"  # Upstash self-signed cert
+    return redis_kwargs
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Sync client: used by the worker process only. API handlers go through the
+# async pools below so a Redis round trip never blocks the event loop.
 redis_client = None
 if REDIS_URL:
     try:
-        # `ssl_cert_reqs` is only valid for TLS (rediss://) connections. Passing it for a
-        # plain redis:// URL makes redis-py raise "unexpected keyword argument 'ssl_cert_reqs'"
-        # on every command — silently killing the heartbeat + SSE stream (worker.py swallows
-        # it). So only set it for the TLS scheme (e.g. Upstash rediss://).
-        redis_kwargs = {"decode_responses": True}
-        if REDIS_URL.startswith("rediss://"):
-            redis_kwargs["ssl_cert_reqs"] = "none"  # Upstash self-signed cert
-        redis_client = redis.from_url(REDIS_URL, **redis_kwargs)
+        redis_client = redis.from_url(REDIS_URL, **_redis_kwargs())
     except Exception as e:
         print(f"Failed to initialize Redis client: {e}")
 
+# Async clients for the FastAPI process, created in main.main's lifespan.
+async_redis_client = None
+async_redis_stream_client = None
+
+
+def _build_async_redis(max_connections: int, socket_timeout: float):
+    pool = aioredis.BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=max_connections,
+        timeout=REDIS_POOL_ACQUIRE_TIMEOUT,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry_on_timeout=True,
+        **_redis_kwargs(),
+    )
+    return aioredis.Redis(connection_pool=pool)
+
+
+async def init_async_redis():
+    """Create the API's async Redis pools. Blocking XREADs get their own pool so
+    long-lived stream readers cannot starve short request/response commands."""
+    global async_redis_client, async_redis_stream_client
+    if not REDIS_URL:
+        return None
+    async_redis_client = _build_async_redis(REDIS_POOL_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT)
+    async_redis_stream_client = _build_async_redis(
+        REDIS_STREAM_POOL_MAX_CONNECTIONS,
+        STREAM_BLOCK_MS / 1000 + REDIS_SOCKET_TIMEOUT,
+    )
+    return async_redis_client
+
+
+async def close_async_redis():
+    global async_redis_client, async_redis_stream_client
+    for client in (async_redis_client, async_redis_stream_client):
+        if client:
+            await client.aclose()
+    async_redis_client = None
+    async_redis_stream_client = None
+
+
+def get_async_redis():
+    return async_redis_client
+
+
+def get_async_redis_stream():
+    return async_redis_stream_client
+
+
+def async_redis_pool_stats(client) -> dict:
+    """Connection usage of one of the async pools, for the admin stats routes."""
+    if not client:
+        return {"configured": False}
+    pool = client.connection_pool
+    # redis-py has no public checkout counters; these are read from pool
+    # internals, so they are reported as best-effort and None if renamed.
+    in_use = getattr(pool, "_in_use_connections", None)
+    idle = getattr(pool, "_available_connections", None)
+    return {
+        "configured": True,
+        "max_connections": pool.max_connections,
+        "best_effort": {
+            "in_use": len(in_use) if in_use is not None else None,
+            "idle": len(idle) if idle is not None else None,
+        },
+    }
+
 # Normalise the Playwright context creation parameters so every context uses
 # identical characteristics. LinkedIn is sensitive to user-agent, locale and
 # timezone mismatches, so keeping these consistent prevents forced logouts.
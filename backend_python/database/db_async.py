@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+
+# supabase-py is synchronous: every `.execute()` is a blocking PostgREST round
+# trip. Async route handlers must not call it directly, so they go through
+# `db_call`, which runs the query on a bounded thread pool with a per-call
+# timeout and records latency per call name.
+
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "16"))
+DB_CALL_TIMEOUT = float(os.getenv("DB_CALL_TIMEOUT", "10"))
+_LATENCY_SAMPLES = 256
+
+T = TypeVar("T")
+
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="supabase")
+
+
+class DBTimeoutError(TimeoutError):
+    """A Supabase call exceeded its timeout. The worker thread may still finish it."""
+
+
+class _CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=_LATENCY_SAMPLES)
+
+    def record(self, elapsed_ms: float):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+_stats: Dict[str, _CallStats] = {}
+
+
+async def db_call(name: str, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+    """Run a blocking Supabase call off the event loop.
+
+    `name` labels the call in `db_stats()`; `fn` is a zero-arg callable, usually
+    a lambda wrapping a query chain ending in `.execute()`.
+    """
+    stats = _stats.setdefault(name, _CallStats())
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_executor, fn),
+            timeout=timeout or DB_CALL_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        stats.timeouts += 1
+        raise DBTimeoutError(f"Database call '{name}' timed out")
+    except Exception:
+        stats.errors += 1
+        raise
+    finally:
+        stats.record((time.perf_counter() - started) * 1000)
+
+
+def db_stats() -> dict:
+    return {
+        "max_workers": DB_MAX_WORKERS,
+        "timeout_seconds": DB_CALL_TIMEOUT,
+        "calls": {name: stats.snapshot() for name, stats in sorted(_stats.items())},
+    }
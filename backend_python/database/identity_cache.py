@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import supabase, get_async_redis, get_async_redis_stream
+from database.db_async import db_call
+
+# Routes identify callers by email or by User UUID, and each lookup used to cost
+# up to two PostgREST calls. Resolved identities are cached here: first an
+# in-process LRU, then an optional shared Redis tier so every API instance
+# benefits. Entries are short-lived and dropped explicitly whenever a route
+# writes to the row (store_cookie, logout, tier/connection changes).
+#
+# An invalidation deletes the Redis entries and publishes the aliases on
+# IDENTITY_INVALIDATE_CHANNEL. Every API instance runs a listener (started in
+# main.main's lifespan) that drops them from its own LRU. Messages published
+# while a listener is disconnected are lost. So the LRU is cleared on every
+# (re)subscribe and bypassed while the listener is down; lookups then go to
+# Redis, which is always current.
+
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "60"))
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "2048"))
+IDENTITY_SHARED_CACHE = os.getenv("IDENTITY_SHARED_CACHE", "true").lower() == "true"
+
+_IDENTITY_COLUMNS = 'id, email, tier, "isConnected"'
+
+IDENTITY_INVALIDATE_CHANNEL = "identity:invalidate"
+
+_local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_counters = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0, "remote_invalidations": 0}
+_listener: Optional[asyncio.Task] = None
+_subscribed = False
+
+
+def _redis_key(identifier: str) -> str:
+    return f"identity:{identifier}"
+
+
+def _local_usable() -> bool:
+    # Without the shared tier there is no other instance to hear from.
+    return _subscribed or not IDENTITY_SHARED_CACHE or not get_async_redis()
+
+
+def _local_get(identifier: str) -> Optional[Dict[str, Any]]:
+    if not _local_usable():
+        return None
+    entry = _local.get(identifier)
+    if entry is None:
+        return None
+    expires_at, user = entry
+    if expires_at < time.monotonic():
+        _local.pop(identifier, None)
+        return None
+    _local.move_to_end(identifier)
+    return user
+
+
+def _local_put(user: Dict[str, Any]):
+    expires_at = time.monotonic() + IDENTITY_CACHE_TTL
+    for alias in _aliases(user):
+        _local[alias] = (expires_at, user)
+        _local.move_to_end(alias)
+    while len(_local) > IDENTITY_CACHE_SIZE:
+        _local.popitem(last=False)
+
+
+def _aliases(user: Dict[str, Any]) -> list:
+    return [str(value) for value in (user.get("id"), user.get("email")) if value]
+
+
+async def _shared_get(identifier: str) -> Optional[Dict[str, Any]]:
+    redis = get_async_redis()
+    if not IDENTITY_SHARED_CACHE or not redis:
+        return None
+    try:
+        raw = await redis.get(_redis_key(identifier))
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        print(f"Identity cache read error: {e}")
+        return None
+
+
+async def _shared_put(user: Dict[str, Any]):
+    redis = get_async_redis()
+    if not IDENTITY_SHARED_CACHE or not redis:
+        return
+    try:
+        payload = json.dumps(user)
+        async with redis.pipeline(transaction=False) as pipe:
+            for alias in _aliases(user):
+                pipe.set(_redis_key(alias), payload, ex=IDENTITY_CACHE_TTL)
+            await pipe.execute()
+    except Exception as e:
+        print(f"Identity cache write error: {e}")
+
+
+async def resolve_user(identifier: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve an email or User UUID to {"id", "email", "tier", "isConnected"}.
+    Returns None when no such user exists (misses are not cached).
+    """
+    if not identifier:
+        return None
+
+    user = _local_get(identifier)
+    if user is not None:
+        _counters["local_hits"] += 1
+        return user
+
+    user = await _shared_get(identifier)
+    if user is not None:
+        _counters["shared_hits"] += 1
+        _local_put(user)
+        return user
+
+    _counters["misses"] += 1
+    res = await db_call("users.by_email", lambda: supabase.table("User").select(_IDENTITY_COLUMNS).eq("email", identifier).execute())
+    if not res.data:
+        res = await db_call("users.by_id", lambda: supabase.table("User").select(_IDENTITY_COLUMNS).eq("id", identifier).execute())
+        if not res.data:
+            return None
+
+    row = res.data[0]
+    user = {
+        "id": str(row["id"]),
+        "email": row.get("email"),
+        "tier": row.get("tier") or "FREE",
+        "isConnected": bool(row.get("isConnected", False)),
+    }
+    _local_put(user)
+    await _shared_put(user)
+    return user
+
+
+async def invalidate_user(identifier: str):
+    """Drop a cached identity (and its email/UUID alias) locally and in Redis."""
+    if not identifier:
+        return
+
+    _counters["invalidations"] += 1
+    aliases = {identifier}
+    cached = _local_get(identifier) or await _shared_get(identifier)
+    if cached:
+        aliases.update(_aliases(cached))
+
+    for alias in aliases:
+        _local.pop(alias, None)
+
+    redis = get_async_redis()
+    if IDENTITY_SHARED_CACHE and redis:
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.delete(*[_redis_key(alias) for alias in aliases])
+                pipe.publish(IDENTITY_INVALIDATE_CHANNEL, json.dumps(sorted(aliases)))
+                await pipe.execute()
+        except Exception as e:
+            print(f"Identity cache invalidation error: {e}")
+
+
+async def _listen_for_invalidations():
+    global _subscribed
+    while True:
+        redis = get_async_redis_stream()
+        if not redis:
+            return
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(IDENTITY_INVALIDATE_CHANNEL)
+            # Anything published while we were not subscribed was missed.
+            _local.clear()
+            _subscribed = True
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if not message:
+                    continue
+                try:
+                    aliases = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                _counters["remote_invalidations"] += 1
+                for alias in aliases:
+                    _local.pop(str(alias), None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Identity invalidation listener error: {e}")
+        finally:
+            _subscribed = False
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+        await asyncio.sleep(1)
+
+
+def start_invalidation_listener():
+    """Subscribe this instance's LRU to invalidations published by the others."""
+    global _listener
+    if not IDENTITY_SHARED_CACHE or not get_async_redis_stream():
+        return
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_invalidation_listener():
+    global _listener
+    if _listener:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
+
+
+def identity_cache_stats() -> dict:
+    return {
+        "entries": len(_local),
+        "ttl_seconds": IDENTITY_CACHE_TTL,
+        "shared": IDENTITY_SHARED_CACHE,
+        "listening": _subscribed,
+        **_counters,
+    }
@@ -0,0 +1,81 @@
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+from lib.job_stream import STREAM_TTL_SECONDS
+
+# Gemini results for a fetch_jobs session, persisted per job URL as each batch
+# completes so a resumed worker never pays for the same analysis twice.
+#
+#   analysis:{job_id}   HASH  job url -> {"hash": payload hash, "job": result}
+#
+# Results are looked up per URL, so a job is reused whichever batch it lands in
+# on the next run. Streamed batches mix cards from several titles, and jobs of
+# a re-searched title are fetched again. The payload hash leaves out the
+# per-fetch `job_id`, so a re-fetched but unchanged job still matches; a
+# changed description is analysed again. Only real Gemini results are stored.
+# Fallback rows built after a failed batch are not, so a resume retries them.
+
+ANALYSIS_TTL_SECONDS = STREAM_TTL_SECONDS
+
+# Raw payload fields that differ on every fetch of the same job.
+_VOLATILE_FIELDS = ("job_id",)
+
+
+def analysis_key(job_id: str) -> str:
+    return f"analysis:{job_id}"
+
+
+def payload_hash(payload) -> str:
+    if isinstance(payload, dict):
+        payload = {k: v for k, v in payload.items() if k not in _VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def save_results(client, job_id: str, batch: Dict[str, object], jobs: List[dict]):
+    """Store each result of `batch` (url -> raw payload) under its job URL."""
+    entries = {
+        job["job_url"]: json.dumps({"hash": payload_hash(batch[job["job_url"]]), "job": job})
+        for job in jobs
+        if isinstance(job, dict) and job.get("job_url") in batch
+    }
+    if not entries:
+        return
+    pipe = client.pipeline(transaction=False)
+    pipe.hset(analysis_key(job_id), mapping=entries)
+    pipe.expire(analysis_key(job_id), ANALYSIS_TTL_SECONDS)
+    pipe.execute()
+
+
+def load(client, job_id: str) -> Dict[str, dict]:
+    """Every stored result for the session: url -> {"hash", "job"}."""
+    stored = {}
+    for url, raw in (client.hgetall(analysis_key(job_id)) or {}).items():
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            continue
+        if isinstance(entry, dict) and "hash" in entry and isinstance(entry.get("job"), dict):
+            stored[url] = entry
+    return stored
+
+
+def split_cached(stored: Dict[str, dict], pending: Dict[str, object]) -> Tuple[List[dict], Dict[str, object]]:
+    """
+    Split `pending` (url -> raw payload) into stored results that still match
+    their payload and the URLs still to analyse. Returns (reused jobs, remaining).
+    """
+    reused: List[dict] = []
+    remaining: Dict[str, object] = {}
+    for url, payload in pending.items():
+        entry = stored.get(url)
+        if entry and entry["hash"] == payload_hash(payload):
+            reused.append(entry["job"])
+        else:
+            remaining[url] = payload
+    return reused, remaining
+
+
+def clear(client, job_id: Optional[str]):
+    if job_id:
+        client.delete(analysis_key(job_id))
@@ -0,0 +1,71 @@
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Worker cold-start breakdown. worker.py marks each boot stage (imports, DB
+# fetch, session update/latch, preload, agent imports) and publishes the
+# summary to the job's stream as a `boot_profile` event before the pipeline
+# starts; later one-off stages such as the Chromium launch are logged and
+# published as they happen. Under `worker.py --daemon` the profiler is reset
+# per job, so warm boots show up with near-zero import stages.
+
+_T0 = time.perf_counter()
+
+
+def _process_age_ms() -> Optional[int]:
+    """Milliseconds since this process was exec'd (Linux only), to cover interpreter startup."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return int((uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000)
+    except Exception:
+        return None
+
+
+class BootProfiler:
+    def __init__(self):
+        self._emit: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.reset(_T0)
+        age = _process_age_ms()
+        if age is not None:
+            # Time spent before this module was imported (interpreter + site-packages).
+            self.stages.append({"stage": "interpreter", "ms": max(0, age - int((time.perf_counter() - _T0) * 1000)), "at_ms": 0})
+
+    def reset(self, t0: Optional[float] = None):
+        self._t0 = t0 if t0 is not None else time.perf_counter()
+        self._last = self._t0
+        self.stages: List[Dict[str, Any]] = []
+        self._emit = None
+
+    def mark(self, stage: str):
+        """Close `stage`: its duration is the time since the previous mark."""
+        now = time.perf_counter()
+        self._add(stage, (now - self._last) * 1000, now)
+        self._last = now
+
+    def record(self, stage: str, ms: float):
+        """Add a stage measured elsewhere (e.g. Chromium launch) without moving the mark."""
+        self._add(stage, ms, time.perf_counter())
+        if self._emit:
+            try:
+                self._emit({"status": "boot_profile", "stage": stage, "ms": round(ms)})
+            except Exception:
+                pass
+
+    def _add(self, stage: str, ms: float, now: float):
+        entry = {"stage": stage, "ms": round(ms), "at_ms": round((now - self._t0) * 1000)}
+        self.stages.append(entry)
+        print(f"⏱️ boot {stage}: {entry['ms']}ms (t+{entry['at_ms']}ms)")
+
+    def total_ms(self) -> int:
+        return round((self._last - self._t0) * 1000) + sum(s["ms"] for s in self.stages if s["stage"] == "interpreter")
+
+    def publish(self, emit: Callable[[Dict[str, Any]], None]):
+        """Send the summary so far and route later `record()` stages to `emit`."""
+        self._emit = emit
+        emit({"status": "boot_profile", "total_ms": self.total_ms(), "stages": list(self.stages)})
+
+
+boot_profiler = BootProfiler()
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, List, Optional, TypeVar
+
+from playwright.async_api import async_playwright
+
+from lib.boot_profile import boot_profiler
+
+# Where worker pipelines get their event loop and Chromium from.
+#
+# A one-shot worker (`python worker.py`) runs each pipeline on a fresh event loop
+# and launches/closes its own browser, as before. The warm daemon
+# (`python worker.py --daemon`) installs a WarmBrowserRuntime instead: one event
+# loop and one Chromium process live across jobs, and each job only gets its own
+# browser contexts, which are closed when the job "closes" its browser.
+
+CHROMIUM_LAUNCH_KWARGS = {
+    "headless": True,
+    "args": [
+        '--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu', '--no-zygote', '--disable-extensions', '--disable-background-networking', '--disable-renderer-backgrounding', '--no-first-run', '--mute-audio', '--metrics-recording-only'
+    ]
+}
+
+T = TypeVar("T")
+
+_runtime: Optional["WarmBrowserRuntime"] = None
+
+
+class _JobBrowser:
+    """
+    A job's view of the shared browser. Contexts it creates are tracked and
+    `close()` closes only those, so cookies/storage never leak between jobs.
+    """
+
+    def __init__(self, browser):
+        self._browser = browser
+        self._contexts: List[Any] = []
+
+    async def new_context(self, **kwargs):
+        context = await self._browser.new_context(**kwargs)
+        self._contexts.append(context)
+        return context
+
+    async def close(self):
+        contexts, self._contexts = self._contexts, []
+        for context in contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self._browser, name)
+
+
+class _JobPlaywright:
+    """Stands in for the Playwright driver handle; the daemon owns the real one."""
+
+    async def stop(self):
+        return None
+
+
+class WarmBrowserRuntime:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._playwright = None
+        self._browser = None
+        self.launches = 0
+
+    def run(self, coro: Awaitable[T]) -> T:
+        asyncio.set_event_loop(self.loop)
+        return self.loop.run_until_complete(coro)
+
+    async def browser(self):
+        if self._browser is None or not self._browser.is_connected():
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(**CHROMIUM_LAUNCH_KWARGS)
+            self.launches += 1
+        return self._browser
+
+    async def _shutdown(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = None
+        self._playwright = None
+
+    def close(self):
+        try:
+            self.run(self._shutdown())
+        finally:
+            self.loop.close()
+
+
+def install_runtime(runtime: Optional[WarmBrowserRuntime]):
+    global _runtime
+    _runtime = runtime
+
+
+def run_pipeline(make_coro: Callable[[], Awaitable[T]]) -> T:
+    """Run a pipeline coroutine on the warm loop, or on a fresh loop when there is none."""
+    if _runtime is not None:
+        return _runtime.run(make_coro())
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(make_coro())
+    finally:
+        loop.close()
+
+
+async def launch_chromium():
+    """
+    (playwright, browser) for one job. Callers keep their existing cleanup:
+    under the daemon `browser.close()` releases the job's contexts and
+    `playwright.stop()` is a no-op, leaving Chromium warm for the next job.
+    """
+    started = time.perf_counter()
+    if _runtime is None:
+        pw = await async_playwright().start()
+        browser = await pw.chromium.launch(**CHROMIUM_LAUNCH_KWARGS)
+    else:
+        pw, browser = _JobPlaywright(), _JobBrowser(await _runtime.browser())
+    boot_profiler.record("chromium_launch", (time.perf_counter() - started) * 1000)
+    return pw, browser
+
+
+@asynccontextmanager
+async def chromium_session():
+    pw, browser = await launch_chromium()
+    try:
+        yield browser
+    finally:
+        try:
+            await browser.close()
+        finally:
+            await pw.stop()
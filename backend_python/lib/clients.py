@@ -0,0 +1,37 @@
+from functools import lru_cache
+
+# Third-party clients are built on first use, not at import time. Importing the
+# API (or an agent module) should not pay for PostgREST/Gemini/Groq client
+# construction on every Cloud Run cold start. Modules keep their module-level
+# names (`supabase`, `client`) by binding them to a LazyClient.
+
+
+class LazyClient:
+    """Stand-in that builds the real client via `factory` on first attribute access."""
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+@lru_cache(maxsize=None)
+def get_supabase_client():
+    from supabase import create_client
+    from config import SUPABASE_URL, SUPABASE_KEY
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+@lru_cache(maxsize=None)
+def get_genai_client():
+    from google import genai
+    from config import GOOGLE_API
+    return genai.Client(api_key=GOOGLE_API)
+
+
+@lru_cache(maxsize=None)
+def get_groq_client():
+    from groq import Groq
+    from config import GROQ_API
+    return Groq(api_key=GROQ_API)
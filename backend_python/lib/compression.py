@@ -0,0 +1,147 @@
+import asyncio
+import gzip
+import os
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# gzip for API responses, as a plain ASGI middleware so its rules do not depend
+# on the installed Starlette version:
+#
+#   - only text-like media is compressed (JSON, HTML, text, XML, JS, SVG);
+#     images, PDFs, archives and anything already carrying Content-Encoding pass
+#     through untouched
+#   - text/event-stream is never compressed: SSE needs every event flushed as
+#     it is written, and gzip would buffer them
+#   - streamed bodies (more_body) and bodies under COMPRESS_MIN_BYTES pass
+#     through; large bodies are compressed off the event loop
+#   - a strong ETag gets a "-gzip" suffix, since the bytes differ from the
+#     identity encoding (lib/session_view.py accepts both forms)
+#   - a 304 answering a revalidation of the gzipped body carries the suffixed
+#     ETag too, so caches keep matching the representation they hold
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+COMPRESS_THREAD_MIN_BYTES = int(os.getenv("COMPRESS_THREAD_MIN_BYTES", str(256 * 1024)))
+
+_COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+_NEVER_COMPRESS = ("text/event-stream",)
+ETAG_GZIP_SUFFIX = "-gzip"
+
+
+def _is_compressible(media_type: str) -> bool:
+    if media_type in _NEVER_COMPRESS:
+        return False
+    return (
+        media_type.startswith("text/")
+        or media_type in _COMPRESSIBLE_TYPES
+        or media_type.endswith("+json")
+        or media_type.endswith("+xml")
+    )
+
+
+def _gzip_etag(etag: Optional[str]) -> Optional[str]:
+    if etag and etag.endswith('"') and not etag.startswith("W/") and not etag.endswith(ETAG_GZIP_SUFFIX + '"'):
+        return etag[:-1] + ETAG_GZIP_SUFFIX + '"'
+    return None
+
+
+def if_none_match_tags(if_none_match: Optional[str]) -> List[str]:
+    """The entity tags listed in an If-None-Match header, W/ prefixes dropped."""
+    tags = []
+    for candidate in (if_none_match or "").split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate:
+            tags.append(candidate)
+    return tags
+
+
+def identity_etag(etag: str) -> str:
+    """The tag of the identity encoding, for a tag this middleware may have suffixed."""
+    return etag.replace(ETAG_GZIP_SUFFIX + '"', '"')
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_BYTES, level: int = COMPRESS_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        if "gzip" not in request_headers.get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        pending: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal pending, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+                if message["status"] == 304:
+                    # The client revalidated a body we gzipped: echo the tag it holds.
+                    gzip_etag = _gzip_etag(headers.get("etag"))
+                    if gzip_etag and gzip_etag in if_none_match_tags(request_headers.get("if-none-match")):
+                        message["headers"] = list(message["headers"])
+                        not_modified = MutableHeaders(raw=message["headers"])
+                        not_modified["ETag"] = gzip_etag
+                        if "accept-encoding" not in not_modified.get("vary", "").lower():
+                            not_modified.add_vary_header("Accept-Encoding")
+                    passthrough = True
+                    await send(message)
+                elif (
+                    message["status"] in (204, 206)
+                    or "content-encoding" in headers
+                    or not _is_compressible(media_type)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held until the first body chunk shows whether it is worth compressing.
+                    pending = message
+                return
+
+            if passthrough or pending is None:
+                await send(message)
+                return
+
+            start, pending = pending, None
+            body = message.get("body", b"")
+            if message["type"] != "http.response.body" or message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= COMPRESS_THREAD_MIN_BYTES:
+                compressed = await asyncio.to_thread(gzip.compress, body, self.level, mtime=0)
+            else:
+                compressed = gzip.compress(body, self.level, mtime=0)
+
+            start["headers"] = list(start["headers"])
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = "gzip"
+            headers["Content-Length"] = str(len(compressed))
+            if "accept-encoding" not in headers.get("vary", "").lower():
+                headers.add_vary_header("Accept-Encoding")
+            gzip_etag = _gzip_etag(headers.get("etag"))
+            if gzip_etag:
+                headers["ETag"] = gzip_etag
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from lib.job_stream import (
+    SNAPSHOT_DONE_TTL_SECONDS,
+    SNAPSHOT_TTL_SECONDS,
+    STREAM_MAXLEN,
+    STREAM_TTL_SECONDS,
+    TERMINAL_STATUSES,
+    encode_event,
+    snapshot_key,
+    split_snapshot,
+    stream_key,
+)
+from lib.worker_fleet import touch as touch_worker
+
+# Worker-side progress writer. The scraper and applier emit events in bursts
+# (one per Gemini batch, one per applied job), and writing each one as its own
+# XADD + EXPIRE + heartbeat costs three round trips on the calling thread.
+# EventWriter buffers events and a background thread flushes them every few
+# milliseconds in a single pipeline: every XADD in emit order, then one EXPIRE
+# per touched stream and one fleet heartbeat ZADD per job. Job payloads are diverted
+# to the per-job snapshot hash (see split_snapshot in lib/job_stream.py).
+
+EVENT_FLUSH_INTERVAL_MS = int(os.getenv("EVENT_FLUSH_INTERVAL_MS", "25"))
+EVENT_FLUSH_MAX_BATCH = int(os.getenv("EVENT_FLUSH_MAX_BATCH", "200"))
+
+
+class EventWriter:
+    def __init__(self, client, flush_interval_ms: int = EVENT_FLUSH_INTERVAL_MS, max_batch: int = EVENT_FLUSH_MAX_BATCH):
+        self._client = client
+        self._interval = flush_interval_ms / 1000
+        self._max_batch = max_batch
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._in_flight = 0
+        self._flush_requested = False
+        self.stats = {"events": 0, "flushes": 0, "commands": 0, "errors": 0}
+
+    def emit(self, job_id: str, event: dict):
+        with self._cond:
+            if self._closed:
+                return
+            self._pending.append((job_id, event))
+            self._ensure_thread()
+            if len(self._pending) == 1 or len(self._pending) >= self._max_batch:
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything emitted so far is written (or `timeout` passes)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+                # Coalesce: give a burst a few ms to accumulate before writing.
+                deadline = time.monotonic() + self._interval
+                while not (self._flush_requested or self._closed) and len(self._pending) < self._max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = []
+                while self._pending and len(batch) < self._max_batch:
+                    batch.append(self._pending.popleft())
+                self._in_flight = len(batch)
+                if not self._pending:
+                    self._flush_requested = False
+
+            try:
+                self._write(batch)
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
+
+    def _write(self, batch):
+        pipe = self._client.pipeline(transaction=True)
+        job_ids = []
+        snapshot_ttl = {}
+        for job_id, event in batch:
+            event, batch_num, jobs = split_snapshot(event)
+            if jobs is not None:
+                # HSET precedes the XADD so the batch is readable by the time a
+                # client sees its notice.
+                pipe.hset(snapshot_key(job_id), str(batch_num), json.dumps(jobs))
+                snapshot_ttl.setdefault(job_id, SNAPSHOT_TTL_SECONDS)
+            if event.get("status") in TERMINAL_STATUSES:
+                snapshot_ttl[job_id] = SNAPSHOT_DONE_TTL_SECONDS
+            pipe.xadd(stream_key(job_id), encode_event(event), maxlen=STREAM_MAXLEN, approximate=True)
+            if job_id not in job_ids:
+                job_ids.append(job_id)
+        now = time.time()
+        for job_id, ttl in snapshot_ttl.items():
+            pipe.expire(snapshot_key(job_id), ttl)
+        for job_id in job_ids:
+            pipe.expire(stream_key(job_id), STREAM_TTL_SECONDS)
+            # Heartbeat is used by /api/jobs/start to detect stale active sessions.
+            touch_worker(pipe, job_id, now)
+        commands = len(pipe)
+        try:
+            pipe.execute()
+            self.stats["events"] += len(batch)
+            self.stats["flushes"] += 1
+            self.stats["commands"] += commands
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Redis log error: {e}")
@@ -0,0 +1,297 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from lib.phase_metrics import record_phase
+
+# Free-tier jobs share one dummy LinkedIn account, so only one of them may be in
+# its Playwright phase at a time. This module owns that serialization:
+#
+#   free_users_queue      LIST  job ids waiting for the account (FIFO)
+#   free_queue_inflight   ZSET  claimed job id -> visibility deadline (ms); the
+#                               worker acks on boot, otherwise the claim is
+#                               re-queued once the deadline passes
+#   dummy_account_lock    STR   lease: the job id holding the account. Renewed by
+#                               the worker heartbeat, so it expires ~a minute
+#                               after a worker dies instead of after 30 minutes
+#   free_queue_next_at    STR   earliest claim time (ms) after a release (pacing)
+#   free_queue_wakeup     LIST  poked on release to wake the dispatcher
+#
+# Claim, renew, release and nack are Lua scripts so concurrent API instances and
+# workers never race on the lease. The API runs a FreeQueueDispatcher that claims
+# the next job as soon as the lease is released (or lapses) and pacing allows.
+
+QUEUE_KEY = "free_users_queue"
+INFLIGHT_KEY = "free_queue_inflight"
+ATTEMPTS_KEY = "free_queue_attempts"
+LEASE_KEY = "dummy_account_lock"
+LEASE_STARTED_KEY = "dummy_account_lock:started_at"
+STATUS_KEY = "free_queue_status"
+NEXT_AT_KEY = "free_queue_next_at"
+WAKEUP_KEY = "free_queue_wakeup"
+
+FREE_LEASE_TTL_SECONDS = int(os.getenv("FREE_LEASE_TTL_SECONDS", "60"))
+FREE_QUEUE_VISIBILITY_SECONDS = int(os.getenv("FREE_QUEUE_VISIBILITY_SECONDS", "180"))
+FREE_QUEUE_MAX_ATTEMPTS = int(os.getenv("FREE_QUEUE_MAX_ATTEMPTS", "3"))
+# Gap between one job releasing the account and the next one claiming it.
+FREE_QUEUE_PACING_MIN_SECONDS = float(os.getenv("FREE_QUEUE_PACING_MIN_SECONDS", "25"))
+FREE_QUEUE_PACING_MAX_SECONDS = float(os.getenv("FREE_QUEUE_PACING_MAX_SECONDS", "45"))
+# Lease hold time assumed until the lease_hold histogram has samples.
+FREE_QUEUE_DEFAULT_HOLD_SECONDS = 215
+
+_CLAIM_LUA = """
+local now = tonumber(ARGV[1])
+-- Re-queue claims whose worker never acked, oldest first at the head.
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for i = #expired, 1, -1 do
+    redis.call('ZREM', KEYS[2], expired[i])
+    if redis.call('GET', KEYS[3]) == expired[i] then
+        redis.call('DEL', KEYS[3])
+    end
+    redis.call('LPUSH', KEYS[1], expired[i])
+end
+if redis.call('GET', KEYS[4]) == 'paused' then
+    return {'paused', ''}
+end
+local holder = redis.call('GET', KEYS[3])
+if holder then
+    return {'leased', tostring(redis.call('PTTL', KEYS[3]))}
+end
+local next_at = tonumber(redis.call('GET', KEYS[5]) or '0')
+if next_at > now then
+    return {'pacing', tostring(next_at - now)}
+end
+local job_id = redis.call('LPOP', KEYS[1])
+if not job_id then
+    return {'empty', ''}
+end
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), job_id)
+redis.call('SET', KEYS[3], job_id, 'PX', ARGV[2])
+redis.call('SET', KEYS[6], ARGV[1], 'PX', 3600000)
+return {'claimed', job_id}
+"""
+
+_RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LUA = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+local started = redis.call('GET', KEYS[5]) or ''
+redis.call('DEL', KEYS[1], KEYS[5])
+redis.call('SET', KEYS[3], ARGV[2], 'PX', ARGV[3])
+redis.call('RPUSH', KEYS[4], '1')
+redis.call('LTRIM', KEYS[4], -1, -1)
+return {1, started}
+"""
+
+_NACK_LUA = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+if redis.call('GET', KEYS[3]) == ARGV[1] then
+    redis.call('DEL', KEYS[3])
+end
+local attempts = redis.call('HINCRBY', KEYS[4], ARGV[1], 1)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('HDEL', KEYS[4], ARGV[1])
+    return -1
+end
+redis.call('LPUSH', KEYS[1], ARGV[1])
+return attempts
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _pacing_ms() -> int:
+    low, high = sorted((FREE_QUEUE_PACING_MIN_SECONDS, FREE_QUEUE_PACING_MAX_SECONDS))
+    return int(random.uniform(low, high) * 1000)
+
+
+# ---------------------------------------------------------------------------
+# Worker side (sync client)
+# ---------------------------------------------------------------------------
+
+def ack_claim(client, job_id: str):
+    """Called once the worker has booted: the claim no longer needs re-queueing."""
+    pipe = client.pipeline(transaction=False)
+    pipe.zrem(INFLIGHT_KEY, job_id)
+    pipe.hdel(ATTEMPTS_KEY, job_id)
+    # A claim that was re-queued while this worker was still booting must not run twice.
+    pipe.lrem(QUEUE_KEY, 0, job_id)
+    pipe.execute()
+
+
+def renew_lease(client, job_id: str) -> bool:
+    """Extend the lease if `job_id` still holds it (called with the worker heartbeat)."""
+    return bool(client.eval(_RENEW_LUA, 1, LEASE_KEY, job_id, FREE_LEASE_TTL_SECONDS * 1000))
+
+
+def release_lease(client, job_id: str) -> bool:
+    """
+    Hand the account to the next queued job. A no-op unless `job_id` holds the
+    lease, so it is safe to call from every exit path.
+    """
+    pacing = _pacing_ms()
+    now = _now_ms()
+    result = client.eval(
+        _RELEASE_LUA, 5,
+        LEASE_KEY, INFLIGHT_KEY, NEXT_AT_KEY, WAKEUP_KEY, LEASE_STARTED_KEY,
+        job_id, now + pacing, pacing + 60_000,
+    )
+    if not result:
+        return False
+
+    print(f"🔓 Released free-tier lease for job {job_id}; next claim in {pacing / 1000:.0f}s")
+    started_ms = result[1]
+    if started_ms:
+        record_phase(client, "lease_hold", (now - int(started_ms)) / 1000)
+    return True
+
+
+def pause_queue(client):
+    client.set(STATUS_KEY, "paused")
+
+
+def estimate_queue_wait(
+    position: int,
+    hold_stats: Optional[Dict[str, float]],
+    lease_elapsed: Optional[float] = None,
+    pacing_remaining: float = 0.0,
+) -> Dict[str, int]:
+    """
+    Seconds until the job at 1-based `position` claims the account, at the
+    median (`seconds`) and 90th percentile (`p90_seconds`) lease hold time.
+    `lease_elapsed` is how long the current holder has had the lease (None if
+    free); `pacing_remaining` is the time left before the next claim is allowed.
+    """
+    pacing = (FREE_QUEUE_PACING_MIN_SECONDS + FREE_QUEUE_PACING_MAX_SECONDS) / 2
+
+    def total(hold: float) -> int:
+        if lease_elapsed is not None:
+            current = max(0.0, hold - lease_elapsed) + pacing
+        else:
+            current = pacing_remaining
+        return int(current + max(0, position - 1) * (hold + pacing))
+
+    p50 = hold_stats["p50_s"] if hold_stats else FREE_QUEUE_DEFAULT_HOLD_SECONDS
+    p90 = hold_stats["p90_s"] if hold_stats else FREE_QUEUE_DEFAULT_HOLD_SECONDS
+    return {"seconds": total(p50), "p90_seconds": total(p90)}
+
+
+# ---------------------------------------------------------------------------
+# API side (async client)
+# ---------------------------------------------------------------------------
+
+class FreeQueueDispatcher:
+    """
+    Claims queued free-tier jobs and launches their workers. `dispatch()` makes a
+    single attempt (used by /start, /trigger-next-queue and unpause); `start()`
+    runs a loop that sleeps until a release, the pacing deadline or the lease
+    expiry, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Any],
+        get_blocking_client: Callable[[], Any],
+        launch: Callable[[str], Awaitable[None]],
+        on_give_up: Callable[[str, Exception], Awaitable[None]],
+        on_advance: Optional[Callable[[], Awaitable[None]]] = None,
+        max_wait_seconds: float = 10.0,
+    ):
+        self._get_client = get_client
+        self._get_blocking_client = get_blocking_client
+        self._launch = launch
+        self._on_give_up = on_give_up
+        self._on_advance = on_advance
+        self._max_wait = max_wait_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"claimed": 0, "launch_failures": 0, "gave_up": 0}
+
+    async def dispatch(self) -> Dict[str, Any]:
+        client = self._get_client()
+        if not client:
+            return {"status": "error", "message": "Redis not configured"}
+
+        status, value = await client.eval(
+            _CLAIM_LUA, 6,
+            QUEUE_KEY, INFLIGHT_KEY, LEASE_KEY, STATUS_KEY, NEXT_AT_KEY, LEASE_STARTED_KEY,
+            _now_ms(), FREE_QUEUE_VISIBILITY_SECONDS * 1000,
+        )
+        if status != "claimed":
+            result: Dict[str, Any] = {"status": status}
+            if value:
+                result["wait_ms"] = int(value)
+            return result
+
+        job_id = value
+        self._counters["claimed"] += 1
+        try:
+            await self._launch(job_id)
+            result = {"status": "triggered", "job_id": job_id}
+        except Exception as e:
+            self._counters["launch_failures"] += 1
+            attempts = await client.eval(
+                _NACK_LUA, 4,
+                QUEUE_KEY, INFLIGHT_KEY, LEASE_KEY, ATTEMPTS_KEY,
+                job_id, FREE_QUEUE_MAX_ATTEMPTS,
+            )
+            if attempts == -1:
+                self._counters["gave_up"] += 1
+                await self._on_give_up(job_id, e)
+            result = {"status": "error", "job_id": job_id, "message": str(e)}
+
+        # The head moved: everyone still waiting gets a new position/ETA.
+        if self._on_advance:
+            try:
+                await self._on_advance()
+            except Exception as e:
+                print(f"Queue position broadcast error: {e}")
+        return result
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": bool(self._task and not self._task.done()), **self._counters}
+
+    async def _run(self):
+        while True:
+            wait = self._max_wait
+            try:
+                result = await self.dispatch()
+                if result["status"] == "triggered":
+                    continue
+                if "wait_ms" in result:
+                    # +50ms so the lease/pacing deadline has passed when we retry.
+                    wait = min(self._max_wait, max(0.05, (result["wait_ms"] + 50) / 1000))
+                client = self._get_blocking_client()
+                if client:
+                    await client.blpop([WAKEUP_KEY], timeout=wait)
+                else:
+                    await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Free queue dispatcher error: {e}")
+                await asyncio.sleep(wait)
@@ -0,0 +1,175 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+# Politeness limits for scraper traffic, shared by everything one run sends to
+# a host (Playwright page navigations and aiohttp description fetches alike).
+# Per host, at most SCRAPER_HOST_MAX_CONCURRENT requests are in flight and
+# request starts come from a token bucket (SCRAPER_HOST_BURST deep) whose
+# refill rate adapts AIMD-style:
+#
+#   healthy response           rate += SCRAPER_HOST_RATE_STEP (up to MAX_RATE)
+#   429 / 999 / 503 / timeout  rate *= SCRAPER_HOST_BACKOFF_FACTOR (down to
+#                              MIN_RATE) and the host is paused for Retry-After
+#                              or SCRAPER_HOST_BACKOFF_MS, doubling while
+#                              throttles keep coming (up to _MAX_BACKOFF_MS)
+#
+# A burst of throttles from requests that were already in flight cuts the rate
+# only once. Callers flag a throttled response on the lease the slot yields; a
+# timeout escaping the slot counts as one automatically. stats() reports each
+# host's current rate and the time spent waiting and backing off. Create one
+# limiter per run, inside the event loop that uses it.
+
+SCRAPER_HOST_MAX_CONCURRENT = int(os.getenv("SCRAPER_HOST_MAX_CONCURRENT", "4"))
+SCRAPER_HOST_START_RATE = float(os.getenv("SCRAPER_HOST_START_RATE", "2.5"))
+SCRAPER_HOST_MIN_RATE = float(os.getenv("SCRAPER_HOST_MIN_RATE", "0.2"))
+SCRAPER_HOST_MAX_RATE = float(os.getenv("SCRAPER_HOST_MAX_RATE", "8"))
+SCRAPER_HOST_RATE_STEP = float(os.getenv("SCRAPER_HOST_RATE_STEP", "0.25"))
+SCRAPER_HOST_BACKOFF_FACTOR = float(os.getenv("SCRAPER_HOST_BACKOFF_FACTOR", "0.5"))
+SCRAPER_HOST_BACKOFF_MS = int(os.getenv("SCRAPER_HOST_BACKOFF_MS", "2000"))
+SCRAPER_HOST_BURST = float(os.getenv("SCRAPER_HOST_BURST", "2"))
+
+_MAX_BACKOFF_MS = 60_000
+
+# HTTP statuses that mean "slow down" (999 is LinkedIn's rate-limit response).
+THROTTLE_STATUSES = frozenset({429, 503, 999})
+
+
+def is_timeout(exc: BaseException) -> bool:
+    # Playwright's TimeoutError is not a builtin TimeoutError subclass.
+    return isinstance(exc, TimeoutError) or type(exc).__name__ == "TimeoutError"
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to the computed backoff
+
+
+class _HostState:
+    def __init__(self, max_concurrent: int, rate: float, burst: float):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.lock = asyncio.Lock()
+        self.rate = rate
+        self.tokens = min(1.0, burst)
+        self.refilled_at = 0.0
+        self.blocked_until = 0.0
+        self.decreased_at = float("-inf")
+        self.streak = 0
+        self.requests = 0
+        self.throttled = 0
+        self.waited_s = 0.0
+        self.backoff_s = 0.0
+
+
+class Lease:
+    """Yielded by HostRateLimiter.slot(); flag a throttled response on it."""
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.throttled = False
+        self.retry_after: Optional[float] = None
+
+    def throttle(self, retry_after: Optional[float] = None):
+        self.throttled = True
+        self.retry_after = retry_after
+
+
+class HostRateLimiter:
+    def __init__(
+        self,
+        max_concurrent: int = SCRAPER_HOST_MAX_CONCURRENT,
+        start_rate: float = SCRAPER_HOST_START_RATE,
+        min_rate: float = SCRAPER_HOST_MIN_RATE,
+        max_rate: float = SCRAPER_HOST_MAX_RATE,
+        burst: float = SCRAPER_HOST_BURST,
+    ):
+        self._max_concurrent = max(1, max_concurrent)
+        self._min_rate = max(0.01, min_rate)
+        self._max_rate = max(self._min_rate, max_rate)
+        self._start_rate = min(self._max_rate, max(self._min_rate, start_rate))
+        self._burst = max(1.0, burst)
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, url: str) -> _HostState:
+        host = urlsplit(url).hostname or ""
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self._max_concurrent, self._start_rate, self._burst)
+            state.refilled_at = asyncio.get_running_loop().time()
+        return state
+
+    async def _take_token(self, state: _HostState, loop):
+        async with state.lock:
+            while True:
+                now = loop.time()
+                if now > state.refilled_at:
+                    state.tokens = min(self._burst, state.tokens + (now - state.refilled_at) * state.rate)
+                    state.refilled_at = now
+                wait = max(state.blocked_until - now, (1 - state.tokens) / state.rate)
+                if wait <= 0:
+                    state.tokens -= 1
+                    return
+                await asyncio.sleep(wait)
+
+    def _on_success(self, state: _HostState):
+        state.streak = 0
+        state.rate = min(self._max_rate, state.rate + SCRAPER_HOST_RATE_STEP)
+
+    def _on_throttle(self, state: _HostState, lease: Lease, now: float):
+        state.throttled += 1
+        if lease.started_at < state.decreased_at:
+            return  # already slowed down for this wave of requests
+        state.decreased_at = now
+        state.streak += 1
+        state.rate = max(self._min_rate, state.rate * SCRAPER_HOST_BACKOFF_FACTOR)
+        pause = lease.retry_after
+        if pause is None:
+            pause = min(_MAX_BACKOFF_MS, SCRAPER_HOST_BACKOFF_MS * 2 ** (state.streak - 1)) / 1000
+        until = now + pause
+        if until > state.blocked_until:
+            state.backoff_s += until - max(now, state.blocked_until)
+            state.blocked_until = until
+        # No tokens accrue while paused.
+        state.tokens = 0.0
+        state.refilled_at = state.blocked_until
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Hold one of the host's request slots for the duration of the block."""
+        state = self._state(url)
+        loop = asyncio.get_running_loop()
+        queued = loop.time()
+        async with state.semaphore:
+            await self._take_token(state, loop)
+            state.requests += 1
+            state.waited_s += loop.time() - queued
+            lease = Lease(loop.time())
+            try:
+                yield lease
+            except Exception as e:
+                if is_timeout(e):
+                    self._on_throttle(state, lease, loop.time())
+                raise
+            if lease.throttled:
+                self._on_throttle(state, lease, loop.time())
+            else:
+                self._on_success(state)
+
+    def backoff_seconds(self) -> float:
+        return round(sum(state.backoff_s for state in self._hosts.values()), 2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            host: {
+                "rate": round(state.rate, 2),
+                "requests": state.requests,
+                "throttled": state.throttled,
+                "waited_s": round(state.waited_s, 2),
+                "backoff_s": round(state.backoff_s, 2),
+            }
+            for host, state in self._hosts.items()
+        }
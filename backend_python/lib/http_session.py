@@ -0,0 +1,55 @@
+import os
+from typing import Dict, Optional
+
+import aiohttp
+
+from lib.host_limiter import SCRAPER_HOST_MAX_CONCURRENT
+
+# One aiohttp session per scrape run for the job-description fetches, instead
+# of one per title. The connector keeps idle connections open between fetches,
+# so TCP and TLS setup is paid once per connection rather than once per URL. It
+# also caches DNS answers for the whole run. It caps sockets in total and per
+# host; the per-host cap matches the host limiter's in-flight limit, so the
+# pool never opens connections the limiter wouldn't let us use. Build the
+# session inside the event loop that uses it and close it when the run ends.
+
+SCRAPER_HTTP_POOL_SIZE = int(os.getenv("SCRAPER_HTTP_POOL_SIZE", "16"))
+SCRAPER_DNS_TTL_SECONDS = int(os.getenv("SCRAPER_DNS_TTL_SECONDS", "300"))
+SCRAPER_KEEPALIVE_SECONDS = float(os.getenv("SCRAPER_KEEPALIVE_SECONDS", "30"))
+SCRAPER_HTTP_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_HTTP_TIMEOUT_SECONDS", "30"))
+
+SCRAPER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+def _trace(stats: Dict[str, int]) -> aiohttp.TraceConfig:
+    def counter(name):
+        async def bump(session, ctx, params):
+            stats[name] = stats.get(name, 0) + 1
+        return bump
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(counter("requests"))
+    trace.on_connection_create_end.append(counter("new_connections"))
+    trace.on_connection_reuseconn.append(counter("reused_connections"))
+    trace.on_dns_resolvehost_end.append(counter("dns_lookups"))
+    trace.on_dns_cache_hit.append(counter("dns_cache_hits"))
+    return trace
+
+
+def scraper_http_session(stats: Optional[Dict[str, int]] = None) -> aiohttp.ClientSession:
+    """Pooled session for scraper fetches; pass `stats` to have it count connection reuse."""
+    connector = aiohttp.TCPConnector(
+        limit=max(1, SCRAPER_HTTP_POOL_SIZE),
+        limit_per_host=max(1, SCRAPER_HOST_MAX_CONCURRENT),
+        use_dns_cache=True,
+        ttl_dns_cache=SCRAPER_DNS_TTL_SECONDS,
+        keepalive_timeout=SCRAPER_KEEPALIVE_SECONDS,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=SCRAPER_HEADERS,
+        timeout=aiohttp.ClientTimeout(total=SCRAPER_HTTP_TIMEOUT_SECONDS),
+        trace_configs=[_trace(stats)] if stats is not None else None,
+    )
@@ -0,0 +1,96 @@
+import os
+import json
+
+# Every job gets one Redis Stream (`stream:{job_id}`). The worker XADDs progress
+# events to it and the API XREADs them for SSE. Each entry stores the JSON event
+# under a single `data` field, and its stream ID is used as the SSE `id` so a
+# reconnecting browser resumes from `Last-Event-ID` instead of replaying the job.
+
+STREAM_MAXLEN = int(os.getenv("JOB_STREAM_MAXLEN", "1000"))
+STREAM_TTL_SECONDS = 86400
+
+# Stream ID meaning "from the very beginning" for XREAD / XRANGE.
+STREAM_START_ID = "0-0"
+
+TERMINAL_STATUSES = ("done", "error")
+
+# Structured jobs never go into the stream. A `batch_ready` event carrying
+# `jobs` is split: the jobs are written to the `snapshot:{job_id}` hash (one
+# field per batch number) and the stream only gets a small notice. Clients
+# fetch the snapshot once via /api/jobs/snapshot and then ask only for batches
+# newer than the last one they hold, so a reconnect replays a few hundred bytes
+# per batch instead of every job description scraped so far.
+SNAPSHOT_TTL_SECONDS = STREAM_TTL_SECONDS
+# Once a job finishes its result lives in workflow_sessions.output_data, so the
+# snapshot only needs to outlive clients that are still catching up.
+SNAPSHOT_DONE_TTL_SECONDS = int(os.getenv("JOB_SNAPSHOT_DONE_TTL", "3600"))
+
+
+# Start latch: each worker boot pushes one token to `worker_started:{job_id}` and
+# the API blocks on BLPOP for it instead of scanning the event stream.
+WORKER_STARTED_TTL_SECONDS = 300
+
+# Job ids for warm `worker.py --daemon` processes (WORKER_BACKEND=daemon).
+WORKER_QUEUE_KEY = "worker_jobs"
+
+# A worker whose heartbeat (lib/worker_fleet.py) is older than this is stale;
+# /api/jobs/start then treats its session as dead.
+WORKER_HEARTBEAT_TTL_SECONDS = 60
+
+
+def stream_key(job_id: str) -> str:
+    return f"stream:{job_id}"
+
+
+def worker_started_key(job_id: str) -> str:
+    return f"worker_started:{job_id}"
+
+
+def snapshot_key(job_id: str) -> str:
+    return f"snapshot:{job_id}"
+
+
+def last_snapshot_batch(client, job_id: str) -> int:
+    """
+    Highest batch number already in the job's snapshot (sync client). A resumed
+    worker numbers its batches after it, so clients holding the crashed run's
+    batches still see every new one as newer; they dedupe jobs by URL.
+    """
+    fields = client.hkeys(snapshot_key(job_id)) or []
+    return max((int(f) for f in fields if str(f).isdigit()), default=0)
+
+
+def split_snapshot(event: dict):
+    """
+    Split an event into (stream_event, batch_num, jobs). `jobs` is None when the
+    event carries no job payload and should be written to the stream unchanged.
+    """
+    jobs = event.get("jobs")
+    if not isinstance(jobs, list) or "batch_num" not in event:
+        return event, None, None
+    compact = {k: v for k, v in event.items() if k != "jobs"}
+    compact["job_count"] = len(jobs)
+    compact["snapshot"] = True
+    return compact, int(event["batch_num"]), jobs
+
+
+def encode_event(event: dict) -> dict:
+    """Fields for XADD."""
+    return {"data": json.dumps(event)}
+
+
+def decode_entry(fields) -> str:
+    """Return the raw JSON payload of a stream entry."""
+    if not fields:
+        return "{}"
+    return fields.get("data") or "{}"
+
+
+def is_terminal_event(payload: str) -> bool:
+    try:
+        ev_data = json.loads(payload)
+    except Exception:
+        return False
+    if not isinstance(ev_data, dict):
+        return False
+    return ev_data.get("status") in TERMINAL_STATUSES or ev_data.get("progress") == -1
@@ -0,0 +1,23 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+# App-wide JSON response class (FastAPI(default_response_class=...)). orjson
+# serializes the large payloads here (job lists, base64 PDFs/PNGs, portfolio
+# HTML) several times faster than json.dumps and emits compact bytes directly.
+# Falls back to the stdlib encoder, compact separators, when orjson is missing.
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,97 @@
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+# Rolling duration histograms for worker phases. Each sample increments one
+# bucket in an hourly hash (`phase_hist:{phase}:{hour}`) that expires after the
+# window, so memory is fixed per phase regardless of traffic. Readers sum the
+# last PHASE_METRICS_WINDOW_HOURS hashes and interpolate percentiles; the API
+# uses them for queue ETAs and /api/jobs/admin/phase-stats.
+
+PHASES = (
+    "login",          # Playwright browser + LinkedIn session ready
+    "title_search",   # one job title: search + card collection
+    "descriptions",   # description fetches for one scrape run
+    "analysis",       # all Gemini batches for a job
+    "lease_hold",     # free-tier claim -> lease release
+    "worker_boot",    # process start (or daemon job pickup) -> pipeline start
+    "rate_backoff",   # host-limiter backoff imposed during one scrape (429/999/timeouts)
+)
+
+# Bucket upper bounds in seconds; samples above the last land in "inf".
+BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 300, 450, 600, 900, 1200, 1800, 3600)
+
+PHASE_METRICS_WINDOW_HOURS = int(os.getenv("PHASE_METRICS_WINDOW_HOURS", "24"))
+_BUCKET_TTL_SECONDS = (PHASE_METRICS_WINDOW_HOURS + 1) * 3600
+
+
+def _hist_key(phase: str, hour: int) -> str:
+    return f"phase_hist:{phase}:{hour}"
+
+
+def _bucket_for(seconds: float) -> str:
+    for bound in BUCKETS:
+        if seconds <= bound:
+            return str(bound)
+    return "inf"
+
+
+def record_phase(client, phase: str, seconds: float):
+    """Add one duration sample (sync client; called from the worker)."""
+    key = _hist_key(phase, int(time.time() // 3600))
+    pipe = client.pipeline(transaction=False)
+    pipe.hincrby(key, _bucket_for(seconds), 1)
+    pipe.hincrbyfloat(key, "sum", round(seconds, 3))
+    pipe.expire(key, _BUCKET_TTL_SECONDS)
+    pipe.execute()
+
+
+def _percentile(counts: Dict[str, int], total: int, q: float) -> float:
+    """Linear interpolation inside the bucket holding the q-th sample."""
+    target = q * total
+    seen = 0
+    lower = 0.0
+    for bound in BUCKETS:
+        in_bucket = counts.get(str(bound), 0)
+        if in_bucket and seen + in_bucket >= target:
+            return round(lower + (bound - lower) * (target - seen) / in_bucket, 1)
+        seen += in_bucket
+        lower = float(bound)
+    return float(BUCKETS[-1])
+
+
+def summarize(hashes: Iterable[Dict[str, Any]]) -> Optional[Dict[str, float]]:
+    counts: Dict[str, int] = {}
+    total_seconds = 0.0
+    for h in hashes:
+        for field, value in (h or {}).items():
+            if field == "sum":
+                total_seconds += float(value)
+            else:
+                counts[field] = counts.get(field, 0) + int(value)
+    total = sum(counts.values())
+    if not total:
+        return None
+    return {
+        "count": total,
+        "mean_s": round(total_seconds / total, 1),
+        "p50_s": _percentile(counts, total, 0.50),
+        "p90_s": _percentile(counts, total, 0.90),
+        "p99_s": _percentile(counts, total, 0.99),
+    }
+
+
+async def phase_percentiles(client, phases: Iterable[str] = PHASES, window_hours: int = PHASE_METRICS_WINDOW_HOURS) -> Dict[str, Optional[Dict[str, float]]]:
+    """Per-phase count/mean/p50/p90/p99 over the rolling window (async client)."""
+    phases = list(phases)
+    hour = int(time.time() // 3600)
+    async with client.pipeline(transaction=False) as pipe:
+        for phase in phases:
+            for offset in range(window_hours):
+                pipe.hgetall(_hist_key(phase, hour - offset))
+        results = await pipe.execute()
+
+    return {
+        phase: summarize(results[i * window_hours:(i + 1) * window_hours])
+        for i, phase in enumerate(phases)
+    }
@@ -0,0 +1,117 @@
+import os
+import weakref
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Network filtering for Playwright pages. Search result pages and job pages
+# pull in images, fonts, video, ad/analytics beacons and third-party scripts
+# that none of our automation reads. On a small Cloud Run instance those cost
+# bandwidth, renderer CPU and page-load time. A RequestFilter installs a
+# page.route handler that aborts, in this order:
+#
+#   URLs matching PLAYWRIGHT_BLOCK_URL_PATTERNS       (first-party tracking)
+#   resource types in PLAYWRIGHT_BLOCK_RESOURCE_TYPES (image, media, font, ping)
+#   hosts outside PLAYWRIGHT_FIRST_PARTY_HOSTS        (third parties)
+#
+# Main-frame navigations are never blocked. Anything matching
+# PLAYWRIGHT_ALLOWED_HOSTS always passes, so login challenges and the Easy
+# Apply flow keep working (captcha providers, Google reCAPTCHA). Entries are
+# host suffixes ("licdn.com"), or URL substrings when they contain a "/".
+#
+# Blocked requests never hit the wire, so their size is unknown. The
+# est_bytes_saved counter uses typical sizes per blocked type. Routing turns
+# off Chromium's HTTP cache for the page, which is the price of per-request
+# decisions. Set PLAYWRIGHT_REQUEST_FILTER=false to load pages unfiltered,
+# e.g. for debug screenshots.
+
+
+def _csv(value: str) -> Tuple[str, ...]:
+    return tuple(item.strip().lower() for item in value.split(",") if item.strip())
+
+
+PLAYWRIGHT_REQUEST_FILTER = os.getenv("PLAYWRIGHT_REQUEST_FILTER", "true").lower() != "false"
+PLAYWRIGHT_BLOCK_RESOURCE_TYPES = _csv(os.getenv("PLAYWRIGHT_BLOCK_RESOURCE_TYPES", "image,media,font,ping"))
+PLAYWRIGHT_FIRST_PARTY_HOSTS = _csv(os.getenv("PLAYWRIGHT_FIRST_PARTY_HOSTS", "linkedin.com,licdn.com"))
+PLAYWRIGHT_ALLOWED_HOSTS = _csv(os.getenv(
+    "PLAYWRIGHT_ALLOWED_HOSTS",
+    "arkoselabs.com,funcaptcha.com,hcaptcha.com,recaptcha.net,google.com/recaptcha,gstatic.com/recaptcha",
+))
+PLAYWRIGHT_BLOCK_URL_PATTERNS = _csv(os.getenv("PLAYWRIGHT_BLOCK_URL_PATTERNS", "px.ads.linkedin.com,/li/track,/tscp-serving/"))
+
+# Typical transfer size of what each block reason stops, for est_bytes_saved.
+_EST_BYTES = {
+    "image": 25_000,
+    "media": 250_000,
+    "font": 35_000,
+    "ping": 500,
+    "tracking": 1_000,
+    "third_party": 20_000,
+}
+
+
+def _matches(url: str, host: str, entry: str) -> bool:
+    if "/" in entry:
+        return entry in url
+    return host == entry or host.endswith("." + entry)
+
+
+class RequestFilter:
+    """Per-run request policy and counters; attach() it to every page the run drives."""
+
+    def __init__(self, enabled: bool = PLAYWRIGHT_REQUEST_FILTER):
+        self.enabled = enabled
+        self.allowed = 0
+        self.blocked = 0
+        self.by_reason: Dict[str, int] = {}
+        self.est_bytes_saved = 0
+        self._pages = weakref.WeakSet()
+
+    def block_reason(self, url: str, resource_type: str, main_frame_navigation: bool = False) -> Optional[str]:
+        """Why this request would be aborted, or None to let it through."""
+        if main_frame_navigation:
+            return None
+        url = url.lower()
+        host = urlsplit(url).hostname or ""
+        if not host or any(_matches(url, host, entry) for entry in PLAYWRIGHT_ALLOWED_HOSTS):
+            return None
+        if any(_matches(url, host, entry) for entry in PLAYWRIGHT_BLOCK_URL_PATTERNS):
+            return "tracking"
+        if resource_type in PLAYWRIGHT_BLOCK_RESOURCE_TYPES:
+            return resource_type
+        if not any(_matches(url, host, entry) for entry in PLAYWRIGHT_FIRST_PARTY_HOSTS):
+            return "third_party"
+        return None
+
+    async def attach(self, page):
+        """Route the page's requests through the policy (once per page; no-op when disabled)."""
+        if not self.enabled or page in self._pages:
+            return
+        self._pages.add(page)
+        await page.route("**/*", self._handle)
+
+    async def _handle(self, route):
+        request = route.request
+        try:
+            main_frame_navigation = request.is_navigation_request() and request.frame.parent_frame is None
+        except Exception:
+            main_frame_navigation = False  # e.g. service worker requests have no frame
+
+        reason = self.block_reason(request.url, request.resource_type, main_frame_navigation)
+        if reason is None:
+            self.allowed += 1
+            await route.fallback()
+            return
+
+        self.blocked += 1
+        self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+        self.est_bytes_saved += _EST_BYTES.get(reason, 5_000)
+        await route.abort("blockedbyclient")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "by_reason": dict(self.by_reason),
+            "est_bytes_saved": self.est_bytes_saved,
+        }
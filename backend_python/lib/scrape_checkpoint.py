@@ -0,0 +1,68 @@
+import json
+from typing import Dict, Optional
+
+from lib.job_stream import STREAM_TTL_SECONDS
+
+# Per-title progress of a fetch_jobs scrape, so a restarted worker only redoes
+# the titles that were in flight.
+#
+#   scrape_checkpoint:{job_id}   HASH  "_progress" -> {"titles", "completed_titles"}
+#                                      job url     -> raw job payload
+#
+# Kept in Redis rather than workflow_sessions.output_data: each save writes the
+# progress field plus only the jobs fetched since the previous save, so the
+# write volume grows with the jobs found, not with titles x jobs, and the
+# session row (and its ETag) is left alone while the scrape runs.
+
+CHECKPOINT_TTL_SECONDS = STREAM_TTL_SECONDS
+
+_PROGRESS_FIELD = "_progress"
+
+
+def checkpoint_key(job_id: str) -> str:
+    return f"scrape_checkpoint:{job_id}"
+
+
+class CheckpointWriter:
+    """Saves search_by_job_titles_speed_optimized checkpoints, writing each job once."""
+
+    def __init__(self, client, job_id: str, already_saved=()):
+        self._client = client
+        self._job_id = job_id
+        self._saved = set(already_saved)
+
+    def __call__(self, state: dict):
+        raw_jobs = state.get("raw_jobs") or {}
+        fresh = {url: json.dumps(job) for url, job in raw_jobs.items() if url not in self._saved}
+        progress = {"titles": state.get("titles") or [], "completed_titles": state.get("completed_titles") or []}
+        pipe = self._client.pipeline(transaction=False)
+        pipe.hset(checkpoint_key(self._job_id), mapping={**fresh, _PROGRESS_FIELD: json.dumps(progress)})
+        pipe.expire(checkpoint_key(self._job_id), CHECKPOINT_TTL_SECONDS)
+        pipe.execute()
+        self._saved.update(fresh)
+
+
+def load(client, job_id: str) -> Optional[dict]:
+    """The saved checkpoint ({"titles", "completed_titles", "raw_jobs", "processed_urls"}), or None."""
+    fields: Dict[str, str] = client.hgetall(checkpoint_key(job_id)) or {}
+    progress = fields.pop(_PROGRESS_FIELD, None)
+    if not progress:
+        return None
+    try:
+        state = json.loads(progress)
+    except ValueError:
+        return None
+    raw_jobs = {}
+    for url, raw in fields.items():
+        try:
+            raw_jobs[url] = json.loads(raw)
+        except ValueError:
+            continue
+    state["raw_jobs"] = raw_jobs
+    state["processed_urls"] = sorted(raw_jobs)
+    return state
+
+
+def clear(client, job_id: Optional[str]):
+    if job_id:
+        client.delete(checkpoint_key(job_id))
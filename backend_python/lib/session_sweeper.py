@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Retention for workflow_sessions. The work happens in Postgres: the
+# `purge_workflow_sessions` function (schema.sql) ranks each user's finished
+# sessions by created_at and deletes one bounded batch of those past the
+# retention window per call. This module only drives it:
+#
+#   purge_sessions()   loops batches until one comes back short (used by
+#                      /api/jobs/cleanup for a single user)
+#   SessionSweeper     runs the all-users sweep every
+#                      SESSION_SWEEP_INTERVAL_SECONDS from the API process; a
+#                      Redis SET NX lock keeps concurrent API instances from
+#                      sweeping at the same time
+#
+# Set SESSION_SWEEP_INTERVAL_SECONDS=0 when the sweep is scheduled with pg_cron.
+
+SESSION_RETENTION_DAYS = int(os.getenv("SESSION_RETENTION_DAYS", "30"))
+SESSION_KEEP_RECENT = int(os.getenv("SESSION_KEEP_RECENT", "5"))
+SESSION_PURGE_BATCH = int(os.getenv("SESSION_PURGE_BATCH", "500"))
+SESSION_PURGE_MAX_BATCHES = int(os.getenv("SESSION_PURGE_MAX_BATCHES", "200"))
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "3600"))
+# Pause between batches so the sweep never monopolizes the database.
+SESSION_PURGE_BATCH_PAUSE_SECONDS = float(os.getenv("SESSION_PURGE_BATCH_PAUSE_SECONDS", "0.2"))
+
+SWEEP_LOCK_KEY = "session_sweeper:lock"
+
+PURGE_FUNCTION = "purge_workflow_sessions"
+
+
+def purge_params(user_id: Optional[str] = None, batch_size: int = SESSION_PURGE_BATCH) -> Dict[str, Any]:
+    """RPC arguments for one `purge_workflow_sessions` batch."""
+    return {
+        "p_user_id": user_id,
+        "p_keep_recent": SESSION_KEEP_RECENT,
+        "p_max_age": f"{SESSION_RETENTION_DAYS} days",
+        "p_batch_size": batch_size,
+    }
+
+
+async def purge_sessions(
+    run_batch: Callable[[int], Awaitable[Dict[str, int]]],
+    batch_size: int = SESSION_PURGE_BATCH,
+    max_batches: int = SESSION_PURGE_MAX_BATCHES,
+) -> Dict[str, Any]:
+    """
+    Call `run_batch(batch_size)` (one RPC returning deleted_rows/deleted_bytes)
+    until a batch deletes fewer than `batch_size` rows or `max_batches` is hit.
+    """
+    started = time.perf_counter()
+    rows = 0
+    size = 0
+    batches = 0
+    while batches < max_batches:
+        result = await run_batch(batch_size)
+        batches += 1
+        deleted = int(result.get("deleted_rows") or 0)
+        rows += deleted
+        size += int(result.get("deleted_bytes") or 0)
+        if deleted < batch_size:
+            break
+        await asyncio.sleep(SESSION_PURGE_BATCH_PAUSE_SECONDS)
+
+    return {
+        "deleted_count": rows,
+        "deleted_bytes": size,
+        "batches": batches,
+        "complete": batches < max_batches,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+    }
+
+
+class SessionSweeper:
+    """Periodic all-users purge; `start()`/`close()` from the API lifespan."""
+
+    def __init__(
+        self,
+        get_client: Callable[[], Any],
+        run_batch: Callable[[int], Awaitable[Dict[str, int]]],
+        interval_seconds: int = SESSION_SWEEP_INTERVAL_SECONDS,
+    ):
+        self._get_client = get_client
+        self._run_batch = run_batch
+        self._interval = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._last: Optional[Dict[str, Any]] = None
+        self._totals = {"sweeps": 0, "skipped": 0, "errors": 0, "deleted_count": 0, "deleted_bytes": 0}
+
+    def start(self):
+        if self._interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self._task and not self._task.done()),
+            "interval_seconds": self._interval,
+            "retention_days": SESSION_RETENTION_DAYS,
+            "keep_recent": SESSION_KEEP_RECENT,
+            "last": self._last,
+            **self._totals,
+        }
+
+    async def sweep(self) -> Optional[Dict[str, Any]]:
+        """Run one sweep unless another instance holds the lock (returns None then)."""
+        client = self._get_client()
+        if client:
+            # Held for one interval, so at most one sweep per interval across instances.
+            acquired = await client.set(SWEEP_LOCK_KEY, str(time.time()), nx=True, ex=max(60, self._interval))
+            if not acquired:
+                self._totals["skipped"] += 1
+                return None
+
+        result = await purge_sessions(self._run_batch)
+        result["finished_at"] = time.time()
+        self._last = result
+        self._totals["sweeps"] += 1
+        self._totals["deleted_count"] += result["deleted_count"]
+        self._totals["deleted_bytes"] += result["deleted_bytes"]
+        print(
+            f"🧹 Session sweep: deleted {result['deleted_count']} rows "
+            f"({result['deleted_bytes'] / 1_048_576:.1f} MB) in {result['batches']} batch(es), "
+            f"{result['elapsed_ms']}ms"
+        )
+        return result
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._totals["errors"] += 1
+                print(f"Session sweeper error: {e}")
+            await asyncio.sleep(self._interval)
@@ -0,0 +1,123 @@
+import hashlib
+from typing import Any, Dict, Optional, Set
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from lib.compression import identity_etag, if_none_match_tags
+from lib.json_response import FastJSONResponse
+
+# Response shaping for the polling endpoints (/api/jobs/status, /api/jobs/active).
+#
+#   fields=a,b     only those keys of the session payload are returned
+#   view=summary   input_data/output_data are replaced by `output_summary`
+#                  (status, counts and small scalars), never the job bodies
+#
+# Every response carries a strong ETag over (job id, status, version) and the
+# requested representation. `version` is bumped by a trigger on every row
+# update (schema.sql), so an unchanged tag means an unchanged row and the route
+# can answer If-None-Match with a 304 after a three-column lookup
+# (HEAD_COLUMNS). Large bodies are gzipped by lib/compression.py, which
+# suffixes the tag with -gzip.
+
+SESSION_FIELDS = ("job_id", "status", "workflow_type", "output_data", "input_data", "last_active_at")
+VIEWS = ("full", "summary")
+HEAD_COLUMNS = "id, status, version"
+
+# A dict output_data with more keys than this is a job collection (URL -> job);
+# the summary reports its size instead of its keys.
+_SUMMARY_MAX_KEYS = 16
+
+
+def parse_fields(fields: Optional[str], view: str = "full") -> Optional[Set[str]]:
+    """Validate `fields=` / `view=`; None means every field."""
+    if view not in VIEWS:
+        raise HTTPException(status_code=400, detail=f"view must be one of {', '.join(VIEWS)}")
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(SESSION_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested | {"job_id"}
+
+
+def db_columns(fields: Optional[Set[str]], view: str) -> str:
+    """workflow_sessions columns the projection needs (job bodies only if returned or summarized)."""
+    wanted = set(SESSION_FIELDS) if fields is None else set(fields)
+    if view == "summary":
+        wanted.discard("input_data")
+        wanted.add("output_data")
+    columns = ["id", "status", "version", "last_active_at"]
+    columns += [c for c in ("workflow_type", "input_data", "output_data") if c in wanted]
+    return ", ".join(columns)
+
+
+def summarize_output(output: Any) -> Dict[str, Any]:
+    if isinstance(output, list):
+        return {"count": len(output)}
+    if not isinstance(output, dict):
+        return {"count": 0}
+    if len(output) > _SUMMARY_MAX_KEYS:
+        return {"count": len(output)}
+
+    summary: Dict[str, Any] = {}
+    for key, value in output.items():
+        if isinstance(value, (list, dict)):
+            summary[f"{key}_count"] = len(value)
+        elif not isinstance(value, str) or len(value) <= 200:
+            summary[key] = value
+    return summary
+
+
+def shape_session(row: Dict[str, Any], fields: Optional[Set[str]], view: str) -> Dict[str, Any]:
+    """Build the (projected) session payload from a workflow_sessions row."""
+    payload: Dict[str, Any] = {
+        "job_id": row["id"],
+        "status": row["status"],
+        "workflow_type": row.get("workflow_type"),
+        "last_active_at": row["last_active_at"],
+    }
+    if view == "summary":
+        payload["output_summary"] = summarize_output(row.get("output_data"))
+    else:
+        payload["output_data"] = row.get("output_data") or {}
+        payload["input_data"] = row.get("input_data") or {}
+
+    if fields is not None:
+        keep = fields | ({"output_summary"} if view == "summary" else set())
+        payload = {k: v for k, v in payload.items() if k in keep}
+    return payload
+
+
+def session_etag(row: Dict[str, Any], fields: Optional[Set[str]], view: str) -> str:
+    variant = view + ":" + (",".join(sorted(fields)) if fields is not None else "*")
+    raw = f"{row['id']}|{row['status']}|{row.get('version', 0)}|{variant}"
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:24] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match and if_none_match.strip() == "*":
+        return True
+    # Tags of gzipped bodies carry a suffix; they name the same representation.
+    return any(identity_etag(tag) == etag for tag in if_none_match_tags(if_none_match))
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    # no-cache: browsers keep the body and revalidate with If-None-Match on every poll.
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 if the client already holds `etag`, else None."""
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return None
+
+
+def session_response(request: Request, payload: Dict[str, Any], etag: str) -> Response:
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    return FastJSONResponse(payload, headers=_cache_headers(etag))
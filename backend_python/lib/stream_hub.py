@@ -0,0 +1,265 @@
+import asyncio
+import os
+import uuid
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set, Tuple
+
+from lib.job_stream import STREAM_START_ID, decode_entry, stream_key
+
+# Per-process fan-out for job streams. However many SSE connections watch one
+# job_id (dashboard, extension, a second tab), the process reads it once and
+# copies every entry into each subscriber's bounded queue. A subscriber whose
+# queue overflows is flagged as lagged and re-syncs itself from Redis with
+# XRANGE, so a slow client never stalls the others.
+#
+# All watched jobs share one blocking XREAD over their streams, so the hub
+# holds a single connection from the stream pool however many jobs are
+# watched. That XREAD also covers a private wake stream
+# (stream_hub:wake:{uuid}). When a job gets its first viewer the hub XADDs to
+# it, the pending XREAD returns and the next one includes the new job. The
+# reader is never cancelled, so its connection survives. Joins that land while
+# a wake is still unread share it, so connect churn costs at most one extra
+# XREAD round trip per read, not one per new job.
+
+HUB_QUEUE_SIZE = int(os.getenv("STREAM_HUB_QUEUE_SIZE", "256"))
+HUB_RANGE_PAGE = 500
+HUB_WAKE_TTL_SECONDS = 3600
+
+StreamEntry = Tuple[str, str]
+
+
+def _parse_stream_id(entry_id: str) -> Tuple[int, int]:
+    ms, _, seq = str(entry_id).partition("-")
+    return int(ms or 0), int(seq or 0)
+
+
+def _is_after(entry_id: str, last_id: str) -> bool:
+    return _parse_stream_id(entry_id) > _parse_stream_id(last_id)
+
+
+class _Subscriber:
+    def __init__(self, job_id: str, last_id: str, maxsize: int):
+        self.job_id = job_id
+        self.last_id = last_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.lagged = False
+
+
+class _Reader:
+    """Per-job read position and subscribers; the hub's XREAD covers every ready reader."""
+
+    def __init__(self):
+        self.subscribers: Set[_Subscriber] = set()
+        self.ready = asyncio.Event()
+        self.start: Optional[asyncio.Task] = None
+        self.last_id = STREAM_START_ID
+        self.delivered = 0
+        self.overflows = 0
+
+
+class StreamHub:
+    def __init__(self, get_client: Callable[[], Any], block_ms: int, queue_size: int = HUB_QUEUE_SIZE):
+        # block_ms comes from config.STREAM_BLOCK_MS: the stream pool's socket
+        # timeout is sized from it, so the hub must not block any longer.
+        self._get_client = get_client
+        self._queue_size = queue_size
+        self._block_ms = block_ms
+        self._readers: Dict[str, _Reader] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._wake_key = f"stream_hub:wake:{uuid.uuid4().hex}"
+        # Nothing else writes the wake stream, so every entry in it is for us.
+        self._wake_id = STREAM_START_ID
+        self._wake_pending = False
+        self._xreads = 0
+        self._wakeups = 0
+
+    async def listen(self, job_id: str, last_id: str = STREAM_START_ID, idle_timeout: float = 15.0) -> AsyncIterator[Optional[StreamEntry]]:
+        """
+        Yield (entry_id, payload_json) for every entry after `last_id`, in order.
+        Yields None whenever `idle_timeout` passes without new entries.
+        """
+        sub = self._subscribe(job_id, last_id)
+        reader = self._readers[job_id]
+        try:
+            # The reader must have fixed its start position before we backfill,
+            # otherwise an entry landing in between would be missed by both.
+            await reader.ready.wait()
+            needs_backfill = True
+            while True:
+                if needs_backfill or sub.lagged:
+                    needs_backfill = False
+                    sub.lagged = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    async with aclosing(self._range_after(job_id, sub.last_id)) as backlog:
+                        async for entry_id, payload in backlog:
+                            sub.last_id = entry_id
+                            yield entry_id, payload
+                    continue
+
+                try:
+                    entry_id, payload = await asyncio.wait_for(sub.queue.get(), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                if not _is_after(entry_id, sub.last_id):
+                    continue
+                sub.last_id = entry_id
+                yield entry_id, payload
+        finally:
+            self._unsubscribe(sub)
+
+    def stats(self) -> dict:
+        jobs = {}
+        for job_id, reader in self._readers.items():
+            jobs[job_id] = {
+                "subscribers": len(reader.subscribers),
+                "reading": reader.ready.is_set(),
+                "delivered": reader.delivered,
+                "overflows": reader.overflows,
+                "lagged_subscribers": sum(1 for sub in reader.subscribers if sub.lagged),
+            }
+        return {
+            "readers": 1 if self._task and not self._task.done() else 0,
+            "streams": sum(1 for job in jobs.values() if job["reading"]),
+            "subscribers": sum(job["subscribers"] for job in jobs.values()),
+            "xreads": self._xreads,
+            "wakeups": self._wakeups,
+            "jobs": jobs,
+        }
+
+    async def close(self):
+        tasks = [reader.start for reader in self._readers.values() if reader.start]
+        if self._task:
+            tasks.append(self._task)
+        self._readers.clear()
+        self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        client = self._get_client()
+        if client:
+            try:
+                await client.delete(self._wake_key)
+            except Exception:
+                pass  # expires on its own
+
+    def _subscribe(self, job_id: str, last_id: str) -> _Subscriber:
+        reader = self._readers.get(job_id)
+        if reader is None:
+            reader = _Reader()
+            self._readers[job_id] = reader
+            reader.start = asyncio.create_task(self._start_reading(job_id, reader))
+        sub = _Subscriber(job_id, last_id or STREAM_START_ID, self._queue_size)
+        reader.subscribers.add(sub)
+        return sub
+
+    def _unsubscribe(self, sub: _Subscriber):
+        reader = self._readers.get(sub.job_id)
+        if reader is None:
+            return
+        reader.subscribers.discard(sub)
+        if not reader.subscribers:
+            # Last viewer left: the next XREAD leaves this job's stream out.
+            self._readers.pop(sub.job_id, None)
+            if reader.start:
+                reader.start.cancel()
+
+    def _fan_out(self, reader: _Reader, entry: StreamEntry):
+        reader.delivered += 1
+        for sub in reader.subscribers:
+            if sub.lagged:
+                continue
+            try:
+                sub.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                sub.lagged = True
+                reader.overflows += 1
+
+    async def _newest_id(self, job_id: str) -> str:
+        client = self._get_client()
+        if not client:
+            return STREAM_START_ID
+        try:
+            entries = await client.xrevrange(stream_key(job_id), count=1)
+            if entries:
+                return str(entries[0][0])
+        except Exception as e:
+            print(f"Stream hub could not read head of {job_id}: {e}")
+        return STREAM_START_ID
+
+    async def _range_after(self, job_id: str, last_id: str) -> AsyncIterator[StreamEntry]:
+        client = self._get_client()
+        if not client:
+            return
+        cursor = last_id
+        while True:
+            entries = await client.xrange(stream_key(job_id), min=f"({cursor}", max="+", count=HUB_RANGE_PAGE)
+            for entry_id, fields in entries:
+                cursor = str(entry_id)
+                yield cursor, decode_entry(fields)
+            if len(entries) < HUB_RANGE_PAGE:
+                return
+
+    async def _start_reading(self, job_id: str, reader: _Reader):
+        try:
+            reader.last_id = await self._newest_id(job_id)
+        finally:
+            reader.ready.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._read_loop())
+        self._wake.set()
+        await self._poke()
+
+    async def _poke(self):
+        """Make an in-flight XREAD return so the next one includes newly ready jobs."""
+        client = self._get_client()
+        if self._wake_pending or not client:
+            return
+        self._wake_pending = True
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.xadd(self._wake_key, {"wake": "1"}, maxlen=10, approximate=False)
+                pipe.expire(self._wake_key, HUB_WAKE_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            self._wake_pending = False
+            print(f"Stream hub wake error: {e}")
+
+    async def _read_loop(self):
+        while True:
+            # Clear before collecting streams so a job added meanwhile wakes us again.
+            self._wake.clear()
+            keys = {stream_key(job_id): job_id for job_id, reader in self._readers.items() if reader.ready.is_set()}
+            client = self._get_client()
+            if not keys or not client:
+                await self._wake.wait()
+                continue
+
+            streams = {self._wake_key: self._wake_id}
+            streams.update((key, self._readers[job_id].last_id) for key, job_id in keys.items())
+            try:
+                response = await client.xread(streams, count=100, block=self._block_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Stream hub XREAD error for {len(keys)} streams: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            self._xreads += 1
+            for key, entries in response or []:
+                key = str(key)
+                if key == self._wake_key:
+                    self._wake_id = str(entries[-1][0])
+                    self._wake_pending = False
+                    self._wakeups += 1
+                    continue
+                reader = self._readers.get(keys.get(key, ""))
+                if reader is None:
+                    continue  # nobody watches this job any more
+                for entry_id, fields in entries:
+                    reader.last_id = str(entry_id)
+                    self._fan_out(reader, (reader.last_id, decode_entry(fields)))
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+# Groups a stream of (key, payload) items into LLM-sized batches. A batch is
+# closed as soon as the next item would push it over ANALYSIS_BATCH_TOKEN_BUDGET
+# (estimated at ~4 characters per token), when it holds ANALYSIS_BATCH_MAX_JOBS
+# items, or when ANALYSIS_BATCH_LINGER_SECONDS have passed since its first item
+# arrived. The linger is what keeps the first results quick while the upstream
+# stages are still producing. The producer ends the stream by putting None on
+# the queue. The queue should be bounded so that a slow consumer pushes back on
+# the producers.
+
+ANALYSIS_BATCH_TOKEN_BUDGET = int(os.getenv("ANALYSIS_BATCH_TOKEN_BUDGET", "30000"))
+ANALYSIS_BATCH_MAX_JOBS = int(os.getenv("ANALYSIS_BATCH_MAX_JOBS", "25"))
+ANALYSIS_BATCH_LINGER_SECONDS = float(os.getenv("ANALYSIS_BATCH_LINGER_SECONDS", "15"))
+
+Item = Tuple[str, object]
+
+
+def estimate_tokens(payload) -> int:
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    return len(text) // 4 + 1
+
+
+async def stream_batches(
+    queue: asyncio.Queue,
+    initial: Optional[Iterable[Item]] = None,
+    budget: int = ANALYSIS_BATCH_TOKEN_BUDGET,
+    max_items: int = ANALYSIS_BATCH_MAX_JOBS,
+    linger_s: float = ANALYSIS_BATCH_LINGER_SECONDS,
+) -> AsyncIterator[Dict[str, object]]:
+    """Yield {key: payload} batches from `initial` items, then from `queue` until None."""
+    loop = asyncio.get_running_loop()
+    batch: Dict[str, object] = {}
+    tokens = 0
+    deadline = 0.0
+    pending = iter(initial or ())
+
+    while True:
+        item = next(pending, None)
+        if item is None:
+            timeout = max(0.0, deadline - loop.time()) if batch else None
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield batch
+                batch, tokens = {}, 0
+                continue
+            if item is None:
+                break
+
+        key, payload = item
+        cost = estimate_tokens(payload)
+        if batch and tokens + cost > budget:
+            yield batch
+            batch, tokens = {}, 0
+        if not batch:
+            deadline = loop.time() + linger_s
+        batch[key] = payload
+        tokens += cost
+        if len(batch) >= max_items or tokens >= budget:
+            yield batch
+            batch, tokens = {}, 0
+
+    if batch:
+        yield batch
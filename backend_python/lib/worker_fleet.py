@@ -0,0 +1,196 @@
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from lib.job_stream import WORKER_HEARTBEAT_TTL_SECONDS
+
+# Worker liveness for every running job, in two shared keys:
+#
+#   worker_fleet       ZSET  job id -> last heartbeat (unix seconds). The event
+#                            writer bumps it on every flush and the heartbeat
+#                            thread every 10s, so ZSCORE is the O(1) liveness
+#                            check /api/jobs/start uses for stale sessions
+#   worker_fleet:info  HASH  job id -> JSON {phase, status, progress, message,
+#                            rss_mb, tree_rss_mb, pid, host, workflow_type,
+#                            started_at, at}, written by the heartbeat thread
+#
+# A worker removes its entries on exit. Entries of workers that died without
+# exiting cleanly are flagged stale after WORKER_HEARTBEAT_TTL_SECONDS and
+# pruned after WORKER_FLEET_PRUNE_SECONDS. /api/jobs/admin/workers reads the
+# whole fleet in one pipelined ZRANGE + HGETALL.
+
+WORKER_FLEET_KEY = "worker_fleet"
+WORKER_FLEET_INFO_KEY = "worker_fleet:info"
+WORKER_FLEET_PRUNE_SECONDS = int(os.getenv("WORKER_FLEET_PRUNE_SECONDS", "3600"))
+
+_HOST = socket.gethostname()
+
+
+def _rss_kb(pid: str) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def process_rss_mb() -> Tuple[Optional[float], Optional[float]]:
+    """(this process, this process + descendants such as Chromium) RSS in MB; Linux only."""
+    if not os.path.isdir("/proc/self"):
+        return None, None
+    me = str(os.getpid())
+    children: Dict[str, List[str]] = {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                ppid = f.read().rsplit(")", 1)[1].split()[1]
+        except (OSError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+
+    own = _rss_kb(me)
+    total = own
+    stack = list(children.get(me, ()))
+    while stack:
+        pid = stack.pop()
+        total += _rss_kb(pid)
+        stack.extend(children.get(pid, ()))
+    return round(own / 1024, 1), round(total / 1024, 1)
+
+
+class WorkerState:
+    """What the heartbeat reports for the job this worker is running (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._info: Dict[str, Any] = {}
+
+    def reset(self, workflow_type: Optional[str] = None):
+        with self._lock:
+            self._info = {
+                "phase": "booting",
+                "status": None,
+                "progress": 0,
+                "message": None,
+                "workflow_type": workflow_type,
+                "started_at": time.time(),
+            }
+
+    def update(self, **fields):
+        with self._lock:
+            self._info.update({k: v for k, v in fields.items() if v is not None})
+
+    def observe(self, event: dict):
+        """Track status/progress/message from an outgoing progress event."""
+        progress = event.get("progress")
+        message = event.get("message")
+        self.update(
+            status=event.get("status"),
+            progress=progress if isinstance(progress, (int, float)) and progress >= 0 else None,
+            message=str(message)[:160] if message else None,
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._info)
+
+
+# The running job's state in this worker process. worker.py resets it per job
+# and feeds it progress events; pipelines set `phase` as they move between
+# stages (login, title_search, descriptions, analysis).
+worker_state = WorkerState()
+
+
+def set_phase(phase: str):
+    worker_state.update(phase=phase)
+
+
+# ---------------------------------------------------------------------------
+# Worker side (sync client)
+# ---------------------------------------------------------------------------
+
+def touch(pipe, job_id: str, now: Optional[float] = None):
+    """Queue the liveness bump on a pipeline (used by the event writer per flush)."""
+    pipe.zadd(WORKER_FLEET_KEY, {job_id: now if now is not None else time.time()})
+
+
+def heartbeat(client, job_id: str, state: WorkerState):
+    now = time.time()
+    rss_mb, tree_rss_mb = process_rss_mb()
+    info = {**state.snapshot(), "rss_mb": rss_mb, "tree_rss_mb": tree_rss_mb, "pid": os.getpid(), "host": _HOST, "at": now}
+    pipe = client.pipeline(transaction=False)
+    touch(pipe, job_id, now)
+    pipe.hset(WORKER_FLEET_INFO_KEY, job_id, json.dumps(info))
+    pipe.execute()
+
+
+def leave(client, job_id: str):
+    pipe = client.pipeline(transaction=False)
+    pipe.zrem(WORKER_FLEET_KEY, job_id)
+    pipe.hdel(WORKER_FLEET_INFO_KEY, job_id)
+    pipe.execute()
+
+
+# ---------------------------------------------------------------------------
+# API side (async client)
+# ---------------------------------------------------------------------------
+
+async def heartbeat_age(client, job_id: str) -> Optional[float]:
+    """Seconds since the job's worker last checked in, or None if it never did / left."""
+    score = await client.zscore(WORKER_FLEET_KEY, job_id)
+    if score is None:
+        return None
+    return max(0.0, time.time() - float(score))
+
+
+async def fleet(client, stale_after_seconds: int = WORKER_HEARTBEAT_TTL_SECONDS) -> Dict[str, Any]:
+    """Every worker with its heartbeat info, stale ones flagged; prunes long-dead entries."""
+    now = time.time()
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.zrangebyscore(WORKER_FLEET_KEY, "-inf", "+inf", withscores=True)
+        pipe.hgetall(WORKER_FLEET_INFO_KEY)
+        entries, infos = await pipe.execute()
+
+    workers = []
+    dead = []
+    for job_id, score in entries:
+        age = now - float(score)
+        if age > WORKER_FLEET_PRUNE_SECONDS:
+            dead.append(job_id)
+            continue
+        try:
+            info = json.loads(infos.get(job_id) or "{}")
+        except ValueError:
+            info = {}
+        workers.append({
+            "job_id": job_id,
+            "heartbeat_age_s": round(age, 1),
+            "stale": age > stale_after_seconds,
+            **info,
+        })
+
+    tracked = {job_id for job_id, _ in entries}
+    orphans = [job_id for job_id in infos if job_id not in tracked]
+    if dead or orphans:
+        async with client.pipeline(transaction=False) as pipe:
+            if dead:
+                pipe.zrem(WORKER_FLEET_KEY, *dead)
+            pipe.hdel(WORKER_FLEET_INFO_KEY, *(dead + orphans))
+            await pipe.execute()
+
+    workers.sort(key=lambda w: w["heartbeat_age_s"])
+    return {
+        "live": sum(1 for w in workers if not w["stale"]),
+        "stale": sum(1 for w in workers if w["stale"]),
+        "pruned": len(dead),
+        "stale_after_seconds": stale_after_seconds,
+        "workers": workers,
+    }
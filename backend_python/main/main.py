@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -7,31 +7,50 @@ from main.routes.debug_routes import router as debug_router
 from main.routes.logout import logout_route
 from main.routes.portfolio_generator import router as portfolio
 from main.routes.get_resume import router as tailor
-from main.routes.jobs_api import router as jobs_api
+from main.routes.jobs_api import router as jobs_api, stream_hub, free_dispatcher, session_sweeper
 from main.routes.auth_api import router as auth_api
 
-from config import redis_client
+from config import init_async_redis, close_async_redis
+from database.identity_cache import start_invalidation_listener, stop_invalidation_listener
+from lib.compression import CompressionMiddleware
+from lib.json_response import FastJSONResponse
+from database.db_async import DBTimeoutError
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Ensure Redis connection works
-    if redis_client:
+    # Startup: open the async Redis pools and ensure the connection works
+    async_redis = await init_async_redis()
+    if async_redis:
         try:
-            redis_client.ping()
+            await async_redis.ping()
             print("Successfully connected to Redis.")
         except Exception as e:
             print(f"Redis connection failed: {e}")
+        free_dispatcher.start()
+        start_invalidation_listener()
     else:
         print("No Redis URL provided, running without Redis (SSE won't work).")
+    session_sweeper.start()
     
     yield
     
     # Shutdown
-    if redis_client:
-        redis_client.close()
+    await session_sweeper.close()
+    await free_dispatcher.close()
+    await stream_hub.close()
+    await stop_invalidation_listener()
+    if async_redis:
+        await close_async_redis()
         print("Redis connection closed.")
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+@app.exception_handler(DBTimeoutError)
+async def db_timeout_handler(request: Request, exc: DBTimeoutError):
+    return FastJSONResponse(status_code=504, content={"detail": str(exc)})
+
+# gzip for JSON/HTML bodies; SSE streams and binary media pass through (lib/compression.py).
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
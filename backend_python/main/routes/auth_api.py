@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import JSONResponse
 from database.linkedin_context import get_linkedin_context, save_linkedin_context
+from database.db_async import db_call
+from database.identity_cache import invalidate_user
 from typing import Dict, Any
+import hmac
 import uuid
 import os
-from config import redis_client
+from config import get_async_redis, INTERNAL_API_SECRET
 
 router = APIRouter()
 
@@ -73,7 +76,8 @@ async def store_cookie(request: Request):
         }
 
         # Save to database
-        save_linkedin_context(user_id, playwright_context)
+        await db_call("users.save_linkedin_context", lambda: save_linkedin_context(user_id, playwright_context))
+        await invalidate_user(user_id)
         print(f"Successfully saved new cross-origin context for {user_id}")
         
         return {"status": "success"}
@@ -88,15 +92,18 @@ async def generate_connect_token(payload: dict):
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing user_id in payload")
 
-    if not redis_client:
+    redis = get_async_redis()
+    if not redis:
         raise HTTPException(status_code=500, detail="Redis connection not available")
 
     try:
         # Check for existing active session for this user
         existing_session_key = f"stream_token_user:{user_id}"
-        existing_token = redis_client.get(existing_session_key)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.get(existing_session_key)
+            pipe.ttl(existing_session_key)
+            existing_token, remaining_ttl = await pipe.execute()
         if existing_token:
-            remaining_ttl = redis_client.ttl(existing_session_key)
             if remaining_ttl > 0:
                 return JSONResponse(
                     status_code=409,
@@ -111,9 +118,11 @@ async def generate_connect_token(payload: dict):
         
         # Save stream_token:<token> -> user_id in Redis with 5-minute expiration
         redis_key = f"stream_token:{token}"
-        redis_client.setex(redis_key, 300, user_id)
-        # Reverse mapping: stream_token_user:<user_id> -> token (same TTL)
-        redis_client.setex(existing_session_key, 300, token)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.setex(redis_key, 300, user_id)
+            # Reverse mapping: stream_token_user:<user_id> -> token (same TTL)
+            pipe.setex(existing_session_key, 300, token)
+            await pipe.execute()
         
         # Get stream server URL from config/environment
         stream_url = os.getenv("NEXT_PUBLIC_STREAM_SERVER") or os.getenv("STREAM_SERVER_URL") or "http://localhost:8080"
@@ -126,3 +135,28 @@ async def generate_connect_token(payload: dict):
     except Exception as e:
         print(f"Failed to generate connect token: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def require_internal_secret(request: Request):
+    """Only our own servers may call internal hooks; they send INTERNAL_API_SECRET."""
+    if not INTERNAL_API_SECRET:
+        raise HTTPException(status_code=503, detail="Internal API secret not configured")
+    provided = request.headers.get("x-internal-secret", "")
+    if not hmac.compare_digest(provided.encode(), INTERNAL_API_SECRET.encode()):
+        raise HTTPException(status_code=401, detail="Invalid internal secret")
+
+
+@router.post("/api/identity/invalidate")
+async def invalidate_identity(payload: dict, request: Request):
+    """
+    Drop the cached identity for a user after their row changes elsewhere
+    (tier, connection). Called by the Next.js server only; every call fans out
+    to all API instances, so it requires the internal secret.
+    """
+    require_internal_secret(request)
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Missing user_id in payload")
+
+    await invalidate_user(user_id)
+    return {"status": "success"}
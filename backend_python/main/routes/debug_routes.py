@@ -5,7 +5,6 @@ import tempfile
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import FileResponse, JSONResponse, HTMLResponse
-from playwright.sync_api import sync_playwright
 
 router = APIRouter(prefix="/debug", tags=["debug"])
 
@@ -16,6 +15,8 @@ HTML_PATH = os.path.join(TEMP_DIR, "snap.html")
 
 @router.get("/capture")
 def capture(url: str = Query(...)):
+    from playwright.sync_api import sync_playwright
+
     try:
         with sync_playwright() as p:
             browser = p.chromium.launch(
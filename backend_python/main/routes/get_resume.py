@@ -3,7 +3,6 @@ import os
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, HttpUrl, field_validator
 from typing import List, Dict, Any, Optional
-from agents.tailor import process_batch as tailor_main
 from main.routes import image2base64
 
 
@@ -45,6 +44,9 @@ router = APIRouter()
 @router.post("/tailor",response_model=TailorResponses)
 def tailor_resume(request: TailorRequest):
     try:
+        # Imported per request: agents.tailor builds Gemini/Jinja state at import time.
+        from agents.tailor import process_batch as tailor_main
+
         print(f"{request.template} - template from route")
         resume_data = [{"job_url": "resume_", "job_description": request.job_desc or "**MAKE GENERAL RESUME**"}]
         # logging.info("resumedata: %s",resume_data)
@@ -3,13 +3,43 @@ import uuid
 import json
 import time
 import asyncio
+from contextlib import aclosing
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, cast
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Header, Request
 from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
-from config import supabase, redis_client, GCP_PROJECT_ID, GCP_REGION, WORKER_JOB_NAME, DEV_MODE
+from config import supabase, get_async_redis, get_async_redis_stream, async_redis_pool_stats, STREAM_BLOCK_MS, GCP_PROJECT_ID, GCP_REGION, WORKER_JOB_NAME, WORKER_BACKEND
+from database.db_async import DBTimeoutError, db_call, db_stats
+from database.identity_cache import resolve_user, identity_cache_stats
+from lib.stream_hub import StreamHub
+from lib.free_scheduler import (
+    FreeQueueDispatcher,
+    LEASE_KEY,
+    LEASE_STARTED_KEY,
+    NEXT_AT_KEY,
+    QUEUE_KEY,
+    STATUS_KEY,
+    estimate_queue_wait,
+)
+from lib.phase_metrics import phase_percentiles
+from lib.json_response import FastJSONResponse
+from lib.session_view import HEAD_COLUMNS, SESSION_FIELDS, db_columns, not_modified, parse_fields, session_etag, session_response, shape_session
+from lib.worker_fleet import fleet as worker_fleet, heartbeat_age
+from lib.session_sweeper import PURGE_FUNCTION, SessionSweeper, purge_params, purge_sessions
+from lib.job_stream import (
+    STREAM_MAXLEN,
+    STREAM_START_ID,
+    STREAM_TTL_SECONDS,
+    WORKER_HEARTBEAT_TTL_SECONDS,
+    WORKER_QUEUE_KEY,
+    encode_event,
+    is_terminal_event,
+    snapshot_key,
+    stream_key as _stream_key,
+    worker_started_key,
+)
 
 router = APIRouter(prefix="/api/jobs", tags=["jobs"])
 
@@ -22,40 +52,66 @@ class JobStartRequest(BaseModel):
 
 SESSION_STALE_SECONDS = int(os.getenv("SESSION_STALE_SECONDS", "300"))
 
+# All SSE viewers of one job in this process share a single Redis reader.
+# STREAM_BLOCK_MS bounds each blocking XREAD before the SSE loop re-checks the DB.
+stream_hub = StreamHub(get_async_redis_stream, block_ms=STREAM_BLOCK_MS)
 
-def _worker_heartbeat_key(job_id: str) -> str:
-    return f"worker_heartbeat:{job_id}"
 
+async def _mark_session_failed(job_id: str, output_data: Optional[dict] = None):
+    update: Dict[str, Any] = {"status": "failed"}
+    if output_data is not None:
+        update["output_data"] = output_data
+    await db_call("sessions.mark_failed", lambda: supabase.table("workflow_sessions").update(update).eq("id", job_id).execute())
 
-def _stream_key(job_id: str) -> str:
-    return f"stream:{job_id}"
 
+async def _fail_unlaunchable_job(job_id: str, error: Exception):
+    await _mark_session_failed(job_id)
+    await _append_stream_event(job_id, {"progress": -1, "status": "error", "message": f"Failed to start worker: {error}"})
 
-def _get_stream_start_index(job_id: str) -> int:
-    return _redis_llen_sync(_stream_key(job_id))
 
+# Free-tier jobs are serialized on one lease; see lib/free_scheduler.py.
+free_dispatcher = FreeQueueDispatcher(
+    get_async_redis,
+    get_async_redis_stream,
+    launch=lambda job_id: _launch_worker(job_id),
+    on_give_up=_fail_unlaunchable_job,
+    on_advance=lambda: _publish_queue_positions(),
+    max_wait_seconds=STREAM_BLOCK_MS / 1000,
+)
 
-def _redis_llen_sync(key: str) -> int:
-    if not redis_client:
-        return 0
 
-    try:
-        length = redis_client.llen(key)
-        if asyncio.iscoroutine(length):
-            return 0
-        return int(cast(Any, length))
-    except Exception:
-        return 0
+async def _purge_sessions_batch(user_id: Optional[str], batch_size: int) -> Dict[str, int]:
+    res = await db_call("sessions.purge", lambda: supabase.rpc(PURGE_FUNCTION, purge_params(user_id, batch_size)).execute(), timeout=30)
+    return res.data[0] if res.data else {}
+
+
+# Retention for finished sessions across all users; see lib/session_sweeper.py.
+session_sweeper = SessionSweeper(get_async_redis, lambda batch_size: _purge_sessions_batch(None, batch_size))
+
+
+def _pipe_stream_event(pipe, job_id: str, event: dict):
+    """Queue one event on `pipe`: XADD to the job's stream and refresh its TTL."""
+    pipe.xadd(_stream_key(job_id), encode_event(event), maxlen=STREAM_MAXLEN, approximate=True)
+    pipe.expire(_stream_key(job_id), STREAM_TTL_SECONDS)
+
 
+async def _append_stream_event(job_id: str, event: dict):
+    redis = get_async_redis()
+    if not redis:
+        return
+
+    async with redis.pipeline(transaction=False) as pipe:
+        _pipe_stream_event(pipe, job_id, event)
+        await pipe.execute()
 
-def _redis_get_sync(key: str) -> Optional[str]:
-    if not redis_client:
+
+async def _redis_get(key: str) -> Optional[str]:
+    redis = get_async_redis()
+    if not redis:
         return None
 
     try:
-        value = redis_client.get(key)
-        if asyncio.iscoroutine(value):
-            return None
+        value = await redis.get(key)
         if value is None:
             return None
         return str(cast(Any, value))
@@ -63,21 +119,6 @@ def _redis_get_sync(key: str) -> Optional[str]:
         return None
 
 
-def _redis_lrange_sync(key: str, start: int, end: int) -> list:
-    if not redis_client:
-        return []
-
-    try:
-        values = redis_client.lrange(key, start, end)
-        if asyncio.iscoroutine(values):
-            return []
-        if isinstance(values, list):
-            return values
-        return list(cast(Any, values))
-    except Exception:
-        return []
-
-
 def _parse_iso_timestamp(value: Optional[str]) -> Optional[float]:
     if not value:
         return None
@@ -91,24 +132,19 @@ def _parse_iso_timestamp(value: Optional[str]) -> Optional[float]:
         return None
 
 
-def _is_worker_heartbeat_fresh(job_id: str, stale_after_seconds: int = SESSION_STALE_SECONDS) -> bool:
+async def _is_worker_heartbeat_fresh(job_id: str, stale_after_seconds: int = WORKER_HEARTBEAT_TTL_SECONDS) -> bool:
+    """One ZSCORE on the shared fleet set; see lib/worker_fleet.py."""
+    redis = get_async_redis()
+    if not redis:
+        return False
     try:
-        raw = _redis_get_sync(_worker_heartbeat_key(job_id))
-        if not raw:
-            return False
-
-        try:
-            heartbeat_at = float(raw)
-        except (TypeError, ValueError):
-            # Backward compatibility: any value means liveness signal exists.
-            return True
-
-        return (time.time() - heartbeat_at) <= stale_after_seconds
+        age = await heartbeat_age(redis, job_id)
+        return age is not None and age <= stale_after_seconds
     except Exception:
         return False
 
 
-def _should_resume_active_session(status: str, job_id: str, last_active_at: Optional[str]) -> bool:
+async def _should_resume_active_session(status: str, job_id: str, last_active_at: Optional[str]) -> bool:
     # scraper_raw sessions are resumable checkpoints by design.
     if status == "scraper_raw":
         return True
@@ -116,7 +152,7 @@ def _should_resume_active_session(status: str, job_id: str, last_active_at: Opti
     if status not in ("pending", "running"):
         return False
 
-    if _is_worker_heartbeat_fresh(job_id):
+    if await _is_worker_heartbeat_fresh(job_id):
         return False
 
     last_active_ts = _parse_iso_timestamp(last_active_at)
@@ -127,8 +163,8 @@ def _should_resume_active_session(status: str, job_id: str, last_active_at: Opti
 
 
 def _trigger_worker(job_id: str):
-    """Start worker process/job for a workflow session id."""
-    if DEV_MODE:
+    """Start worker process/job for a workflow session id (blocking backends)."""
+    if WORKER_BACKEND == "subprocess":
         import subprocess
 
         env = os.environ.copy()
@@ -161,38 +197,87 @@ def _trigger_worker(job_id: str):
     client.run_job(request=request)
 
 
-async def _wait_for_worker_started(job_id: str, timeout_seconds: int = 30, start_index: int = 0) -> bool:
-    """Wait for a worker 'started' event in Redis. Returns False on timeout."""
-    if not redis_client:
+async def _wait_for_worker_started(job_id: str, timeout_seconds: int = 30) -> bool:
+    """Block on the worker's start latch (BLPOP). Returns False on timeout."""
+    redis = get_async_redis_stream()
+    if not redis:
         return True
 
-    stream_key = _stream_key(job_id)
-    start_time = time.time()
+    deadline = time.time() + timeout_seconds
+    latch_key = worker_started_key(job_id)
 
-    while time.time() - start_time < timeout_seconds:
-        events = _redis_lrange_sync(stream_key, start_index, -1)
-        for event in events:
-            try:
-                ev_data = json.loads(event)
-                if ev_data.get("status") == "started":
-                    return True
-            except Exception:
-                continue
-        await asyncio.sleep(0.5)
+    # BLPOP in slices no longer than STREAM_BLOCK_MS so a wait never outlives the
+    # stream pool's socket timeout.
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
 
-    return False
+        try:
+            popped = await redis.blpop([latch_key], timeout=min(remaining, STREAM_BLOCK_MS / 1000))
+        except Exception as e:
+            print(f"Redis BLPOP error while waiting for worker {job_id}: {e}")
+            await asyncio.sleep(0.5)
+            continue
 
+        if popped:
+            return True
 
-async def _resume_existing_active_session(job_id: str, previous_status: str):
-    """Re-launch worker for an existing active session when heartbeat is stale."""
-    stream_start_index = _get_stream_start_index(job_id)
 
+async def _launch_worker(job_id: str):
+    """Clear any stale start latch, then hand the job to the configured worker backend."""
+    redis = get_async_redis()
+    if redis:
+        await redis.delete(worker_started_key(job_id))
+
+    if WORKER_BACKEND == "daemon":
+        if not redis:
+            raise RuntimeError("WORKER_BACKEND=daemon requires Redis")
+        await redis.rpush(WORKER_QUEUE_KEY, job_id)
+        print(f"📨 Queued JOB_ID={job_id} for a warm worker daemon")
+        return
+    await asyncio.to_thread(_trigger_worker, job_id)
+
+
+async def _watch_worker_boot(job_id: str, timeout_seconds: int = 30):
+    """Async-start mode: enforce the boot timeout after /start has already returned."""
+    if await _wait_for_worker_started(job_id, timeout_seconds=timeout_seconds):
+        return
+
+    print(f"⏱️ Worker for {job_id} did not start within {timeout_seconds}s")
+    try:
+        await _mark_session_failed(job_id)
+    except Exception as e:
+        print(f"Failed to mark {job_id} as failed after boot timeout: {e}")
     try:
-        _trigger_worker(job_id)
+        await _append_stream_event(job_id, {"progress": -1, "status": "error", "message": "Worker initialization timeout"})
+    except Exception as e:
+        print(f"Failed to publish boot timeout for {job_id}: {e}")
+
+
+def _accepted_response(job_id: str, status: str, message: str) -> FastJSONResponse:
+    return FastJSONResponse(
+        status_code=202,
+        content={
+            "job_id": job_id,
+            "status": status,
+            "message": message,
+            "stream_url": f"{router.prefix}/stream?job_id={job_id}",
+        },
+    )
+
+
+async def _resume_existing_active_session(job_id: str, previous_status: str, wait: bool = True):
+    """Re-launch worker for an existing active session when heartbeat is stale."""
+    try:
+        await _launch_worker(job_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to resume existing {previous_status} job: {str(e)}")
 
-    started = await _wait_for_worker_started(job_id, timeout_seconds=15, start_index=stream_start_index)
+    if not wait:
+        return _accepted_response(job_id, previous_status, f"Resuming existing {previous_status} job")
+
+    started = await _wait_for_worker_started(job_id, timeout_seconds=15)
     if started:
         return {
             "job_id": job_id,
@@ -207,43 +292,123 @@ async def _resume_existing_active_session(job_id: str, previous_status: str):
         "message": f"Reattached to {previous_status} job. Worker resume signal pending"
     }
 
+# Lease-hold percentiles change slowly; don't re-read 24 hourly hashes per /start.
+_PHASE_STATS_CACHE_SECONDS = 30
+_phase_stats_cache: Dict[str, Any] = {"at": 0.0, "stats": None}
+
+
+async def _lease_hold_stats() -> Optional[Dict[str, float]]:
+    if time.monotonic() - _phase_stats_cache["at"] > _PHASE_STATS_CACHE_SECONDS:
+        redis = get_async_redis()
+        try:
+            stats = await phase_percentiles(redis, ["lease_hold"]) if redis else {}
+            _phase_stats_cache["stats"] = stats.get("lease_hold")
+        except Exception as e:
+            print(f"Phase stats read error: {e}")
+        _phase_stats_cache["at"] = time.monotonic()
+    return _phase_stats_cache["stats"]
+
+
+def _format_wait(total_sec: int) -> str:
+    if total_sec <= 0:
+        return "Starting soon..."
+    mins, secs = divmod(int(total_sec), 60)
+    return f"{mins} min {secs} sec" if mins > 0 else f"{secs} sec"
+
+
+def _queued_event(position: int, hold_stats: Optional[Dict[str, float]], lock: Optional[str], lease_started_ms: Optional[str], next_at_ms: Optional[str]) -> Dict[str, Any]:
+    """`queued` SSE event with an ETA from measured lease hold times."""
+    now = time.time()
+    lease_elapsed = None
+    if lock:
+        lease_elapsed = now - int(lease_started_ms) / 1000 if lease_started_ms else 0.0
+    pacing_remaining = max(0.0, int(next_at_ms) / 1000 - now) if next_at_ms else 0.0
+    eta = estimate_queue_wait(position, hold_stats, lease_elapsed, pacing_remaining)
+    return {
+        "status": "queued",
+        "queue_position": position,
+        "estimated_wait": _format_wait(eta["seconds"]),
+        "estimated_wait_seconds": eta["seconds"],
+        "estimated_wait_p90_seconds": eta["p90_seconds"],
+    }
+
+
+async def _publish_queue_positions():
+    """
+    Push a fresh `queued` event to every waiting job after the queue head moves:
+    one read pipeline for the queue and lease state, one write pipeline for all
+    streams, instead of each client polling for its position.
+    """
+    redis = get_async_redis()
+    if not redis:
+        return
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.lrange(QUEUE_KEY, 0, -1)
+        pipe.get(LEASE_KEY)
+        pipe.get(LEASE_STARTED_KEY)
+        pipe.get(NEXT_AT_KEY)
+        waiting, lock, lease_started_ms, next_at_ms = await pipe.execute()
+    if not waiting:
+        return
+
+    hold_stats = await _lease_hold_stats()
+    async with redis.pipeline(transaction=False) as pipe:
+        for position, waiting_job_id in enumerate(waiting, 1):
+            _pipe_stream_event(pipe, waiting_job_id, _queued_event(position, hold_stats, lock, lease_started_ms, next_at_ms))
+        await pipe.execute()
+
+
 @router.get("/active")
-async def get_active_session(user_id: str, workflow_type: Optional[str] = None):
+async def get_active_session(
+    request: Request,
+    user_id: str,
+    workflow_type: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: str = "full",
+):
     """
     Returns the most recent workflow session for a given user.
+    `fields=` / `view=summary` shape the payload and If-None-Match is honoured;
+    see lib/session_view.py.
     """
-    user_res = supabase.table("User").select("id").eq("email", user_id).execute()
-    if not user_res.data:
-        user_res = supabase.table("User").select("id").eq("id", user_id).execute()
-        if not user_res.data:
-            return {"job_id": None, "status": "none"}
+    # /active has never returned input_data unless asked for.
+    projection = parse_fields(fields, view) or set(SESSION_FIELDS) - {"input_data"}
+    user = await resolve_user(user_id)
+    if not user:
+        return {"job_id": None, "status": "none"}
             
-    internal_user_id = str(user_res.data[0]["id"])
-    
-    query = supabase.table("workflow_sessions").select("id, status, workflow_type, output_data, last_active_at").eq("user_id", internal_user_id)
-    if workflow_type:
-        query = query.eq("workflow_type", workflow_type)
-        
-    res = query.order("created_at", desc=True).limit(1).execute()
+    internal_user_id = user["id"]
+
+    def latest(columns: str):
+        query = supabase.table("workflow_sessions").select(columns).eq("user_id", internal_user_id)
+        if workflow_type:
+            query = query.eq("workflow_type", workflow_type)
+        return query.order("created_at", desc=True).limit(1).execute()
+
+    if request.headers.get("if-none-match"):
+        head = await db_call("sessions.latest_for_user_head", lambda: latest(HEAD_COLUMNS))
+        if head.data:
+            cached = not_modified(request, session_etag(head.data[0], projection, view))
+            if cached:
+                return cached
+
+    res = await db_call("sessions.latest_for_user", lambda: latest(db_columns(projection, view)))
     
     if not res.data:
         return {"job_id": None, "status": "none"}
         
     session = res.data[0]
-    return {
-        "job_id": session["id"],
-        "status": session["status"],
-        "workflow_type": session["workflow_type"],
-        "output_data": session.get("output_data") or {},
-        "last_active_at": session["last_active_at"]
-    }
+    return session_response(request, shape_session(session, projection, view), session_etag(session, projection, view))
 
 @router.post("/start")
-async def start_job(req: JobStartRequest, background_tasks: BackgroundTasks):
+async def start_job(req: JobStartRequest, background_tasks: BackgroundTasks, wait: bool = True):
     """
     Trigger a new background job. It inserts a run into DB,
     and returns only when the worker has started successfully (Redis latch),
     or after 30s timeout.
+    With `wait=false` it returns 202 right after triggering, with the stream URL;
+    the boot timeout is then enforced in the background.
     """
     if req.workflow_type not in ('fetch_jobs', 'apply_jobs'):
         raise HTTPException(status_code=400, detail="Invalid workflow_type")
@@ -253,58 +418,51 @@ async def start_job(req: JobStartRequest, background_tasks: BackgroundTasks):
     # Let's check DB to get internal UUID. Or if req.user_id is already UUID?
     # In earlier implementations, user_id from frontend (Progress_user) was email.
     
-    # We will search users by email OR id if it's already a UUID.
-    user_res = supabase.table("User").select("id, tier, \"isConnected\"").eq("email", req.user_id).execute()
-    if not user_res.data:
-        # Check if it was passed by UUID directly
-        user_res = supabase.table("User").select("id, tier, \"isConnected\"").eq("id", req.user_id).execute()
-        if not user_res.data:
-            raise HTTPException(status_code=404, detail=f"User {req.user_id} not found in DB")
+    # We will search users by email OR id if it's already a UUID (cached briefly).
+    user_row = await resolve_user(req.user_id)
+    if not user_row:
+        raise HTTPException(status_code=404, detail=f"User {req.user_id} not found in DB")
     
-    user_row = cast(Dict[str, Any], user_res.data[0])
-    internal_user_id = str(user_row["id"])
+    internal_user_id = user_row["id"]
     tier = str(user_row.get("tier", "FREE"))
     is_connected = bool(user_row.get("isConnected", False))
 
     job_id = str(uuid.uuid4())
 
     try:
-        supabase.table("workflow_sessions").insert({
+        await db_call("sessions.insert", lambda: supabase.table("workflow_sessions").insert({
             "id": job_id,
             "user_id": internal_user_id,
             "workflow_type": req.workflow_type,
             "status": "pending",
             "input_data": req.input_data
-        }).execute()
+        }).execute())
     except Exception as e:
         error_msg = str(e)
         if "one_active_job_per_user" in error_msg or "429" in error_msg:
             # Let's see if we can find the active job for this user to return it
-            active_res = supabase.table("workflow_sessions").select("id, workflow_type, status, last_active_at").eq("user_id", internal_user_id).neq("status", "completed").neq("status", "failed").execute()
+            active_res = await db_call("sessions.active_for_user", lambda: supabase.table("workflow_sessions").select("id, workflow_type, status, last_active_at").eq("user_id", internal_user_id).neq("status", "completed").neq("status", "failed").execute())
             if active_res.data:
                 active_job = cast(Dict[str, Any], active_res.data[0])
                 active_job_id = str(active_job.get("id") or "")
                 active_status = str(active_job.get("status") or "running")
 
                 # If the worker process died (heartbeat is missing/expired), mark old job as failed immediately!
-                if not _is_worker_heartbeat_fresh(active_job_id):
+                if not await _is_worker_heartbeat_fresh(active_job_id):
                     print(f"🧹 Clearing dead active job {active_job_id} (heartbeat missing/stale)")
                     try:
-                        supabase.table("workflow_sessions").update({
-                            "status": "failed",
-                            "output_data": {"message": "Workflow aborted: worker process terminated unexpectedly"}
-                        }).eq("id", active_job_id).execute()
+                        await _mark_session_failed(active_job_id, {"message": "Workflow aborted: worker process terminated unexpectedly"})
                         
                         # Re-attempt inserting the new job now that the old job is marked failed
-                        supabase.table("workflow_sessions").insert({
+                        await db_call("sessions.insert", lambda: supabase.table("workflow_sessions").insert({
                             "id": job_id,
                             "user_id": internal_user_id,
                             "workflow_type": req.workflow_type,
                             "status": "pending",
                             "input_data": req.input_data
-                        }).execute()
+                        }).execute())
 
-                        _trigger_worker(job_id)
+                        await _launch_worker(job_id)
                         return {
                             "job_id": job_id,
                             "status": "pending",
@@ -315,9 +473,9 @@ async def start_job(req: JobStartRequest, background_tasks: BackgroundTasks):
 
                 # Only auto-reconnect if it's the exact same workflow type and actually alive
                 if active_job["workflow_type"] == req.workflow_type:
-                    if _should_resume_active_session(active_status, active_job_id, cast(Optional[str], active_job.get("last_active_at"))):
+                    if await _should_resume_active_session(active_status, active_job_id, cast(Optional[str], active_job.get("last_active_at"))):
                         print(f"🔁 Resuming user's stale {active_status} active job: {active_job_id}")
-                        return await _resume_existing_active_session(active_job_id, active_status)
+                        return await _resume_existing_active_session(active_job_id, active_status, wait=wait)
 
                     print(f"🔄 Providing active job for auto-reconnect: {active_job_id}")
                     return {
@@ -334,140 +492,135 @@ async def start_job(req: JobStartRequest, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=f"Database error: {error_msg}")
 
     # Prepare Redis stream
-    stream_key = _stream_key(job_id)
-    if redis_client:
+    redis = get_async_redis()
+    if redis:
         # Clean up any old data randomly, though UUIDs are unique
-        redis_client.delete(stream_key)
+        await redis.delete(_stream_key(job_id))
 
     # Trigger Worker or Queue
     if tier.upper() == "PRO" and is_connected:
         try:
-            _trigger_worker(job_id)
+            await _launch_worker(job_id)
         except Exception as e:
             # Mark failed
-            supabase.table("workflow_sessions").update({"status": "failed"}).eq("id", job_id).execute()
+            await _mark_session_failed(job_id)
             raise HTTPException(status_code=500, detail=f"Failed to trigger worker: {str(e)}")
 
+        if not wait:
+            background_tasks.add_task(_watch_worker_boot, job_id, 30)
+            return _accepted_response(job_id, "pending", "Job accepted; worker is starting")
+
         # Redis Latch - Wait up to 30 seconds for worker to start
         worker_started = await _wait_for_worker_started(job_id, timeout_seconds=30)
         if not worker_started:
-            if redis_client:
-                supabase.table("workflow_sessions").update({"status": "failed"}).eq("id", job_id).execute()
+            if redis:
+                await _mark_session_failed(job_id)
             raise HTTPException(status_code=504, detail="Worker initialization timeout")
     else:
         # FREE / Unconnected queue logic
-        if redis_client:
-            redis_client.rpush("free_users_queue", job_id)
-            pos = _redis_llen_sync("free_users_queue")
-            
-            # Check if a job is currently running to calculate exact time remaining
-            lock = _redis_get_sync("dummy_account_lock")
-            if lock and redis_client:
-                ttl = redis_client.ttl("dummy_account_lock")
-                elapsed = 1800 - ttl if ttl > 0 else 0
-                time_remaining = max(0, 215 - elapsed)
-                total_sec = time_remaining + max(0, pos - 1) * 215
-            else:
-                total_sec = max(0, pos - 1) * 215
-                
-            mins, secs = divmod(int(total_sec), 60)
-            est_str = f"{mins} min {secs} sec" if mins > 0 else f"{secs} sec"
-            if total_sec == 0: est_str = "Starting soon..."
-            
-            redis_client.rpush(_stream_key(job_id), json.dumps({"status": "queued", "queue_position": pos, "estimated_wait": est_str}))
+        if redis:
+            # One round trip: enqueue and read everything the ETA needs
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.rpush(QUEUE_KEY, job_id)
+                pipe.get(LEASE_KEY)
+                pipe.get(LEASE_STARTED_KEY)
+                pipe.get(NEXT_AT_KEY)
+                pipe.get(STATUS_KEY)
+                pos, lock, lease_started_ms, next_at_ms, status = await pipe.execute()
+
+            queued = _queued_event(pos, await _lease_hold_stats(), lock, lease_started_ms, next_at_ms)
+            await _append_stream_event(job_id, queued)
             
-            # Kickstart if necessary
-            status = _redis_get_sync("free_queue_status")
-            lock = _redis_get_sync("dummy_account_lock")
+            # Claim right away if the account is free; otherwise the dispatcher
+            # picks this job up when the current lease is released.
             if status != "paused" and not lock:
-                _kickstart_queue()
+                await free_dispatcher.dispatch()
     
+    if not wait:
+        return _accepted_response(job_id, "queued", "Job accepted into the queue")
     return {"message": "Job started successfully", "job_id": job_id}
 
-def _kickstart_queue():
-    if not redis_client: return
-    status = _redis_get_sync("free_queue_status")
-    if status == "paused": return
-    lock = _redis_get_sync("dummy_account_lock")
-    if lock: return
-    
-    job_id_bytes = redis_client.lpop("free_users_queue")
-    if job_id_bytes:
-        job_id = job_id_bytes if isinstance(job_id_bytes, str) else job_id_bytes.decode('utf-8')
-        redis_client.setex("dummy_account_lock", 1800, job_id)
-        try:
-            _trigger_worker(job_id)
-        except Exception as e:
-            supabase.table("workflow_sessions").update({"status": "failed"}).eq("id", job_id).execute()
-            redis_client.delete("dummy_account_lock")
-
 @router.post("/trigger-next-queue")
-def trigger_next_queue():
-    """Endpoint hit by QStash to process the next job in the queue."""
-    if not redis_client: return {"status": "error", "message": "Redis not configured"}
-    status = _redis_get_sync("free_queue_status")
-    if status == "paused":
-        # Return 200 OK without processing to drop the trigger and not stall QStash
-        return {"status": "paused", "message": "Queue is currently paused"}
-        
-    job_id_bytes = redis_client.lpop("free_users_queue")
-    if not job_id_bytes:
-        return {"status": "empty", "message": "Queue is empty"}
-        
-    job_id = job_id_bytes if isinstance(job_id_bytes, str) else job_id_bytes.decode('utf-8')
-    redis_client.setex("dummy_account_lock", 1800, job_id)
-    
-    try:
-        _trigger_worker(job_id)
-        return {"status": "triggered", "job_id": job_id}
-    except Exception as e:
-        supabase.table("workflow_sessions").update({"status": "failed"}).eq("id", job_id).execute()
-        redis_client.delete("dummy_account_lock")
-        return {"status": "error", "message": str(e)}
+async def trigger_next_queue():
+    """Claim and launch the next free-tier job (external cron / QStash fallback)."""
+    return await free_dispatcher.dispatch()
 
 @router.post("/admin/unpause-queue")
-def unpause_queue():
-    if not redis_client: return {"error": "Redis not configured"}
-    redis_client.set("free_queue_status", "active")
-    _kickstart_queue()
+async def unpause_queue():
+    redis = get_async_redis()
+    if not redis: return {"error": "Redis not configured"}
+    await redis.set(STATUS_KEY, "active")
+    await free_dispatcher.dispatch()
     return {"message": "Queue unpaused and kickstarted"}
 
+@router.get("/admin/phase-stats")
+async def phase_stats():
+    """Rolling worker phase durations (count, mean, p50/p90/p99 seconds) behind queue ETAs."""
+    redis = get_async_redis()
+    if not redis: return {"error": "Redis not configured"}
+    return await phase_percentiles(redis)
+
+@router.get("/admin/queue-stats")
+async def queue_stats():
+    """Free-tier queue depth, current lease holder and dispatcher counters."""
+    redis = get_async_redis()
+    if not redis: return {"error": "Redis not configured"}
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.llen(QUEUE_KEY)
+        pipe.get(LEASE_KEY)
+        pipe.pttl(LEASE_KEY)
+        pipe.get(STATUS_KEY)
+        depth, holder, lease_ttl_ms, status = await pipe.execute()
+    return {
+        "queue_depth": depth,
+        "lease_holder": holder,
+        "lease_ttl_ms": lease_ttl_ms if holder else None,
+        "status": status or "active",
+        "dispatcher": free_dispatcher.stats(),
+    }
+
 @router.get("/stream")
-async def stream_job(job_id: str):
+async def stream_job(
+    job_id: str,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
     """
     Server-Sent Events (SSE) endpoint to stream progress from Redis.
+    Each event carries its Redis Stream ID as the SSE `id`; a reconnecting client
+    resumes after `Last-Event-ID` (header, or `last_event_id` query param).
     """
-    stream_key = f"stream:{job_id}"
-    
+    resume_from = last_event_id_header or last_event_id
+
     async def event_generator():
-        last_index = 0
+        last_id = resume_from or STREAM_START_ID
         try:
-            # Send initial connection success
-            yield {
-                "data": json.dumps({"progress": 0, "status": "connected", "message": "Connected to job stream"})
-            }
-            
-            while True:
-                if not redis_client:
-                    yield {"data": json.dumps({"error": "Redis not configured", "status": "error"})}
-                    break
-
-                events = _redis_lrange_sync(stream_key, last_index, -1)
-                for event in events:
-                    yield {"data": event}
-                    last_index += 1
-                    
-                    try:
-                        ev_data = json.loads(event)
+            # Send initial connection success (a resumed client keeps its current progress)
+            connected = {"status": "connected", "message": "Connected to job stream"}
+            if not resume_from:
+                connected["progress"] = 0
+            yield {"data": json.dumps(connected)}
+
+            if not get_async_redis_stream():
+                yield {"data": json.dumps({"error": "Redis not configured", "status": "error"})}
+                return
+
+            async with aclosing(stream_hub.listen(job_id, last_id, idle_timeout=STREAM_BLOCK_MS / 1000)) as entries:
+                async for entry in entries:
+                    if entry is not None:
+                        entry_id, event = entry
+                        yield {"id": entry_id, "data": event}
+                        last_id = entry_id
+
                         # Close stream on termination states
-                        if ev_data.get("status") in ("done", "error") or ev_data.get("progress") == -1:
+                        if is_terminal_event(event):
                             return
-                    except:
-                        pass
-                
-                # Check DB fallback in case worker died without writing 'error' to Redis
-                if last_index > 0 and len(events) == 0:
-                    status_res = supabase.table("workflow_sessions").select("status").eq("id", job_id).execute()
+                        continue
+
+                    # Idle: check DB fallback in case worker died without writing 'error' to Redis
+                    if last_id == STREAM_START_ID:
+                        continue
+                    status_res = await db_call("sessions.status", lambda: supabase.table("workflow_sessions").select("status").eq("id", job_id).execute())
                     if status_res.data:
                         db_status = status_res.data[0]["status"]
                         if db_status in ("completed", "failed"):
@@ -476,80 +629,122 @@ async def stream_job(job_id: str):
                                 "message": f"Job ended in DB with status: {db_status}"
                             })}
                             return
-
-                await asyncio.sleep(1)
         except asyncio.CancelledError:
             print(f"SSE client disconnected for job {job_id}")
 
     return EventSourceResponse(event_generator())
 
+@router.get("/snapshot")
+async def get_job_snapshot(job_id: str, after_batch: int = 0):
+    """
+    Structured jobs published so far, as the batches newer than `after_batch`.
+    `batch_ready` SSE events only carry counts; clients call this once on attach
+    and then again with the highest `batch_num` they hold.
+    """
+    batches = []
+    redis = get_async_redis()
+    fields = await redis.hkeys(snapshot_key(job_id)) if redis else []
+    if fields:
+        wanted = sorted(n for n in (int(f) for f in fields if f.isdigit()) if n > after_batch)
+        if wanted:
+            values = await redis.hmget(snapshot_key(job_id), [str(n) for n in wanted])
+            batches = [{"batch_num": n, "jobs": json.loads(v)} for n, v in zip(wanted, values) if v]
+        return {"job_id": job_id, "source": "stream", "batches": batches}
+
+    # Snapshot expired (or never existed): a completed job's result is in the DB.
+    if after_batch == 0:
+        res = await db_call("sessions.output", lambda: supabase.table("workflow_sessions").select("status", "output_data").eq("id", job_id).execute())
+        if res.data and res.data[0]["status"] == "completed":
+            output = res.data[0].get("output_data")
+            jobs = output if isinstance(output, list) else (output or {}).get("jobs", [])
+            if jobs:
+                batches = [{"batch_num": 0, "jobs": jobs}]
+            return {"job_id": job_id, "source": "db", "batches": batches}
+
+    return {"job_id": job_id, "source": "stream", "batches": batches}
+
+@router.get("/admin/stream-stats")
+def stream_stats():
+    """
+    SSE fan-out metrics for this API process: subscribers per job, the shared
+    XREAD, and how much of the stream pool (REDIS_STREAM_POOL_MAX_CONNECTIONS)
+    is in use.
+    """
+    return {**stream_hub.stats(), "stream_pool": async_redis_pool_stats(get_async_redis_stream())}
+
+@router.get("/admin/workers")
+async def worker_fleet_view():
+    """Every worker with its latest phase, progress and RSS; stale heartbeats are flagged."""
+    redis = get_async_redis()
+    if not redis:
+        raise HTTPException(status_code=503, detail="Redis not configured")
+    return await worker_fleet(redis)
+
+@router.get("/admin/db-stats")
+def database_stats():
+    """Supabase call latency and error/timeout counts for this API process."""
+    return {**db_stats(), "identity_cache": identity_cache_stats()}
+
 @router.get("/status")
-def get_job_status(job_id: str):
+async def get_job_status(request: Request, job_id: str, fields: Optional[str] = None, view: str = "full"):
     """
     Fallback endpoint to query exact job state and results from DB.
     Useful if SSE disconnects or user comes back later.
+    `fields=` / `view=summary` shape the payload and If-None-Match is honoured;
+    see lib/session_view.py.
     """
-    res = supabase.table("workflow_sessions").select("status", "output_data", "input_data", "workflow_type", "last_active_at").eq("id", job_id).execute()
+    projection = parse_fields(fields, view)
+
+    if request.headers.get("if-none-match"):
+        head = await db_call("sessions.status_head", lambda: supabase.table("workflow_sessions").select(HEAD_COLUMNS).eq("id", job_id).execute())
+        if not head.data:
+            raise HTTPException(status_code=404, detail="Job not found")
+        cached = not_modified(request, session_etag(head.data[0], projection, view))
+        if cached:
+            return cached
+
+    res = await db_call("sessions.status", lambda: supabase.table("workflow_sessions").select(db_columns(projection, view)).eq("id", job_id).execute())
     if not res.data:
         raise HTTPException(status_code=404, detail="Job not found")
 
     job_data = res.data[0]
-    return {
-        "job_id": job_id,
-        "status": job_data["status"],
-        "workflow_type": job_data["workflow_type"],
-        "output_data": job_data.get("output_data", {}),
-        "input_data": job_data.get("input_data", {}),
-        "last_active_at": job_data["last_active_at"]
-    }
+    return session_response(request, shape_session(job_data, projection, view), session_etag(job_data, projection, view))
 
 class CleanupRequest(BaseModel):
     user_id: str
 
 @router.post("/cleanup")
-def cleanup_old_sessions(req: CleanupRequest):
+async def cleanup_old_sessions(req: CleanupRequest):
     """
-    Delete completed or failed sessions older than 30 days for this user.
-    Keeps at least the 5 most recent sessions.
+    Delete completed or failed sessions older than SESSION_RETENTION_DAYS for
+    this user, keeping at least the SESSION_KEEP_RECENT most recent ones.
     """
-    user_res = supabase.table("User").select("id").eq("email", req.user_id).execute()
-    if not user_res.data:
-        user_res = supabase.table("User").select("id").eq("id", req.user_id).execute()
-        if not user_res.data:
-            raise HTTPException(status_code=404, detail=f"User {req.user_id} not found in DB")
-    
-    internal_user_id = user_res.data[0]["id"]
-    
-    # Supabase Python client doesn't support complex aggregate deletes easily,
-    # so we fetch the candidate IDs first
-    res = supabase.table("workflow_sessions").select("id, created_at").eq("user_id", internal_user_id).in_("status", ["completed", "failed"]).order("created_at", desc=True).execute()
-    
-    if not res.data or len(res.data) <= 5:
-        return {"message": "No cleanup needed", "deleted_count": 0}
-        
-    import datetime
-    thirty_days_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=30)
+    user = await resolve_user(req.user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail=f"User {req.user_id} not found in DB")
     
-    # Keep the 5 most recent, look at the rest
-    candidates = res.data[5:]
-    to_delete = []
-    
-    for row in candidates:
-        try:
-            # created_at format example: "2024-03-30T10:00:00+00:00"
-            dt = datetime.datetime.fromisoformat(row["created_at"].replace('Z', '+00:00'))
-            if dt < thirty_days_ago:
-                to_delete.append(row["id"])
-        except:
-            # If date parse fails, append it just to be safe it gets cleaned up
-            to_delete.append(row["id"])
-            
-    if not to_delete:
-        return {"message": "No sessions older than 30 days found", "deleted_count": 0}
-        
-    # Delete in batches or one IN statement
+    internal_user_id = user["id"]
+
     try:
-        supabase.table("workflow_sessions").delete().in_("id", to_delete).execute()
-        return {"message": "Cleanup successful", "deleted_count": len(to_delete)}
+        result = await purge_sessions(lambda batch_size: _purge_sessions_batch(internal_user_id, batch_size))
+    except DBTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete old sessions: {str(e)}")
+
+    if not result["deleted_count"]:
+        return {"message": "No cleanup needed", **result}
+    return {"message": "Cleanup successful", **result}
+
+@router.get("/admin/sweep-stats")
+def session_sweep_stats():
+    """Retention sweeper runs and rows/bytes reclaimed by this API process."""
+    return session_sweeper.stats()
+
+@router.post("/admin/sweep-sessions")
+async def sweep_sessions_now():
+    """Run the all-users retention sweep now (skipped if another instance holds the lock)."""
+    result = await session_sweeper.sweep()
+    if result is None:
+        return {"status": "skipped", "message": "Another sweep ran within the interval"}
+    return {"status": "ok", **result}
@@ -1,6 +1,8 @@
 
 from pydantic import BaseModel
 from database.linkedin_context import clear_linkedin_context
+from database.db_async import db_call
+from database.identity_cache import invalidate_user
 from typing import List
 from fastapi import APIRouter
 
@@ -14,7 +16,9 @@ async def logout_context(request: LogoutReq):
     # if linkedin_login_context == None:
     #     return {"status": "success", "message": "context is empty no need to log out"}
     # await clear_login_context()
-    if clear_linkedin_context(request.user_id):
+    cleared = await db_call("users.clear_linkedin_context", lambda: clear_linkedin_context(request.user_id))
+    await invalidate_user(request.user_id)
+    if cleared:
         return {"status": "success", "message": "Logged out successfully"}
     else:
         return {"status": "Failed", "message": "Log out failed"}
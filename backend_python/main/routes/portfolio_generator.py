@@ -5,7 +5,6 @@ import base64
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, HttpUrl, field_validator
 from typing import List, Dict, Any, Optional
-from agents.portfolio_agent import generate_portfolio_main as main
 from main.routes import image2base64
 
 class PortfolioRequest(BaseModel):
@@ -43,6 +42,9 @@ router = APIRouter()
 @router.post("/portfolio", response_model= PortfolioResponses)
 def portfolio_Builder(request: PortfolioRequest):
     try:
+        # Imported per request: the agent is mostly large template literals.
+        from agents.portfolio_agent import generate_portfolio_main as main
+
         if request.user_data and request.resume_url:
             raise HTTPException(
             status_code=500, 
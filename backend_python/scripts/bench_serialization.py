@@ -0,0 +1,135 @@
+"""
+Serialization / wire-size micro-benchmark for the API's large responses.
+
+Compares, per representative payload:
+
+  before  Starlette's JSONResponse (json.dumps), sent uncompressed
+  after   lib.json_response.FastJSONResponse (orjson), gzipped the way
+          lib.compression.CompressionMiddleware does it
+
+Payloads: a structured fetch_jobs result, a /tailor base64 PDF, a /portfolio
+HTML document and the /portfolio/get-templates base64 PNG gallery (built from
+the real template images in main/routes/templates). Run from backend_python/:
+
+    python scripts/bench_serialization.py
+    python scripts/bench_serialization.py --jobs 500 --repeat 50
+"""
+import argparse
+import base64
+import glob
+import gzip
+import os
+import random
+import statistics
+import sys
+import time
+import zlib
+
+from fastapi.responses import JSONResponse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from lib.compression import COMPRESS_LEVEL  # noqa: E402
+from lib.json_response import FastJSONResponse, orjson  # noqa: E402
+
+_WORDS = (
+    "python fastapi react typescript kubernetes docker postgres redis aws gcp "
+    "senior engineer backend frontend platform remote hybrid bengaluru münchen "
+    "experience requirements responsibilities benefits équipe salary equity"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def job_list(count: int):
+    rng = random.Random(7)
+    return [
+        {
+            "job_url": f"https://www.linkedin.com/jobs/view/{4000000000 + i}/",
+            "title": _text(rng, 4).title(),
+            "company": _text(rng, 2).title(),
+            "location": _text(rng, 2).title(),
+            "description": _text(rng, 350),
+            "skills": [rng.choice(_WORDS) for _ in range(8)],
+            "match_score": rng.randint(40, 99),
+            "relevant": rng.random() > 0.3,
+        }
+        for i in range(count)
+    ]
+
+
+def tailor_pdf():
+    # PDF content streams are deflate-compressed, so model the file as such.
+    rng = random.Random(11)
+    pdf = b"%PDF-1.7\n" + zlib.compress(_text(rng, 120_000).encode(), 6)
+    return {"success": True, "payload": [base64.b64encode(pdf).decode()], "media": "application/pdf"}
+
+
+def portfolio_html():
+    rng = random.Random(13)
+    sections = "".join(
+        f'<section class="project card shadow-lg p-6"><h2 class="text-xl font-bold">{_text(rng, 4)}</h2>'
+        f'<p class="text-gray-600 leading-relaxed">{_text(rng, 80)}</p></section>'
+        for _ in range(250)
+    )
+    return {"success": True, "payload": f"<!DOCTYPE html><html><head><style>{'.c{margin:0}' * 400}</style></head><body>{sections}</body></html>"}
+
+
+def template_gallery():
+    paths = sorted(glob.glob(os.path.join(BACKEND_DIR, "main", "routes", "templates", "*.png")))
+    gallery = []
+    for i, path in enumerate(paths):
+        with open(path, "rb") as f:
+            gallery.append({"image": "data:image/png;base64," + base64.b64encode(f.read()).decode(), "template": i})
+    return gallery
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=300, help="jobs in the structured job list")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("⚠️ orjson is not installed; 'after' uses the stdlib fallback")
+
+    payloads = {
+        f"job list ({args.jobs})": job_list(args.jobs),
+        "tailor PDF": tailor_pdf(),
+        "portfolio HTML": portfolio_html(),
+        "template gallery": template_gallery(),
+    }
+
+    before_render = JSONResponse(None).render
+    after_render = FastJSONResponse(None).render
+
+    print(f"{'payload':<20} {'json ms':>8} {'orjson ms':>10} {'gzip ms':>8} {'before KB':>10} {'after KB':>9} {'saved':>6}")
+    for name, payload in payloads.items():
+        before = before_render(payload)
+        after = after_render(payload)
+        wire = gzip.compress(after, COMPRESS_LEVEL, mtime=0)
+
+        json_ms = timed(lambda: before_render(payload), args.repeat)
+        orjson_ms = timed(lambda: after_render(payload), args.repeat)
+        gzip_ms = timed(lambda: gzip.compress(after, COMPRESS_LEVEL, mtime=0), args.repeat)
+        saved = 100 * (1 - len(wire) / len(before))
+        print(
+            f"{name:<20} {json_ms:8.2f} {orjson_ms:10.2f} {gzip_ms:8.2f} "
+            f"{len(before) / 1024:10.1f} {len(wire) / 1024:9.1f} {saved:5.0f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
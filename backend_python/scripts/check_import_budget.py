@@ -0,0 +1,69 @@
+"""
+Import-time budget for the API process.
+
+Runs `python -X importtime -c "import main.main"` in a fresh interpreter and
+fails (exit 1) when the cumulative import time of `main.main` exceeds the
+budget, printing the slowest top-level imports so the regression is easy to
+find. tests/test_import_budget.py runs the same check under pytest (and so in
+CI). Run from backend_python/:
+
+    python scripts/check_import_budget.py            # IMPORT_BUDGET_MS or 1500
+    python scripts/check_import_budget.py --budget-ms 800 --module main.main
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def measure(module: str):
+    """Return (cumulative_us of `module`, [(cumulative_us, name)] of direct-ish children)."""
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-4000:])
+        raise SystemExit(f"Importing {module} failed")
+
+    total_us = 0
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if name == module:
+            total_us = cumulative
+        elif indent <= 3:
+            entries.append((cumulative, name))
+    return total_us, sorted(entries, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main.main")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    total_us, entries = measure(args.module)
+    total_ms = total_us / 1000
+    print(f"{args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for cumulative, name in entries[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if total_ms > args.budget_ms:
+        print(f"❌ Import time over budget by {total_ms - args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print("✅ Import time within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The backend modules import config at module level; give it harmless values
+# so tests never need real credentials or a Redis server.
+os.environ.setdefault("PROJECT_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_API", "test.test.test")
+os.environ["REDIS_URL"] = ""  # set (not unset) so a local .env cannot fill it in
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
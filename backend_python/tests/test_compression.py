@@ -0,0 +1,42 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from lib.compression import CompressionMiddleware, if_none_match_tags
+from lib.json_response import FastJSONResponse
+from lib.session_view import not_modified
+
+_ETAG = '"abc"'
+
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/session")
+    def session(request: Request):
+        return not_modified(request, _ETAG) or FastJSONResponse({"jobs": "x" * 4000}, headers={"ETag": _ETAG})
+
+    return TestClient(app)
+
+
+def test_if_none_match_tags_drops_weak_prefixes():
+    assert if_none_match_tags('W/"a", "b-gzip" ,') == ['"a"', '"b-gzip"']
+    assert if_none_match_tags(None) == []
+
+
+def test_gzipped_body_revalidates_with_the_suffixed_tag():
+    client = _client()
+    first = client.get("/session")
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"] == '"abc-gzip"'
+
+    revalidated = client.get("/session", headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == '"abc-gzip"'
+    assert "accept-encoding" in revalidated.headers["vary"].lower()
+
+
+def test_identity_tag_revalidates_unsuffixed():
+    revalidated = _client().get("/session", headers={"If-None-Match": _ETAG})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == _ETAG
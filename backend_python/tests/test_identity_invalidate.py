@@ -0,0 +1,34 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main.routes import auth_api
+
+
+def _client(monkeypatch, secret):
+    invalidated = []
+
+    async def fake_invalidate(user_id):
+        invalidated.append(user_id)
+
+    monkeypatch.setattr(auth_api, "INTERNAL_API_SECRET", secret)
+    monkeypatch.setattr(auth_api, "invalidate_user", fake_invalidate)
+    app = FastAPI()
+    app.include_router(auth_api.router)
+    return TestClient(app), invalidated
+
+
+def test_invalidate_requires_the_internal_secret(monkeypatch):
+    client, invalidated = _client(monkeypatch, "s3cret")
+
+    assert client.post("/api/identity/invalidate", json={"user_id": "u1"}).status_code == 401
+    assert client.post("/api/identity/invalidate", json={"user_id": "u1"}, headers={"X-Internal-Secret": "nope"}).status_code == 401
+    assert client.post("/api/identity/invalidate", json={"user_id": "u1"}, headers={"X-Internal-Secret": "s3cret"}).status_code == 200
+    assert invalidated == ["u1"]
+
+
+def test_invalidate_is_disabled_without_a_configured_secret(monkeypatch):
+    client, invalidated = _client(monkeypatch, None)
+
+    response = client.post("/api/identity/invalidate", json={"user_id": "u1"}, headers={"X-Internal-Secret": ""})
+    assert response.status_code == 503
+    assert invalidated == []
@@ -0,0 +1,16 @@
+import importlib.util
+import os
+
+_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "check_import_budget.py")
+_spec = importlib.util.spec_from_file_location("check_import_budget", _SCRIPT)
+check_import_budget = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(check_import_budget)
+
+
+def test_api_import_time_within_budget():
+    total_us, entries = check_import_budget.measure("main.main")
+    total_ms = total_us / 1000
+    slowest = ", ".join(f"{name} {us / 1000:.0f}ms" for us, name in entries[:5])
+    assert total_ms <= check_import_budget.DEFAULT_BUDGET_MS, (
+        f"main.main imports in {total_ms:.0f} ms, over the {check_import_budget.DEFAULT_BUDGET_MS:.0f} ms budget; slowest: {slowest}"
+    )
@@ -0,0 +1,72 @@
+from lib import scrape_checkpoint
+
+
+class _FakeRedis:
+    """Just the hash commands the checkpoint uses, recording every field written."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.writes = []
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def hset(self, key, mapping):
+        self.writes.extend(mapping)
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        pass
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+def _state(completed, jobs):
+    return {
+        "titles": ["A", "B", "C"],
+        "completed_titles": completed,
+        "raw_jobs": {f"https://jobs/{i}": {"job_description": f"jd {i}"} for i in range(jobs)},
+    }
+
+
+def test_each_job_is_written_once_across_saves():
+    client = _FakeRedis()
+    save = scrape_checkpoint.CheckpointWriter(client, "job-1")
+
+    save(_state(["A"], 10))
+    save(_state(["A", "B"], 20))
+    save(_state(["A", "B", "C"], 30))
+
+    job_writes = [field for field in client.writes if field.startswith("https://")]
+    assert len(job_writes) == 30
+
+    state = scrape_checkpoint.load(client, "job-1")
+    assert state["completed_titles"] == ["A", "B", "C"]
+    assert len(state["raw_jobs"]) == 30
+    assert state["processed_urls"] == sorted(state["raw_jobs"])
+
+
+def test_resumed_writer_skips_jobs_already_saved():
+    client = _FakeRedis()
+    scrape_checkpoint.CheckpointWriter(client, "job-1")(_state(["A"], 10))
+
+    resumed = scrape_checkpoint.load(client, "job-1")
+    client.writes.clear()
+    scrape_checkpoint.CheckpointWriter(client, "job-1", already_saved=resumed["raw_jobs"])(_state(["A", "B"], 15))
+
+    assert len([field for field in client.writes if field.startswith("https://")]) == 5
+
+
+def test_missing_checkpoint_loads_as_none():
+    client = _FakeRedis()
+    assert scrape_checkpoint.load(client, "job-1") is None
+    scrape_checkpoint.CheckpointWriter(client, "job-1")(_state(["A"], 1))
+    scrape_checkpoint.clear(client, "job-1")
+    assert scrape_checkpoint.load(client, "job-1") is None
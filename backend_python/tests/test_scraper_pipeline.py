@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+import config
+from agents import scraper_agent
+
+
+class _Query:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return type("Result", (), {"data": self._rows})()
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.updates = []
+
+    def table(self, name):
+        if name == "User":
+            return _Query([{"user_data": {"titles": ["Engineer"]}, "isConnected": True, "applied_jobs": []}])
+        return _Query([])
+
+
+def test_put_while_consuming_reraises_when_consumer_dies():
+    async def scenario():
+        queue = asyncio.Queue(maxsize=1)
+        queue.put_nowait("full")
+
+        async def consumer():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad payload")
+
+        task = asyncio.create_task(consumer())
+        with pytest.raises(ValueError, match="bad payload"):
+            await asyncio.wait_for(scraper_agent.put_while_consuming(queue, "next", task), timeout=2)
+
+    asyncio.run(scenario())
+
+
+def test_pipeline_fails_when_analyzer_raises_mid_stream(monkeypatch):
+    produced = []
+
+    async def failing_batches(queue, initial=None, **kwargs):
+        first = await queue.get()
+        yield {first[0]: first[1]}
+        raise ValueError("bad payload")
+
+    async def fake_search(titles, on_job=None, **kwargs):
+        # Far more jobs than the bounded analysis queue holds.
+        for i in range(10 * scraper_agent.ANALYSIS_BATCH_MAX_JOBS):
+            await on_job(f"https://www.linkedin.com/jobs/view/{i}", {"job_description": "x"})
+            produced.append(i)
+        return {}
+
+    async def fake_extract(batch, fallback=False):
+        return []
+
+    monkeypatch.setattr(config, "supabase", _FakeSupabase())
+    monkeypatch.setattr(scraper_agent, "stream_batches", failing_batches)
+    monkeypatch.setattr(scraper_agent, "search_by_job_titles_speed_optimized", fake_search)
+    monkeypatch.setattr(scraper_agent, "extract_single_batch", fake_extract)
+
+    job = {"user_id": "user-1", "status": "pending", "input_data": {}, "output_data": {}}
+    with pytest.raises(ValueError, match="bad payload"):
+        asyncio.run(asyncio.wait_for(scraper_agent._async_scraper_pipeline("job-1", job, lambda event: None), timeout=5))
+    assert len(produced) < 10 * scraper_agent.ANALYSIS_BATCH_MAX_JOBS
@@ -0,0 +1,18 @@
+from lib.session_view import db_columns, session_etag
+
+
+def _row(**overrides):
+    row = {"id": "job-1", "status": "running", "version": 3, "last_active_at": "2026-01-01T00:00:00+00:00"}
+    row.update(overrides)
+    return row
+
+
+def test_etag_follows_the_row_version_not_liveness():
+    etag = session_etag(_row(), None, "full")
+
+    assert session_etag(_row(last_active_at="2026-01-01T00:05:00+00:00"), None, "full") == etag
+    assert session_etag(_row(version=4), None, "full") != etag
+
+
+def test_db_columns_always_include_the_version():
+    assert db_columns({"job_id", "status"}, "full").split(", ")[:3] == ["id", "status", "version"]
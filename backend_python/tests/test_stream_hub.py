@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+import pytest
+
+from lib.job_stream import stream_key
+from lib.stream_hub import StreamHub
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+async def _collect(hub, job_id, count, out):
+    async for entry in hub.listen(job_id, idle_timeout=5):
+        if entry is not None:
+            out.append(json.loads(entry[1])["i"])
+            if len(out) == count:
+                return
+
+
+def test_new_job_joins_the_shared_read_without_waiting_out_the_block():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        # A long block: without the wake stream the second job would wait it out.
+        hub = StreamHub(lambda: redis, block_ms=10_000)
+        got_a, got_b = [], []
+
+        watch_a = asyncio.create_task(_collect(hub, "a", 2, got_a))
+        await asyncio.sleep(0.2)
+        watch_b = asyncio.create_task(_collect(hub, "b", 1, got_b))
+        await asyncio.sleep(0.2)
+
+        for i in (1, 2):
+            await redis.xadd(stream_key("a"), {"data": json.dumps({"i": i})})
+        await redis.xadd(stream_key("b"), {"data": json.dumps({"i": 1})})
+        await asyncio.wait_for(asyncio.gather(watch_a, watch_b), timeout=3)
+
+        stats = hub.stats()
+        await hub.close()
+        return got_a, got_b, stats
+
+    got_a, got_b, stats = asyncio.run(scenario())
+    assert got_a == [1, 2]
+    assert got_b == [1]
+    assert stats["readers"] == 1
+    assert stats["wakeups"] >= 1
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+import worker
+from agents import apply_agent, scraper_agent
+
+
+class _Query:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return type("Result", (), {"data": self._rows})()
+
+
+class _FakeSupabase:
+    def table(self, name):
+        return _Query([{"id": "job", "status": "pending", "workflow_type": "fetch_jobs"}])
+
+
+def test_second_job_does_not_see_first_jobs_login_context(monkeypatch):
+    seen = []
+
+    def fake_pipeline(job_id, job_data):
+        seen.append((scraper_agent.LOGGED_IN_CONTEXT, apply_agent.FIRST_NAME))
+        # What a real run leaves behind in the module globals.
+        scraper_agent.LOGGED_IN_CONTEXT = f"context-of-{job_id}"
+        apply_agent.FIRST_NAME = f"name-of-{job_id}"
+
+    monkeypatch.setattr(worker, "supabase", _FakeSupabase())
+    monkeypatch.setattr(worker, "run_fetch_jobs_pipeline", fake_pipeline)
+    # Restored afterwards, so the leftovers below do not reach other tests.
+    monkeypatch.setattr(scraper_agent, "LOGGED_IN_CONTEXT", None)
+    monkeypatch.setattr(apply_agent, "FIRST_NAME", "")
+
+    for job_id in ("job-1", "job-2"):
+        with pytest.raises(SystemExit):
+            worker.run_job(job_id)
+
+    assert seen == [(None, ""), (None, "")]
+
+
+def test_watchdog_fails_a_hung_job_and_exits(monkeypatch):
+    failed, exits = [], []
+    monkeypatch.setattr(worker, "fail_job", lambda job_id, message: failed.append(job_id))
+    monkeypatch.setattr(worker.os, "_exit", lambda code: exits.append(code))
+
+    worker.job_watchdog("job-1", threading.Event(), 0.01)
+
+    assert failed == ["job-1"]
+    assert exits == [1]
+
+
+def test_watchdog_leaves_a_finished_job_alone(monkeypatch):
+    failed = []
+    monkeypatch.setattr(worker, "fail_job", lambda job_id, message: failed.append(job_id))
+    done = threading.Event()
+    done.set()
+
+    worker.job_watchdog("job-1", done, 5)
+
+    assert failed == []
+
+
+def test_cleanup_stops_the_heartbeat_before_leaving_the_fleet(monkeypatch):
+    calls = []
+    beating = threading.Event()
+
+    def slow_heartbeat(client, job_id, state):
+        beating.set()
+        threading.Event().wait(0.2)  # a beat still in flight when the job ends
+        calls.append("beat")
+
+    monkeypatch.setattr(worker, "redis_client", object())
+    monkeypatch.setattr(worker, "heartbeat", slow_heartbeat)
+    monkeypatch.setattr(worker, "renew_lease", lambda client, job_id: None)
+    monkeypatch.setattr(worker, "release_lease", lambda client, job_id: None)
+    monkeypatch.setattr(worker, "leave_fleet", lambda client, job_id: calls.append("leave"))
+
+    worker.start_heartbeat("job-1")
+    assert beating.wait(2)
+    with pytest.raises(SystemExit):
+        worker.cleanup_and_exit("job-1")
+
+    assert calls == ["beat", "leave"]
@@ -3,8 +3,43 @@ import sys
 import json
 import time
 import threading
+import importlib
 
+from lib.boot_profile import boot_profiler
 from config import supabase, redis_client
+from lib.event_writer import EventWriter
+from lib.free_scheduler import ack_claim, release_lease, renew_lease
+from lib.phase_metrics import record_phase
+from lib.job_stream import (
+    WORKER_QUEUE_KEY,
+    last_snapshot_batch,
+    worker_started_key,
+    WORKER_STARTED_TTL_SECONDS,
+)
+from lib.worker_fleet import heartbeat, leave as leave_fleet, worker_state
+
+# Progress events are buffered and written in pipelined batches by a background
+# thread; see lib/event_writer.py. Call flush_events() before anything that must
+# observe them (the start latch, process exit).
+event_writer = EventWriter(redis_client) if redis_client else None
+
+# Added to every batch_num this worker emits. Non-zero when resuming a session
+# whose snapshot already holds batches from an earlier (crashed) worker.
+snapshot_batch_base = 0
+
+# Opt-in: import the agent modules a workflow needs on a background thread while
+# the session update and start latch round trips are in flight.
+WORKER_PRELOAD = os.getenv("WORKER_PRELOAD", "false").lower() == "true"
+WORKFLOW_MODULES = {
+    "fetch_jobs": ("agents.scraper_agent", "agents.parse_agent"),
+    "apply_jobs": ("agents.apply_agent",),
+}
+
+# Daemon mode only: a job still running after this long is failed and the
+# process exits, so one hung navigation or LLM call cannot wedge a warm worker.
+WORKER_JOB_TIMEOUT_SECONDS = int(os.getenv("WORKER_JOB_TIMEOUT_SECONDS", "3600"))
+
+boot_profiler.mark("imports")
 
 def get_job_id():
     job_id = os.getenv("JOB_ID")
@@ -14,7 +49,7 @@ def get_job_id():
     return job_id
 
 def log_to_redis(job_id, event_or_progress, status=None, message=None, extra=None):
-    if not redis_client:
+    if not event_writer:
         return
     
     # Allow passing a full dictionary containing all event data
@@ -29,26 +64,71 @@ def log_to_redis(job_id, event_or_progress, status=None, message=None, extra=Non
         }
         if extra:
             event.update(extra)
-        
-    stream_key = f"stream:{job_id}"
-    heartbeat_key = f"worker_heartbeat:{job_id}"
+
+    if snapshot_batch_base and isinstance(event.get("batch_num"), int):
+        event = {**event, "batch_num": event["batch_num"] + snapshot_batch_base}
+
+    # Queued, not written: the writer XADDs in order and refreshes the stream
+    # TTL and worker heartbeat once per flush.
+    worker_state.observe(event)
+    event_writer.emit(job_id, event)
+
+
+def flush_events(timeout=5.0):
+    if event_writer and not event_writer.flush(timeout):
+        print("⚠️ Timed out flushing pending Redis events")
+
+
+def signal_worker_started(job_id, message):
+    """Publish the 'started' event for SSE clients and release the API's start latch."""
+    log_to_redis(job_id, 0, "started", message)
+    if not redis_client:
+        return
+    # The API attaches SSE as soon as the latch fires, so the event must land first.
+    flush_events()
     try:
-        redis_client.rpush(stream_key, json.dumps(event))
-        # Keep stream reasonably sized or expire it after a day
-        redis_client.expire(stream_key, 86400)
-        # Heartbeat is used by /api/jobs/start to detect stale active sessions.
-        redis_client.set(heartbeat_key, str(time.time()), ex=60)
+        latch_key = worker_started_key(job_id)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.rpush(latch_key, str(time.time()))
+        pipe.expire(latch_key, WORKER_STARTED_TTL_SECONDS)
+        pipe.execute()
+        # Free-tier claims are re-queued unless the worker confirms it booted.
+        ack_claim(redis_client, job_id)
     except Exception as e:
-        print(f"Redis log error: {e}")
+        print(f"Redis start latch error: {e}")
+
 
+# The running job's heartbeat thread and its stop event, while one is running.
+_heartbeat = None
+
+def start_heartbeat(job_id):
+    global _heartbeat
+    stop_event = threading.Event()
+    thread = threading.Thread(target=heartbeat_loop, args=(job_id, stop_event), daemon=True)
+    thread.start()
+    _heartbeat = (stop_event, thread)
+
+def stop_heartbeat():
+    """Stop and join the heartbeat thread, so no in-flight beat lands after leave()."""
+    global _heartbeat
+    if _heartbeat is None:
+        return
+    stop_event, thread = _heartbeat
+    _heartbeat = None
+    stop_event.set()
+    if thread is not threading.current_thread():
+        thread.join(timeout=10)
+        if thread.is_alive():
+            print("⚠️ Heartbeat thread did not stop in time")
 
 def heartbeat_loop(job_id: str, stop_event: threading.Event):
     """Keep heartbeat fresh even during long-running steps with sparse logs."""
-    heartbeat_key = f"worker_heartbeat:{job_id}"
     while not stop_event.is_set():
         try:
             if redis_client:
-                redis_client.set(heartbeat_key, str(time.time()), ex=60)
+                heartbeat(redis_client, job_id, worker_state)
+                # Keeps the free-tier lease alive only while this worker is; no-op otherwise.
+                renew_lease(redis_client, job_id)
         except Exception as e:
             print(f"Heartbeat update error for {job_id}: {e}")
         stop_event.wait(10)
@@ -73,47 +153,17 @@ def fail_job(job_id, error_message):
 def cleanup_and_exit(job_id, error_message=None, exit_code=0):
     if error_message:
         print(f"❌ {error_message}")
+    flush_events()
+    stop_heartbeat()
     if redis_client:
         try:
-            lock = redis_client.get("dummy_account_lock")
-            if lock:
-                lock_str = lock if isinstance(lock, str) else lock.decode('utf-8')
-                if lock_str == job_id:
-                    redis_client.delete("dummy_account_lock")
-                    print(f"🔓 Released dummy lock for job {job_id} during cleanup exit")
-                    
-                    import requests, threading, os, random
-                    backend_url = os.getenv("BACKEND_PUBLIC_URL", "http://localhost:8000")
-                    trigger_url = f"{backend_url}/api/jobs/trigger-next-queue"
-                    
-                    qstash_token = os.getenv("QSTASH_TOKEN")
-                    qstash_base_url = os.getenv("QSTASH_URL", "https://qstash.upstash.io")
-                    qstash_url = qstash_base_url if "/v2/publish" in qstash_base_url else f"{qstash_base_url.rstrip('/')}/v2/publish"
-                    
-                    delay_s = random.randint(25, 45)
-                    
-                    if qstash_token and backend_url:
-                        headers = {
-                            "Authorization": f"Bearer {qstash_token}",
-                            "Upstash-Delay": f"{delay_s}s",
-                            "Content-Type": "application/json"
-                        }
-                        try:
-                            res = requests.post(f"{qstash_url}/{trigger_url}", headers=headers, json={}, timeout=5)
-                            print(f"✅ Scheduled next queue trigger via QStash ({delay_s}s).")
-                        except Exception as e:
-                            print(f"⚠️ QStash scheduling failed: {e}. Falling back to local timer.")
-                            def _trigger():
-                                try: requests.post(trigger_url, timeout=5)
-                                except: pass
-                            threading.Timer(float(delay_s), _trigger).start()
-                    else:
-                        def _trigger():
-                            try: requests.post(trigger_url, timeout=5)
-                            except: pass
-                        threading.Timer(float(delay_s), _trigger).start()
+            release_lease(redis_client, job_id)
+        except Exception as e:
+            print(f"Failed to release queue lease during cleanup: {e}")
+        try:
+            leave_fleet(redis_client, job_id)
         except Exception as e:
-            print(f"Failed to release queue lock during cleanup: {e}")
+            print(f"Failed to remove worker heartbeat during cleanup: {e}")
     sys.exit(exit_code)
 
 def run_fetch_jobs_pipeline(job_id, job_data):
@@ -150,19 +200,64 @@ def run_apply_jobs_pipeline(job_id, job_data):
     except Exception as e:
         fail_job(job_id, f"Auto-applier execution failed: {str(e)}")
 
-def main():
-    job_id = get_job_id()
+def import_workflow_modules(workflow_type):
+    # Failures are only logged; the pipeline's own import raises them inside its error handling.
+    for name in WORKFLOW_MODULES.get(workflow_type, ()):
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"⚠️ Import of {name} failed: {e}")
+
+def reset_agent_state():
+    # A warm worker runs many users' jobs in one process; per-job globals
+    # (login context, applicant profile) must not carry over between them.
+    for names in WORKFLOW_MODULES.values():
+        for name in names:
+            module = sys.modules.get(name)
+            if module and hasattr(module, "reset_job_state"):
+                module.reset_job_state()
+
+def job_watchdog(job_id, done, timeout_seconds):
+    """Fail a daemon job that outlives its deadline and exit so the supervisor starts a fresh worker."""
+    if done.wait(timeout_seconds) or done.is_set():
+        return
+    try:
+        fail_job(job_id, f"Job exceeded the {timeout_seconds}s worker deadline")
+    except SystemExit:
+        pass
+    # The job's thread is stuck where it cannot be interrupted; only a new process recovers.
+    print(f"⏰ Job {job_id} timed out, exiting worker")
+    os._exit(1)
+
+def start_preload(workflow_type):
+    if not WORKER_PRELOAD or not WORKFLOW_MODULES.get(workflow_type):
+        return None
+
+    thread = threading.Thread(target=import_workflow_modules, args=(workflow_type,), name="preload", daemon=True)
+    thread.start()
+    return thread
+
+def publish_boot_profile(job_id):
+    boot_profiler.publish(lambda ev: log_to_redis(job_id, ev))
+    if redis_client:
+        try:
+            record_phase(redis_client, "worker_boot", boot_profiler.total_ms() / 1000)
+        except Exception as e:
+            print(f"Phase metric error (worker_boot): {e}")
+
+def run_job(job_id):
+    """
+    Run one workflow session end to end. Always finishes through
+    cleanup_and_exit, i.e. by raising SystemExit.
+    """
+    global snapshot_batch_base
     print(f"🚀 Worker starting for JOB_ID: {job_id}")
+    worker_state.reset()
+    reset_agent_state()
+    snapshot_batch_base = 0
 
-    stop_heartbeat = threading.Event()
-    heartbeat_thread = None
     if redis_client:
-        heartbeat_thread = threading.Thread(
-            target=heartbeat_loop,
-            args=(job_id, stop_heartbeat),
-            daemon=True,
-        )
-        heartbeat_thread.start()
+        start_heartbeat(job_id)
     
     # 1. Fetch Session from DB
     try:
@@ -172,6 +267,9 @@ def main():
             
         job_data = res.data[0]
         status = job_data["status"]
+        boot_profiler.mark("db_fetch")
+        worker_state.update(workflow_type=job_data.get("workflow_type"), status=status)
+        preload_thread = start_preload(job_data.get("workflow_type"))
         
         # 2. Check for cancelled/failed jobs immediately
         if status == "failed":
@@ -187,20 +285,34 @@ def main():
             }).eq("id", job_id).execute()
             job_data["status"] = "running"
             
-            # Important: this "started" status signals jobs_api.py to return HTTP 200
-            log_to_redis(job_id, 0, "started", "Worker container initialized")
-            time.sleep(1) # Give API a moment to catch the event
+            # Important: this releases the start latch jobs_api.py blocks on before returning HTTP 200
+            signal_worker_started(job_id, "Worker container initialized")
         elif status in ("running", "scraper_raw"):
             # Reattached worker boot path for existing active sessions.
             supabase.table("workflow_sessions").update({
                 "last_active_at": "now()"
             }).eq("id", job_id).execute()
-            log_to_redis(job_id, 0, "started", f"Worker resumed existing session from status '{status}'")
-            time.sleep(0.5)
+            signal_worker_started(job_id, f"Worker resumed existing session from status '{status}'")
+            if redis_client:
+                try:
+                    snapshot_batch_base = last_snapshot_batch(redis_client, job_id)
+                except Exception as e:
+                    print(f"⚠️ Could not read snapshot batches: {e}")
+        boot_profiler.mark("session_update")
+
+        if preload_thread:
+            preload_thread.join()
+            boot_profiler.mark("preload")
+        # Agent modules (bs4/lxml, google-genai, groq, fitz, ...) are the bulk of
+        # a cold boot; timed on their own, near zero when preloaded or warm.
+        import_workflow_modules(job_data.get("workflow_type"))
+        boot_profiler.mark("agent_imports")
+        publish_boot_profile(job_id)
         
         # 4. Route to pipeline
         try:
             wf_type = job_data["workflow_type"]
+            worker_state.update(phase=wf_type)
             if wf_type == "fetch_jobs":
                 run_fetch_jobs_pipeline(job_id, job_data)
             elif wf_type == "apply_jobs":
@@ -212,9 +324,77 @@ def main():
             
         cleanup_and_exit(job_id, exit_code=0)
     finally:
-        stop_heartbeat.set()
-        if heartbeat_thread:
-            heartbeat_thread.join(timeout=1)
+        stop_heartbeat()
+
+def main():
+    run_job(get_job_id())
+
+def run_daemon():
+    """
+    Warm worker: block-pop job ids from WORKER_QUEUE_KEY and run them in this
+    process, keeping agent modules imported and Chromium running between jobs.
+    Exits after WORKER_MAX_JOBS jobs (or WORKER_IDLE_EXIT_SECONDS without work)
+    so the supervisor replaces it with a fresh process. Each job runs under a
+    WORKER_JOB_TIMEOUT_SECONDS watchdog and starts from reset agent globals.
+    """
+    if not redis_client:
+        print("❌ Error: --daemon requires REDIS_URL")
+        sys.exit(1)
+
+    import traceback
+    from lib.browser_runtime import WarmBrowserRuntime, install_runtime
+
+    max_jobs = int(os.getenv("WORKER_MAX_JOBS", "25"))
+    idle_exit = int(os.getenv("WORKER_IDLE_EXIT_SECONDS", "0"))
+
+    # Pay import and client construction once instead of per job.
+    import agents.scraper_agent  # noqa: F401
+    import agents.apply_agent  # noqa: F401
+
+    runtime = WarmBrowserRuntime()
+    install_runtime(runtime)
+    runtime.run(runtime.browser())
+    print(f"🔥 Worker daemon ready (max {max_jobs} jobs), waiting on '{WORKER_QUEUE_KEY}'")
+
+    jobs_run = 0
+    idle_since = time.monotonic()
+    try:
+        while jobs_run < max_jobs:
+            item = redis_client.blpop([WORKER_QUEUE_KEY], timeout=5)
+            if not item:
+                if idle_exit and time.monotonic() - idle_since > idle_exit:
+                    print(f"💤 Idle for {idle_exit}s, exiting")
+                    break
+                continue
+
+            job_id = item[1]
+            jobs_run += 1
+            boot_profiler.reset()
+            job_done = threading.Event()
+            threading.Thread(
+                target=job_watchdog,
+                args=(job_id, job_done, WORKER_JOB_TIMEOUT_SECONDS),
+                name="watchdog",
+                daemon=True,
+            ).start()
+            try:
+                run_job(job_id)
+            except SystemExit as e:
+                print(f"✅ Job {job_id} finished (exit code {e.code}) [{jobs_run}/{max_jobs}]")
+            except Exception:
+                traceback.print_exc()
+            finally:
+                job_done.set()
+            idle_since = time.monotonic()
+    finally:
+        install_runtime(None)
+        runtime.close()
+        if event_writer:
+            event_writer.close()
+    print(f"♻️ Worker daemon recycling after {jobs_run} job(s)")
 
 if __name__ == "__main__":
-    main()
+    if "--daemon" in sys.argv[1:]:
+        run_daemon()
+    else:
+        main()
@@ -160,6 +160,9 @@ const Jobs = () => {
   const jobsContainerRef = useRef<HTMLDivElement>(null);
   const scrollPositionRef = useRef<number>(0);
   const seenLogMessages = useRef<Set<string>>(new Set());
+  // Highest snapshot batch merged so far; batch_ready events only carry counts.
+  const lastSnapshotBatch = useRef(0);
+  const snapshotSync = useRef<Promise<void>>(Promise.resolve());
 
   const ENC_KEY = "qwertyuioplkjhgfdsazxcvbnm987456";
   const IV = "741852963qwerty0";
@@ -409,6 +412,47 @@ const Jobs = () => {
         }
 
         setRecoveredJobId(activeJobId);
+        // Batch numbers restart at 1 for every job; never carry over a previous job's cursor.
+        lastSnapshotBatch.current = 0;
+        snapshotSync.current = Promise.resolve();
+
+        const applyBatchJobs = async (incoming: any[]) => {
+          accumulatedJobs.current = mergeUniqueJobs(accumulatedJobs.current, incoming);
+          // Preserve scroll position before update
+          if (jobsContainerRef.current) {
+            scrollPositionRef.current = window.scrollY;
+          }
+          setJobs([...accumulatedJobs.current]);
+          // Restore scroll position after React re-render
+          requestAnimationFrame(() => {
+            window.scrollTo(0, scrollPositionRef.current);
+          });
+          await appendFetchedJobs(incoming);
+        };
+
+        // Pull only the snapshot batches we don't have yet. Calls are chained so
+        // a burst of batch_ready events never fetches the same batch twice.
+        const syncSnapshot = () => {
+          snapshotSync.current = snapshotSync.current.then(async () => {
+            try {
+              const res = await fetch(`${API_URL}/api/jobs/snapshot?job_id=${activeJobId}&after_batch=${lastSnapshotBatch.current}`);
+              if (!res.ok) return;
+              const { batches } = await res.json();
+              const incoming: any[] = [];
+              for (const batch of batches || []) {
+                lastSnapshotBatch.current = Math.max(lastSnapshotBatch.current, batch.batch_num);
+                if (Array.isArray(batch.jobs)) incoming.push(...batch.jobs);
+              }
+              if (incoming.length > 0) await applyBatchJobs(incoming);
+            } catch (err) {
+              console.error("Failed to sync job snapshot:", err);
+            }
+          });
+          return snapshotSync.current;
+        };
+
+        // A reattached session may already have results: fetch them once up front.
+        if (recoveredJobId) await syncSnapshot();
 
         // 2. Open SSE progress stream
         const manager = new SSEManager({
@@ -455,18 +499,12 @@ const Jobs = () => {
             pushLog(evData.message, evData.status || "processing");
           }
 
-          if (evData?.status === "batch_ready" && Array.isArray(evData.jobs) && evData.jobs.length > 0) {
-            accumulatedJobs.current = mergeUniqueJobs(accumulatedJobs.current, evData.jobs);
-            // Preserve scroll position before update
-            if (jobsContainerRef.current) {
-              scrollPositionRef.current = window.scrollY;
+          if (evData?.status === "batch_ready") {
+            if (Array.isArray(evData.jobs) && evData.jobs.length > 0) {
+              await applyBatchJobs(evData.jobs);
+            } else if (evData.snapshot && evData.batch_num > lastSnapshotBatch.current) {
+              await syncSnapshot();
             }
-            setJobs([...accumulatedJobs.current]);
-            // Restore scroll position after React re-render
-            requestAnimationFrame(() => {
-              window.scrollTo(0, scrollPositionRef.current);
-            });
-            await appendFetchedJobs(evData.jobs);
           }
 
           if (evData?.status === "done") {
@@ -526,6 +564,8 @@ const Jobs = () => {
     sseRef.current = null;
     hasStarted.current = false;
     accumulatedJobs.current = [];
+    lastSnapshotBatch.current = 0;
+    snapshotSync.current = Promise.resolve();
     seenLogMessages.current.clear();
     void clearFetchedJobs();
     setShowRestorePrompt(false);
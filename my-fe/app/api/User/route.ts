@@ -1,5 +1,26 @@
 import prisma from "@/app/utiles/database";
 import { Prisma } from "@prisma/client";
+import { API_URL } from "@/app/utiles/api";
+
+// Columns the Python API caches per user; changing one must drop that cache entry.
+const IDENTITY_COLUMNS = new Set(["tier", "isConnected", "email"]);
+
+async function invalidate_identity(id: string) {
+  try {
+    await globalThis.fetch(`${API_URL}/api/identity/invalidate`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        // Server-only secret; the backend rejects invalidations without it.
+        "X-Internal-Secret": process.env.INTERNAL_API_SECRET ?? "",
+      },
+      body: JSON.stringify({ user_id: id }),
+    });
+  } catch (e) {
+    // Best effort: the backend cache entry still expires on its own TTL.
+    console.error("Failed to invalidate backend identity cache:", e);
+  }
+}
 
 
 async function insert_user(data: any) {
@@ -101,6 +122,9 @@ export async function POST(request: Request) {
       case "update":
         const { id, data } = body
         const updated = await update_row(id, data)
+        if (IDENTITY_COLUMNS.has(data?.column)) {
+          await invalidate_identity(id)
+        }
         return new Response(JSON.stringify({ success: true, message: "row updated" }), {
           status: 200
         })
@@ -20,6 +20,7 @@ export class SSEManager {
   private reconnectAttempts = 0;
   private destroyed = false;
   private lastEventAt = Date.now();
+  private lastEventId: string | null = null;
 
   onEvent: (payload: any) => void = () => {};
   onStatusChange: (status: SSEStatus, reason?: string) => void = () => {};
@@ -62,7 +63,7 @@ export class SSEManager {
 
     this.onStatusChange("reconnecting", "connecting");
 
-    this.es = new EventSource(this.options.url, {
+    this.es = new EventSource(this.buildUrl(), {
       withCredentials: this.options.withCredentials,
     });
 
@@ -75,6 +76,9 @@ export class SSEManager {
 
     this.es.onmessage = (event: MessageEvent) => {
       this.lastEventAt = Date.now();
+      if (event.lastEventId) {
+        this.lastEventId = event.lastEventId;
+      }
 
       if (!event.data) {
         return;
@@ -93,6 +97,15 @@ export class SSEManager {
     };
   }
 
+  // A fresh EventSource does not send Last-Event-ID, so resume via query param.
+  private buildUrl(): string {
+    if (!this.lastEventId) {
+      return this.options.url;
+    }
+    const separator = this.options.url.includes("?") ? "&" : "?";
+    return `${this.options.url}${separator}last_event_id=${encodeURIComponent(this.lastEventId)}`;
+  }
+
   private startHealthCheck(): void {
     this.clearHealthTimer();
 
@@ -15,7 +15,8 @@ CREATE TABLE workflow_sessions (
     CHECK (status IN ('pending', 'running', 'scraper_raw', 'completed', 'failed')),
   input_data       JSONB,       -- Request payload
   output_data      JSONB,       -- Pipeline state (overwritten by agents)
-  last_active_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  last_active_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- Worker liveness (set by workers only)
+  version          BIGINT NOT NULL DEFAULT 0,           -- Bumped on every update (ETags)
   created_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
@@ -23,3 +24,69 @@ CREATE TABLE workflow_sessions (
 CREATE UNIQUE INDEX one_active_job_per_user 
 ON workflow_sessions (user_id) 
 WHERE status IN ('pending', 'running', 'scraper_raw');
+
+-- RETENTION: finished sessions beyond each user's most recent `p_keep_recent`
+-- and older than `p_max_age` are deleted, at most `p_batch_size` rows per call
+-- so each call is a short transaction. Callers loop until deleted_rows <
+-- p_batch_size. `p_user_id` NULL sweeps every user. deleted_bytes is the
+-- (TOAST-compressed) size of the deleted rows; disk space returns after VACUUM.
+CREATE INDEX IF NOT EXISTS workflow_sessions_finished_by_user
+ON workflow_sessions (user_id, created_at DESC)
+WHERE status IN ('completed', 'failed');
+
+CREATE OR REPLACE FUNCTION purge_workflow_sessions(
+  p_user_id     UUID     DEFAULT NULL,
+  p_keep_recent INT      DEFAULT 5,
+  p_max_age     INTERVAL DEFAULT INTERVAL '30 days',
+  p_batch_size  INT      DEFAULT 500
+)
+RETURNS TABLE (deleted_rows BIGINT, deleted_bytes BIGINT)
+LANGUAGE sql
+AS $$
+  WITH ranked AS (
+    SELECT id, created_at,
+           row_number() OVER (PARTITION BY user_id ORDER BY created_at DESC) AS rn
+    FROM workflow_sessions
+    WHERE status IN ('completed', 'failed')
+      AND (p_user_id IS NULL OR user_id = p_user_id)
+  ), doomed AS (
+    SELECT id FROM ranked
+    WHERE rn > p_keep_recent AND created_at < NOW() - p_max_age
+    ORDER BY created_at
+    LIMIT p_batch_size
+  ), deleted AS (
+    DELETE FROM workflow_sessions w
+    USING doomed d
+    WHERE w.id = d.id
+    RETURNING pg_column_size(w.*) AS bytes
+  )
+  SELECT count(*)::BIGINT, COALESCE(sum(bytes), 0)::BIGINT FROM deleted;
+$$;
+
+-- The API runs the global sweep itself (SESSION_SWEEP_INTERVAL_SECONDS). With
+-- pg_cron available it can run in the database instead, e.g. hourly:
+--   SELECT cron.schedule('purge-workflow-sessions', '17 * * * *',
+--     $$SELECT purge_workflow_sessions(NULL, 5, INTERVAL '30 days', 5000)$$);
+
+-- Any update bumps `version`, so (id, status, version) identifies a row
+-- version; the API derives the /status and /active ETags from it. It is kept
+-- apart from last_active_at, which only workers advance and which the API
+-- reads as the liveness signal for stale-session recovery.
+ALTER TABLE workflow_sessions ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_workflow_session_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.version := OLD.version + 1;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS workflow_sessions_touch ON workflow_sessions;
+DROP FUNCTION IF EXISTS touch_workflow_session();
+DROP TRIGGER IF EXISTS workflow_sessions_version ON workflow_sessions;
+CREATE TRIGGER workflow_sessions_version
+BEFORE UPDATE ON workflow_sessions
+FOR EACH ROW EXECUTE FUNCTION bump_workflow_session_version();